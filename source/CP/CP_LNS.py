@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# Large Neighbourhood Search for the home/away optimisation on top of the CP model.
+# Start from any feasible schedule, then repeatedly fix O/P/H outside a random
+# neighbourhood (k weeks, or a group of teams) and re-solve it for a better Obj.
+import math, random
+from datetime import timedelta
+
+from CP_STS import BASE_MODEL, OPT_OBJ, TIME_LIMIT_S, build_search_annotation, record_flatten
+from budget import Budget
+import profiling
+from symmetry import minizinc_constraints
+
+# seconds given to each neighbourhood re-solve
+SUB_LIMIT_S = 5
+
+# Obj >= n: every team plays an odd number of games, so |home - away| >= 1
+def lower_bound(n: int) -> int:
+    return n
+
+HA_NAMES = {1: "Home", 2: "Away"}
+
+def _ha(v) -> str:
+    v = getattr(v, "name", v)
+    return HA_NAMES.get(v, str(v))
+
+def _instance(solver, n: int, sb: bool, goal: str, search: str = None, symmetry: str = None) -> "Instance":
+    from minizinc import Model, Instance
+    with profiling.phase("build"):
+        ann = build_search_annotation(search) if search else ""
+        extra = minizinc_constraints(n, symmetry) if symmetry else ""
+        model = Model()
+        model.add_string(BASE_MODEL + extra + "\n" + OPT_OBJ + "\n" + f"solve{ann} {goal};\n")
+        inst = Instance(solver, model)
+        inst["n"]  = n
+        inst["sb"] = sb and not symmetry
+    return inst
+
+def _fix_constraint(O, P, H, cells) -> str:
+    lits = []
+    for t, w in cells:
+        lits.append(f"O[{t},{w}]={O[t-1][w-1]}")
+        lits.append(f"P[{t},{w}]={P[t-1][w-1]}")
+        lits.append(f"H[{t},{w}]={_ha(H[t-1][w-1])}")
+    return "constraint " + " /\\ ".join(lits) + ";\n" if lits else ""
+
+def _neighbourhood(n: int, k: int, rng: random.Random, kind: str):
+    """Cells (team, week) kept fixed; everything else is free to change."""
+    teams, weeks = range(1, n + 1), range(1, n)
+    if kind == "weeks":
+        free = set(rng.sample(list(weeks), min(k, n - 1)))
+        return [(t, w) for t in teams for w in weeks if w not in free]
+    # a group of teams: k weeks' worth of cells, rounded to whole teams
+    group = set(rng.sample(list(teams), min(n, max(2, math.ceil(k * n / (n - 1))))))
+    return [(t, w) for t in teams for w in weeks if t not in group]
+
+def _to_sol(res):
+    with profiling.phase("decode"):
+        H, A = res["HomeTeam"], res["AwayTeam"]
+        return [[[H[s][w], A[s][w]] for w in range(len(H[0]))] for s in range(len(H))]
+
+def run_lns(n: int, solver_tag: str, sb: bool, search: str = None, seed: int = 0,
+            time_limit: int = TIME_LIMIT_S, sub_limit: int = SUB_LIMIT_S, symmetry: str = None,
+            budget: Budget = None):
+    from minizinc import Solver, Status
+    api_solver = "cp-sat" if solver_tag == "ortools" else solver_tag
+    solver = Solver.lookup(api_solver)
+    rng = random.Random(seed)
+    budget = budget or Budget(time_limit)
+
+    # 1) any feasible schedule
+    inst = _instance(solver, n, sb, "satisfy", search, symmetry)
+    with profiling.phase("solve"):
+        res = inst.solve(timeout=timedelta(seconds=budget.timeout_s()))
+    record_flatten(res)
+    if res.solution is None:
+        timed_out = res.status == Status.UNKNOWN
+        print(f"[LNS] no initial schedule ({res.status})")
+        return {"sol": [], "time": budget.total if timed_out else budget.seconds(),
+                "optimal": not timed_out, "obj": None}
+
+    best = res
+    best_obj = res["Obj"]
+    print(f"[LNS] initial Obj = {best_obj} after {budget.elapsed():.1f}s")
+
+    # 2) improve neighbourhood by neighbourhood
+    opt = _instance(solver, n, sb, "minimize Obj", search, symmetry)
+    k, k_max = max(2, (n - 1) // 4), n - 1
+    it, proven = 0, False
+    while best_obj > lower_bound(n) and not budget.expired(margin_s=1):
+        it += 1
+        kind = "weeks" if it % 2 else "teams"
+        fixed = _neighbourhood(n, k, rng, kind)
+        with opt.branch() as child:
+            child.add_string(_fix_constraint(best["O"], best["P"], best["H"], fixed))
+            child.add_string(f"constraint Obj < {best_obj};\n")
+            with profiling.phase("solve"):
+                sub = child.solve(timeout=timedelta(seconds=budget.timeout_s(sub_limit)))
+            record_flatten(sub)
+        if sub.solution is not None:
+            best, best_obj = sub, sub["Obj"]
+            print(f"[LNS] it {it}: Obj = {best_obj} ({kind}, k={k}, {budget.elapsed():.1f}s)")
+        elif sub.status == Status.UNSATISFIABLE and not fixed:
+            # nothing was fixed, so the incumbent is optimal
+            proven = True
+            break
+        elif sub.status == Status.UNSATISFIABLE:
+            # neighbourhood exhausted: look further
+            k = min(k_max, k + 1)
+        else:
+            # re-solve timed out: make it easier
+            k = max(1, k - 1)
+
+    optimal = proven or best_obj <= lower_bound(n)
+    return {
+        "sol": _to_sol(best),
+        "time": budget.seconds() if optimal else budget.total,
+        "optimal": optimal,
+        "obj": best_obj,
+    }
@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
-import argparse, time, math, json, re
+import argparse, time, math, json, re, random, sys
 from pathlib import Path
 from datetime import timedelta
-from minizinc import Model, Solver, Instance
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from symmetry import minizinc_constraints, parse_set
+from sweep import Sweep, fingerprint
+from budget import Budget
+import governor
+import profiling
 
 TIME_LIMIT_MS = 300_000
 TIME_LIMIT_S  = TIME_LIMIT_MS // 1000
@@ -107,10 +113,7 @@ constraint forall(w in WEEKS, s in SLOTS)(
 );
 """
 
-OPT_PART = r"""
-
-constraint sum(t in TEAMS)(HA_abs[t]) < n+1;
-
+OPT_OBJ = r"""
 array[TEAMS] of var int: HA_diff = [
   sum(w in WEEKS)(bool2int(H[t,w]==Home))
   - sum(w in WEEKS)(bool2int(H[t,w]==Away))
@@ -120,51 +123,133 @@ array[TEAMS] of var 0..n: HA_abs = [abs(HA_diff[t]) | t in TEAMS];
 var int: Obj = sum(t in TEAMS)(HA_abs[t]);
 """
 
-def build_model(opt: bool, heur: bool) -> str:
-    m = BASE_MODEL
-    if opt:
-        m += "\n" + OPT_PART + "\n"
-    ann = ""
-    if heur:
+OPT_PART = r"""
+
+constraint sum(t in TEAMS)(HA_abs[t]) < n+1;
+""" + OPT_OBJ
+
+# ─────────── SEARCH STRATEGIES ───────────
+# A strategy is "<var>:<val>:<restart>:<order>". Each part is one of the keys
+# below; the short tags are used to build the result key suffix.
+VAR_SELECTIONS = {"first_fail": "ff", "dom_w_deg": "dwd", "impact": "imp", "input_order": "io"}
+VAL_SELECTIONS = {"indomain_min": "min", "indomain_random": "rand", "indomain_split": "split"}
+RESTARTS       = {"none": "", "luby": "luby", "geometric": "geom"}
+ORDERS         = {"flat": "", "weekwise": "wk"}
+
+# scale (in failures) of the restart sequences
+RESTART_SCALE = 100
+RESTART_BASE  = 1.5
+
+# the original --heuristics annotation
+LEGACY_STRATEGY = "first_fail:indomain_min:none:flat"
+
+# best strategy per (solver, mode) and n, written by --tune
+SEARCH_TABLE = Path(__file__).resolve().parent / "search_table.json"
+
+def all_strategies():
+    return [f"{v}:{d}:{r}:{o}" for v in VAR_SELECTIONS for d in VAL_SELECTIONS
+            for r in RESTARTS for o in ORDERS]
+
+def parse_strategy(name: str) -> tuple:
+    parts = name.split(":")
+    if len(parts) != 4:
+        raise ValueError(f"strategy must be <var>:<val>:<restart>:<order>, got {name!r}")
+    var, val, restart, order = parts
+    for part, allowed in ((var, VAR_SELECTIONS), (val, VAL_SELECTIONS),
+                          (restart, RESTARTS), (order, ORDERS)):
+        if part not in allowed:
+            raise ValueError(f"unknown strategy component {part!r} (choose from {', '.join(allowed)})")
+    return var, val, restart, order
+
+def strategy_suffix(name: str) -> str:
+    if name == LEGACY_STRATEGY:
+        return "_hf"
+    var, val, restart, order = parse_strategy(name)
+    tags = [VAR_SELECTIONS[var], VAL_SELECTIONS[val], RESTARTS[restart], ORDERS[order]]
+    return "_s-" + "-".join(t for t in tags if t)
+
+def build_search_annotation(name: str) -> str:
+    var, val, restart, order = parse_strategy(name)
+    if order == "flat":
         ann = " :: int_search(" \
               "[O[t,w] | t in TEAMS, w in WEEKS] ++ " \
               "[P[t,w] | t in TEAMS, w in WEEKS] ++ " \
               "[H[t,w] | t in TEAMS, w in WEEKS]," \
-              "first_fail,indomain_min)"
+              f"{var},{val})"
+    else:
+        # commit the opponents week by week, then the periods week by week
+        ann = " :: seq_search(" \
+              f"[int_search([O[t,w] | t in TEAMS],{var},{val}) | w in WEEKS] ++ " \
+              f"[int_search([P[t,w] | t in TEAMS],{var},{val}) | w in WEEKS] ++ " \
+              f"[int_search([H[t,w] | t in TEAMS, w in WEEKS],{var},{val})])"
+    if restart == "luby":
+        ann += f" :: restart_luby({RESTART_SCALE})"
+    elif restart == "geometric":
+        ann += f" :: restart_geometric({RESTART_BASE},{RESTART_SCALE})"
+    return ann
+
+def load_search_table() -> dict:
+    if SEARCH_TABLE.exists():
+        return json.loads(SEARCH_TABLE.read_text())
+    return {}
+
+def lookup_strategy(n: int, opt: bool, solver_tag: str):
+    mode = "opt" if opt else "sat"
+    return load_search_table().get(f"{solver_tag}_{mode}", {}).get(str(n))
+
+def build_model(opt: bool, heur: bool, search: str = None, extra: str = "") -> str:
+    m = BASE_MODEL + extra
+    if opt:
+        m += "\n" + OPT_PART + "\n"
+    if heur and search is None:
+        search = LEGACY_STRATEGY
+    ann = build_search_annotation(search) if search else ""
     m += f"solve{ann} {'minimize Obj;' if opt else 'satisfy;'}\n"
     return m
 
-def run_and_collect(n:int, opt:bool, heur:bool, solver_tag:str, sb:bool):
+def record_flatten(res):
+    """MiniZinc flattening happens inside solve(); its time comes from the statistics."""
+    t = res.statistics.get("flatTime")
+    profiling.record("flatten", t.total_seconds() if isinstance(t, timedelta) else t)
+
+def run_and_collect(n:int, opt:bool, heur:bool, solver_tag:str, sb:bool,
+                    search:str=None, time_limit:int=TIME_LIMIT_S, symmetry:str=None, seed:int=None,
+                    budget:Budget=None):
+    from minizinc import Model, Solver, Instance
+    # the budget also covers building the model; a caller may pass its own
+    budget = budget or Budget(time_limit)
     api_solver = "cp-sat" if solver_tag=="ortools" else solver_tag
 
-    model = Model()
-    model.add_string(build_model(opt, heur))
-    solver = Solver.lookup(api_solver)
-    inst = Instance(solver, model)
-    inst["n"]  = n
-    inst["sb"] = sb
-
-    to = timedelta(seconds=TIME_LIMIT_S)
-    t0 = time.time()
-    res = inst.solve(timeout=to)
-    t1 = time.time()
-
-    elapsed = math.floor(t1 - t0)
+    with profiling.phase("build"):
+        # a library symmetry set replaces the built-in sb constraints
+        extra = minizinc_constraints(n, symmetry) if symmetry else ""
+        model = Model()
+        model.add_string(build_model(opt, heur, search, extra))
+        solver = Solver.lookup(api_solver)
+        inst = Instance(solver, model)
+        inst["n"]  = n
+        inst["sb"] = sb and not symmetry
+
+    with profiling.phase("solve"):
+        res = inst.solve(timeout=timedelta(seconds=budget.timeout_s()), random_seed=seed)
+    record_flatten(res)
+    elapsed = budget.seconds()
     status  = str(res.status).upper()
     timed_out = "UNKNOWN" in status
 
     sol = []
     if not timed_out:
-        try:
-            H, A = res["HomeTeam"], res["AwayTeam"]
-            sol = [[[H[s][w], A[s][w]] for w in range(len(H[0]))]
-                   for s in range(len(H))]
-        except:
-            sol = []
+        with profiling.phase("decode"):
+            try:
+                H, A = res["HomeTeam"], res["AwayTeam"]
+                sol = [[[H[s][w], A[s][w]] for w in range(len(H[0]))]
+                       for s in range(len(H))]
+            except:
+                sol = []
 
     entry = {
       "sol": sol if sol and not timed_out else [],
-      "time": TIME_LIMIT_S if timed_out else elapsed
+      "time": budget.total if timed_out else elapsed
     }
 
     if opt:
@@ -176,14 +261,53 @@ def run_and_collect(n:int, opt:bool, heur:bool, solver_tag:str, sb:bool):
 
     return entry
 
+# ─────────── TUNING ───────────
+def tune(ns, opt: bool, solver_tag: str, sb: bool, trial_s: int, samples: int, seed: int):
+    """Grid (samples=0) or random search over the strategies; the fastest one per n
+    is stored in SEARCH_TABLE and picked up by later runs."""
+    candidates = all_strategies()
+    if samples:
+        rng = random.Random(seed)
+        candidates = [LEGACY_STRATEGY] + rng.sample(candidates, min(samples, len(candidates)))
+        candidates = list(dict.fromkeys(candidates))
+
+    table = load_search_table()
+    mode = "opt" if opt else "sat"
+    row = table.setdefault(f"{solver_tag}_{mode}", {})
+    for n in ns:
+        best, best_score = None, None
+        for name in candidates:
+            entry = run_and_collect(n, opt, False, solver_tag, sb, search=name, time_limit=trial_s)
+            # unsolved runs rank last, then by time, then by objective
+            score = (not entry["optimal"], entry["time"], entry["obj"] or 0)
+            print(f"[TUNE] n={n} {name}: optimal={entry['optimal']} time={entry['time']} obj={entry['obj']}")
+            if best_score is None or score < best_score:
+                best, best_score = name, score
+        row[str(n)] = best
+        SEARCH_TABLE.write_text(json.dumps(table, indent=2) + "\n")
+        print(f"[TUNE] n={n}: best strategy {best} -> {SEARCH_TABLE}")
+
 def main():
     p = argparse.ArgumentParser()
     group = p.add_mutually_exclusive_group(required=True)
     group.add_argument("-n",    type=int,           help="even # teams (single-run mode)")
     group.add_argument("--a", action="store_true", help="run full sweep of configurations")
+    group.add_argument("--tune", nargs="+", type=int, metavar="N",
+                       help="search for the best strategy on these n and store it in the lookup table")
 
     p.add_argument("--opt",        action="store_true", help="run optimization version")
     p.add_argument("--heuristics", action="store_true", help="use first-fail heuristic")
+    p.add_argument("--search", metavar="VAR:VAL:RESTART:ORDER",
+        help="search strategy, e.g. dom_w_deg:indomain_random:luby:weekwise "
+             "(default: the tuned strategy for this n, if any)")
+    p.add_argument("--lns", action="store_true",
+        help="with --opt: large neighbourhood search from a feasible schedule instead of plain tree search")
+    p.add_argument("--seed", type=int, default=None,
+        help="random seed of the solver and of the LNS neighbourhood choice (default: solver default, 0 for LNS)")
+    p.add_argument("--tune-time", type=int, default=30, help="time limit per tuning trial in s (default: 30)")
+    p.add_argument("--tune-samples", type=int, default=0,
+        help="number of random strategies per n in tuning mode (default: 0 = full grid)")
+    p.add_argument("--tune-seed", type=int, default=0, help="seed for random tuning (default: 0)")
     p.add_argument("--solver",
         choices=["chuffed","gecode","ortools"],
         help="solver to use (default: chuffed for sat, ortools for opt)")
@@ -193,25 +317,55 @@ def main():
         action="store_false",
         help="omit symmetry-breaking constraints (default: include them)"
     )
+    p.add_argument("--symmetry", metavar="SET",
+        help="use a set of the shared symmetry library instead of the built-in one, e.g. teams+weeks or full")
+    p.add_argument("--force", action="store_true",
+        help="with --a, re-run configurations that already have a valid optimal result")
+    governor.add_arguments(p)
     p.set_defaults(sb=True)
     args = p.parse_args()
+    limits = governor.limits_from_args(p, args)
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            p.error(str(e))
+    if args.lns and not args.opt:
+        p.error("--lns requires --opt")
+    if args.search:
+        try:
+            parse_strategy(args.search)
+        except ValueError as e:
+            p.error(str(e))
+
+    if args.tune:
+        solver_tag = args.solver or ("ortools" if args.opt else "chuffed")
+        tune(args.tune, args.opt, solver_tag, args.sb, args.tune_time, args.tune_samples, args.tune_seed)
+        return
 
     # “All” mode sweep
     if args.a:
+        sweep = Sweep("CP", force=args.force)
         for opt in (False, True):
             Ns = ALL_OPT_N if opt else ALL_SAT_N
             for n in Ns:
                 for heur in ALL_HEURISTICS:
                     for solver_tag in ALL_SOLVERS:
                         for sb in ALL_SYMBREAK:
-                            result = run_and_collect(n, opt, heur, solver_tag, sb)
                             mode   = "opt" if opt else "sat"
                             suffix = "_hf" if heur else ""
                             sb_suf = "" if sb else "_nosb"
                             key    = f"{solver_tag}_{mode}{suffix}{sb_suf}"
                             out = Path("../res/CP") / f"{n}.json"
-                            merge_into_json(out, key, result)
-                            print(f"[INFO] merged {key} into {out}")
+                            fp = fingerprint(build_model(opt, heur), n, solver_tag, sb, TIME_LIMIT_S)
+                            if not sweep.should_run(out, key, fp):
+                                continue
+                            job = governor.run_job("CP", n, key, out, limits, run_and_collect,
+                                                   n, opt, heur, solver_tag, sb, profile=args.profile)
+                            if job.status == "ok":
+                                merge_into_json(out, key, job.value)
+                                print(f"[INFO] merged {key} into {out}")
+                            sweep.record(out, key, fp)
         return
 
     # Single-run mode: enforce even n
@@ -219,15 +373,31 @@ def main():
         raise SystemExit("n must be even")
 
     solver_tag = args.solver or ("ortools" if args.opt else "chuffed")
-    result = run_and_collect(args.n, args.opt, args.heuristics, solver_tag, args.sb)
-
+    search = args.search
+    if search is None and not args.heuristics:
+        search = lookup_strategy(args.n, args.opt, solver_tag)
+        if search:
+            print(f"[INFO] using tuned search strategy {search}")
     mode   = "opt" if args.opt else "sat"
-    suffix = "_hf" if args.heuristics else ""
-    sb_suf = "" if args.sb else "_nosb"
+    suffix = strategy_suffix(search) if search else ("_hf" if args.heuristics else "")
+    if args.lns:
+        suffix += "_lns"
+    sb_suf = f"_sym-{args.symmetry}" if args.symmetry else ("" if args.sb else "_nosb")
     key    = f"{solver_tag}_{mode}{suffix}{sb_suf}"
     out = Path("../res/CP") / f"{args.n}.json"
-    merge_into_json(out, key, result)
-    print(f"[INFO] merged {key} into {out}")
+
+    if args.lns:
+        from CP_LNS import run_lns
+        job = governor.run_job("CP", args.n, key, out, limits, run_lns, args.n, solver_tag, args.sb,
+                               search=search or (LEGACY_STRATEGY if args.heuristics else None),
+                               seed=args.seed or 0, symmetry=args.symmetry, profile=args.profile)
+    else:
+        job = governor.run_job("CP", args.n, key, out, limits, run_and_collect, args.n, args.opt,
+                               args.heuristics, solver_tag, args.sb, search=search,
+                               symmetry=args.symmetry, seed=args.seed, profile=args.profile)
+    if job.status == "ok":
+        merge_into_json(out, key, job.value)
+        print(f"[INFO] merged {key} into {out}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,393 @@
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import highspy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from symmetry import mip_rows, parse_set
+from sweep import Sweep, fingerprint
+from budget import Budget
+import governor
+import profiling
+
+# ----------------------------------------------------------------------------
+# In-process HiGHS backend for the MIP model
+# ----------------------------------------------------------------------------
+# Same formulation as mip_model.py (x[i,j,p,w] = 1 iff i plays home against j
+# in period p of week w, PlayOnlyOnce / OneGamePerWeek / TwoGamesPerPeriod /
+# OneMatchPerSlot, optional TotalImbalance objective, lexicographic week order,
+# canonical pairing and the shared symmetry library), but the constraint matrix
+# is built directly as a sparse row-wise matrix with NumPy and passed to HiGHS
+# through highspy: no AMPL translator, no .nl file and no license.
+#
+# Formulation options (also in mip_model.py):
+#   valid_ineq  TeamPeriodCover (every team plays at least once in every period:
+#               N-1 games over N/2 periods, at most 2 each) and, when optimising,
+#               home + away = N-1 and home_away_diff >= 1 (N-1 is odd), which
+#               lifts the root bound from 0 to N
+#   lazy        TwoGamesPerPeriod rows are left out and added only when the
+#               incumbent violates them, re-solving until none is violated
+#   lex=tight   the week order is "team 1 meets team w+1 in week w" instead of
+#               the LexicographicalWeekOrdering rows with coefficients up to N²;
+#               both break the week permutations only
+
+TIME_LIMIT_S = 300
+RES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "res", "MIP")
+SOLVER_NAME = "highspy"
+INF = highspy.kHighsInf
+
+# ----------------------------------------------------------------------------
+# Helper functions
+# ----------------------------------------------------------------------------
+def get_sol_suffix(comb: dict) -> str:
+    # the key suffixes of mip_model.py, so both backends can be compared per instance
+    suffix = ""
+    if comb['can_pair']:
+        suffix += "_canPair"
+    if comb['symm_break']:
+        suffix += "_symmBreak"
+    if comb.get('symmetry'):
+        suffix += f"_sym-{comb['symmetry']}"
+    if comb.get('valid_ineq'):
+        suffix += "_validIneq"
+    if comb.get('lazy'):
+        suffix += "_lazy"
+    if comb['symm_break'] and comb.get('lex') == "tight":
+        suffix += "_lexTight"
+    suffix += "_OPT" if comb['optimise'] else "_DEC"
+    return suffix
+
+def print_solution(sol_matrix):
+    for row in sol_matrix:
+        print(row)
+
+class RowBuilder:
+    """Collects the rows of the constraint matrix as (row, col, value) triplets."""
+
+    def __init__(self):
+        self.rows, self.cols, self.vals = [], [], []
+        self.lower, self.upper = [], []
+        self.num_row = 0
+
+    def add_family(self, row_of, cols, vals, lo, hi, count):
+        """`count` rows numbered from 0 by `row_of`, with bounds lo <= . <= hi."""
+        self.rows.append(np.asarray(row_of, dtype=np.int64) + self.num_row)
+        self.cols.append(np.asarray(cols, dtype=np.int64))
+        self.vals.append(np.broadcast_to(np.asarray(vals, dtype=np.float64), np.shape(cols)))
+        self.lower.append(np.full(count, lo, dtype=np.float64))
+        self.upper.append(np.full(count, hi, dtype=np.float64))
+        self.num_row += count
+
+    def csr(self):
+        rows, cols, vals = (np.concatenate(a) for a in (self.rows, self.cols, self.vals))
+        order = np.argsort(rows, kind="stable")
+        start = np.zeros(self.num_row + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=self.num_row), out=start[1:])
+        return start, cols[order].astype(np.int32), vals[order], \
+            np.concatenate(self.lower), np.concatenate(self.upper)
+
+# ----------------------------------------------------------------------------
+# The model
+# ----------------------------------------------------------------------------
+def build_model(N: int, optimise: bool, symm_break: bool, can_pair: bool, symmetry: str = None,
+                valid_ineq: bool = False, lazy: bool = False, lex: str = "dense"):
+    """Returns (lp, index) where index[i, j, p, w] is the column of x[i,j,p,w] (-1 if i == j)."""
+    W, P = N - 1, N // 2
+    I, J, Pp, Ww = (a.ravel() for a in np.meshgrid(np.arange(N), np.arange(N), np.arange(P), np.arange(W),
+                                                   indexing="ij"))
+    keep = I != J
+    I, J, Pp, Ww = I[keep], J[keep], Pp[keep], Ww[keep]
+    n_x = I.size
+    x = np.arange(n_x)
+    index = np.full((N, N, P, W), -1, dtype=np.int64)
+    index[I, J, Pp, Ww] = x
+
+    col_cost = np.zeros(n_x)
+    col_lower = np.zeros(n_x)
+    col_upper = np.ones(n_x)
+    integral = np.ones(n_x, dtype=bool)
+
+    b = RowBuilder()
+    # CONSTR 1: every team plays every other team exactly once
+    pair = np.full((N, N), -1, dtype=np.int64)
+    pair[np.triu_indices(N, 1)] = np.arange(N * (N - 1) // 2)
+    b.add_family(pair[np.minimum(I, J), np.maximum(I, J)], x, 1, 1, 1, N * (N - 1) // 2)
+    # CONSTR 2: every team plays exactly one game per week
+    b.add_family(np.concatenate([I * W + Ww, J * W + Ww]), np.concatenate([x, x]), 1, 1, 1, N * W)
+    # CONSTR 3: every team plays at most twice per period (added on demand if lazy)
+    if not lazy:
+        b.add_family(np.concatenate([I * P + Pp, J * P + Pp]), np.concatenate([x, x]), 1, 0, 2, N * P)
+    # CONSTR 4: in every slot there is exactly one match
+    b.add_family(Pp * W + Ww, x, 1, 1, 1, P * W)
+
+    if optimise:
+        # home_games[i], away_games[i] integer in [0, N], home_away_diff[i] >= 0
+        home, away, diff = n_x + np.arange(N), n_x + N + np.arange(N), n_x + 2 * N + np.arange(N)
+        col_cost = np.concatenate([col_cost, np.zeros(2 * N), np.ones(N)])
+        col_lower = np.concatenate([col_lower, np.zeros(3 * N)])
+        col_upper = np.concatenate([col_upper, np.full(2 * N, N), np.full(N, INF)])
+        integral = np.concatenate([integral, np.ones(2 * N, dtype=bool), np.zeros(N, dtype=bool)])
+        t = np.arange(N)
+        # HomeGames / AwayGames: home_games[i] - sum_j x[i,j,.,.] = 0, likewise for away
+        b.add_family(np.concatenate([t, I]), np.concatenate([home, x]),
+                     np.concatenate([np.ones(N), -np.ones(n_x)]), 0, 0, N)
+        b.add_family(np.concatenate([t, J]), np.concatenate([away, x]),
+                     np.concatenate([np.ones(N), -np.ones(n_x)]), 0, 0, N)
+        # HomeAwayDiff1/2: diff >= home - away, diff >= away - home
+        b.add_family(np.tile(t, 3), np.concatenate([diff, home, away]),
+                     np.concatenate([np.ones(N), -np.ones(N), np.ones(N)]), 0, INF, N)
+        b.add_family(np.tile(t, 3), np.concatenate([diff, home, away]),
+                     np.concatenate([np.ones(N), np.ones(N), -np.ones(N)]), 0, INF, N)
+        if valid_ineq:
+            # HomeAwayTotal: home + away = N-1; OddImbalance: diff >= 1
+            b.add_family(np.tile(t, 2), np.concatenate([home, away]), 1, W, W, N)
+            col_lower[diff] = 1
+
+    if valid_ineq:
+        # TeamPeriodCover: every team plays at least once in every period
+        b.add_family(np.concatenate([I * P + Pp, J * P + Pp]), np.concatenate([x, x]), 1, 1, INF, N * P)
+
+    if symm_break and lex == "tight":
+        # WeekOrderTight: team 1 meets team w+1 in week w; with the canonical
+        # pairing week 0 is taken (team 1 meets team N), so team 1 meets team w
+        # in week w >= 1 (the weeks set of symmetry.py)
+        weeks = np.arange(1, W) if can_pair else np.arange(W)
+        w = np.repeat(weeks, P)
+        p = np.tile(np.arange(P), weeks.size)
+        o = w if can_pair else w + 1
+        cols = np.concatenate([index[0, o, p, w], index[o, 0, p, w]])
+        b.add_family(np.tile(w - weeks[0], 2), cols, 1, 1, 1, weeks.size)
+    elif symm_break:
+        # LexicographicalWeekOrdering: sum game_value * x[., w] <= sum game_value * x[., w+1]
+        game_value = (I * N + J + 1).astype(np.float64)
+        first, second = Ww < W - 1, Ww > 0
+        b.add_family(np.concatenate([Ww[first], Ww[second] - 1]), np.concatenate([x[first], x[second]]),
+                     np.concatenate([game_value[first], -game_value[second]]), -INF, 0, W - 1)
+
+    if can_pair:
+        # CanonicalPairing: x[p, N-1-p, p, 0] = 1
+        p = np.arange(P)
+        col_lower[index[p, N - 1 - p, p, 0]] = 1
+
+    if symmetry:
+        for keys, lo_, hi_ in mip_rows(N, symmetry):
+            cols = index[tuple(np.array(keys).T)]
+            b.add_family(np.zeros(len(cols)), cols, 1, lo_, hi_, 1)
+
+    start, cols, vals, row_lower, row_upper = b.csr()
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = col_cost.size
+    lp.num_row_ = row_lower.size
+    lp.col_cost_ = col_cost
+    lp.col_lower_ = col_lower
+    lp.col_upper_ = col_upper
+    lp.row_lower_ = row_lower
+    lp.row_upper_ = row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.start_ = start
+    lp.a_matrix_.index_ = cols
+    lp.a_matrix_.value_ = vals
+    lp.integrality_ = [highspy.HighsVarType.kInteger if v else highspy.HighsVarType.kContinuous
+                       for v in integral]
+    lp.sense_ = highspy.ObjSense.kMinimize
+    return lp, index
+
+def period_counts(col_value, index):
+    """counts[i, p]: games of team i in period p."""
+    x = np.where(index >= 0, np.asarray(col_value)[index.clip(min=0)], 0.0)
+    return x.sum(axis=(1, 3)) + x.sum(axis=(0, 3))
+
+def add_period_rows(h, index, teams, periods):
+    """Adds TwoGamesPerPeriod for the given (team, period) pairs."""
+    N = index.shape[0]
+    starts, cols = [], []
+    for i, p in zip(teams, periods):
+        starts.append(sum(len(c) for c in cols))
+        c = np.concatenate([index[i, :, p, :].ravel(), index[:, i, p, :].ravel()])
+        cols.append(c[c >= 0])
+    cols = np.concatenate(cols).astype(np.int32)
+    k = len(starts)
+    h.addRows(k, np.zeros(k), np.full(k, 2.0), cols.size, np.array(starts, dtype=np.int32), cols,
+              np.ones(cols.size))
+
+def get_solution_matrix(col_value, index):
+    N, _, P, W = index.shape
+    sol_matrix = [[[] for _ in range(W)] for _ in range(P)]
+    x = np.asarray(col_value)[index.clip(min=0)] > 0.5
+    for i, j, p, w in zip(*np.nonzero(x & (index >= 0))):
+        sol_matrix[p][w] = [int(i) + 1, int(j) + 1]
+    return sol_matrix
+
+# ----------------------------------------------------------------------------
+# Solving
+# ----------------------------------------------------------------------------
+def new_highs(time_limit: int = TIME_LIMIT_S, verbose: bool = True, seed: int = None):
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", verbose)
+    h.setOptionValue("time_limit", float(time_limit))
+    h.setOptionValue("threads", 1)
+    if seed is not None:
+        h.setOptionValue("random_seed", seed)
+    return h
+
+def result_path(N: int) -> str:
+    return os.path.join(RES_DIR, f"{N}.json")
+
+def lp_fingerprint(lp, time_limit: int) -> str:
+    m = lp.a_matrix_
+    return fingerprint(*(np.asarray(a).tobytes() for a in (lp.col_cost_, lp.col_lower_, lp.col_upper_,
+                                                           lp.row_lower_, lp.row_upper_, m.start_, m.index_,
+                                                           m.value_)),
+                       [int(v) for v in lp.integrality_], time_limit)
+
+def model_from(N: int, combination: dict):
+    return build_model(N, optimise=combination['optimise'], symm_break=combination['symm_break'],
+                       can_pair=combination['can_pair'], symmetry=combination.get('symmetry'),
+                       valid_ineq=combination.get('valid_ineq', False), lazy=combination.get('lazy', False),
+                       lex=combination.get('lex', "dense"))
+
+def root_bound(lp) -> float:
+    """Objective of the LP relaxation, i.e. the root bound before cuts."""
+    h = new_highs(verbose=False)
+    h.passModel(lp)
+    h.changeColsIntegrality(lp.num_col_, np.arange(lp.num_col_, dtype=np.int32),
+                            np.full(lp.num_col_, highspy.HighsVarType.kContinuous))
+    h.run()
+    return h.getInfo().objective_function_value
+
+def run(h, index, lazy: bool, budget):
+    """Solves, adding violated TwoGamesPerPeriod rows if lazy. Returns (status, stats).
+    `budget` is a Budget or a time limit in s."""
+    if not isinstance(budget, Budget):
+        budget = Budget(budget)
+    stats = {"nodes": 0, "rounds": 0, "lazy_rows": 0}
+    while True:
+        h.setOptionValue("time_limit", budget.timeout_s())
+        h.run()
+        status = h.getModelStatus()
+        stats["nodes"] += h.getInfo().mip_node_count
+        stats["rounds"] += 1
+        if not lazy or status != highspy.HighsModelStatus.kOptimal:
+            return status, stats
+        teams, periods = np.nonzero(period_counts(h.getSolution().col_value, index) > 2.5)
+        if teams.size == 0:
+            return status, stats
+        add_period_rows(h, index, teams, periods)
+        stats["lazy_rows"] += int(teams.size)
+
+def solve_instance(N: int, combination: dict, time_limit: int = TIME_LIMIT_S, verbose: bool = True,
+                   seed: int = None) -> None:
+    print('\n' + '-'*90)
+    print(f"SOLVING N = {N} with {SOLVER_NAME + get_sol_suffix(combination)}")
+
+    budget = Budget(time_limit)
+    with profiling.phase("build"):
+        lp, index = model_from(N, combination)
+        h = new_highs(time_limit, verbose, seed)
+        h.passModel(lp)
+    print(f"- Model: {lp.num_col_} columns, {lp.num_row_} rows, {len(lp.a_matrix_.index_)} nonzeros "
+          f"built in {budget.elapsed():.3f}s")
+
+    with profiling.phase("solve"):
+        status, stats = run(h, index, combination.get('lazy', False), budget)
+    print(f'***{h.modelStatusToString(status)}***')
+    print(f"- {stats['nodes']} nodes, {stats['rounds']} round(s), {stats['lazy_rows']} lazy rows added")
+    print('-'*90 +'\n')
+
+    sol_matrix, obj = [], 'None'
+    optimal = status in (highspy.HighsModelStatus.kOptimal, highspy.HighsModelStatus.kInfeasible)
+    if status == highspy.HighsModelStatus.kOptimal:
+        with profiling.phase("decode"):
+            sol_matrix = get_solution_matrix(h.getSolution().col_value, index)
+        print_solution(sol_matrix)
+        if combination['optimise']:
+            obj = round(h.getInfo().objective_function_value)
+    elapsed = budget.seconds() if optimal else time_limit
+
+    filename = result_path(N)
+    with profiling.phase("write"):
+        data = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    data = json.load(f)
+            except Exception:
+                pass
+        data[SOLVER_NAME + get_sol_suffix(combination)] = {
+            "sol": sol_matrix,
+            "time": elapsed,
+            "optimal": optimal,
+            "obj": obj
+        }
+        os.makedirs(RES_DIR, exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(data, f, indent=4)
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Solve the STS MIP model with HiGHS in-process (no AMPL)")
+    parser.add_argument('N', type=int, nargs="?", help="even number of teams")
+    parser.add_argument('-a', '--automatic', action='store_true',
+                        help="Run N=4,6,...,14 with every flag combination")
+    parser.add_argument("-o", "--optimise", action="store_true", help="Turn on optimisation mode")
+    parser.add_argument('-cp', '--can-pair', action='store_true', help="Enable canonical pairing")
+    parser.add_argument('-sb', '--symm_break', action='store_true', help="Enable symmetry breaking on the weeks")
+    parser.add_argument('--symmetry', metavar='SET',
+                        help="Add a set of the shared symmetry library, e.g. teams+weeks or full")
+    parser.add_argument('-vi', '--valid-ineq', action='store_true',
+                        help="Add valid inequalities (team-period cover, home/away balance bounds)")
+    parser.add_argument('-lazy', '--lazy', action='store_true',
+                        help="Add TwoGamesPerPeriod rows only when the incumbent violates them")
+    parser.add_argument('--lex', choices=("dense", "tight"), default="dense",
+                        help="Week ordering used by -sb (default: dense)")
+    parser.add_argument('--time-limit', type=int, default=TIME_LIMIT_S,
+                        help=f"time limit in s (default: {TIME_LIMIT_S})")
+    parser.add_argument('--seed', type=int, default=None, help="HiGHS random seed (default: HiGHS default)")
+    parser.add_argument('--force', action='store_true',
+                        help="With -a, re-run configurations that already have a valid optimal result")
+    parser.add_argument('-q', '--quiet', action='store_true', help="Hide the HiGHS log")
+    governor.add_arguments(parser)
+    args = parser.parse_args()
+    limits = governor.limits_from_args(parser, args)
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.automatic:
+        if args.N is not None:
+            parser.error("-a/--automatic cannot be combined with N.")
+        sweep = Sweep("MIP", force=args.force)
+        for N in range(4, 15, 2):
+            for optimise in (False, True):
+                for can_pair in (False, True):
+                    for symm_break in (False, True):
+                        comb = {'optimise': optimise, 'can_pair': can_pair, 'symm_break': symm_break}
+                        key = SOLVER_NAME + get_sol_suffix(comb)
+                        fp = lp_fingerprint(model_from(N, comb)[0], args.time_limit)
+                        if not sweep.should_run(result_path(N), key, fp):
+                            continue
+                        governor.run_job("MIP", N, key, result_path(N), limits, solve_instance, N, comb,
+                                         args.time_limit, not args.quiet, args.seed, time_limit=args.time_limit,
+                                         profile=args.profile)
+                        sweep.record(result_path(N), key, fp)
+    else:
+        if args.N is None:
+            parser.error("Positional argument N is required unless -a/--automatic is used.")
+        if args.N % 2:
+            parser.error("N must be even")
+        comb = {'optimise': args.optimise, 'can_pair': args.can_pair, 'symm_break': args.symm_break,
+                'symmetry': args.symmetry, 'valid_ineq': args.valid_ineq, 'lazy': args.lazy, 'lex': args.lex}
+        governor.run_job("MIP", args.N, SOLVER_NAME + get_sol_suffix(comb), result_path(args.N), limits,
+                         solve_instance, args.N, comb, args.time_limit, not args.quiet, args.seed,
+                         time_limit=args.time_limit, profile=args.profile)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,49 @@
 import json
 import os
 import re
-from amplpy import AMPL, modules
+import sys
+import inspect
 import argparse
 from math import floor
 from itertools import product
-from dotenv import load_dotenv
-load_dotenv()
+from functools import lru_cache
 
-uuid = os.getenv("AMPL_LICENSE_UUID")
-if uuid:
-    modules.activate(uuid)
-    ampl = AMPL()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from symmetry import ampl_constraints, parse_set
+from sweep import Sweep, fingerprint
+from budget import Budget
+import governor
+import profiling
 
 # ----------------------------------------------------------------------------
-# Getting user parameters
+# AMPL session
 # ----------------------------------------------------------------------------
-available_solvers = modules.installed()[1:]  # Skip the first element which is 'ampl'
-automatic = False
+# amplpy is imported and the license activated on first use, so that importing
+# this module (e.g. from the library API in sts.py) has no side effects.
+_ampl = None
+
+def get_ampl():
+    """The AMPL session of this process, created (and licensed) on the first call."""
+    global _ampl
+    if _ampl is None:
+        from amplpy import AMPL, modules
+        from dotenv import load_dotenv
+        load_dotenv()
+        uuid = os.getenv("AMPL_LICENSE_UUID")
+        if not uuid:
+            raise RuntimeError("AMPL_LICENSE_UUID is not set")
+        modules.activate(uuid)
+        _ampl = AMPL()
+    return _ampl
+
+@lru_cache(maxsize=None)
+def installed_solvers():
+    from amplpy import modules
+    return modules.installed()[1:]  # Skip the first element which is 'ampl'
 
-parser = argparse.ArgumentParser(description="Script to read two parameters")
+# ----------------------------------------------------------------------------
+# Getting user parameters
+# ----------------------------------------------------------------------------
 
 def check_N_range(value):
     ivalue = int(value)
@@ -29,49 +53,21 @@ def check_N_range(value):
 
 def check_solver_range(value):
     ivalue = int(value)
-    if ivalue < 0 or ivalue > len(available_solvers) - 1:
-        raise argparse.ArgumentTypeError(f"{value} is not in range 0–{len(modules.installed()) - 2}")
+    if ivalue < 0 or ivalue > len(installed_solvers()) - 1:
+        raise argparse.ArgumentTypeError(f"{value} is not in range 0–{len(installed_solvers()) - 1}")
     return ivalue
 
 def get_solvers_help():
     help_text = ""
-    for i, solver in enumerate(available_solvers):  # Skip the first element which is 'ampl'  
+    for i, solver in enumerate(installed_solvers()):  # Skip the first element which is 'ampl'  
         help_text += f"{i}: {solver}, "
     return help_text[:-2] 
 
-parser.add_argument('N', type=check_N_range, nargs="?", help="N")
-parser.add_argument('solver', type=check_solver_range, nargs="?", help=get_solvers_help())
-parser.add_argument('-a', '--automatic', action='store_true', help="Run all N and solver combinations automatically")
-parser.add_argument("-o", "--optimise", action="store_true", help="Turn on optimisation mode")
-parser.add_argument('-cp', '--can-pair',action='store_true',help="Enable canonical pairing")
-parser.add_argument('-sb', '--symm_break',action='store_true',help="Enable symmetry breaking on the weeks")
-parser.add_argument('-cplex_br', '--cplex_barr',action='store_true',help="Use barrier algorithm for cplex")
-
-args = parser.parse_args()
-
-optimise = args.optimise # true if the -o/--optimise flag is passed
-can_pair = args.can_pair
-symm_break = args.symm_break
-cplex_barr = args.cplex_barr
-
-all_combinations = []
-if args.automatic:
-    # user typed:  python mip_model.py -a
-    if args.N is not None or args.solver is not None:
-        parser.error("-a/--automatic cannot be combined with N or solver.")
-    automatic = True
-else:
-    # user typed:  python mip_model.py N solver
-    if args.N is None or args.solver is None:
-        parser.error("Positional arguments N and solver are required unless -a/--automatic is used.")
-    automatic = False
-
-
-
 # ----------------------------------------------------------------------------
 # Helper functions
 # ----------------------------------------------------------------------------
 def get_solution_matrix():
+    ampl = get_ampl()
     solution_dict = ampl.get_solution(flat=False, zeros=False)
     weeks = len(ampl.get_set("WEEKS").get_values().to_list())
     periods = len(ampl.get_set("PERIODS").get_values().to_list())
@@ -113,6 +109,14 @@ def get_sol_suffix(comb: dict, solver):
         suffix += "_symmBreak"
     if solver == 'cplex' and comb['cplex_barr']:
         suffix += "_barrier"
+    if comb.get('symmetry'):
+        suffix += f"_sym-{comb['symmetry']}"
+    if comb.get('valid_ineq'):
+        suffix += "_validIneq"
+    if comb.get('lazy') and solver in LAZY_SOLVERS:
+        suffix += "_lazy"
+    if comb['symm_break'] and comb.get('lex') == "tight":
+        suffix += "_lexTight"
     if comb['optimise']:
         suffix += "_OPT"
     if not comb['optimise']:
@@ -121,11 +125,19 @@ def get_sol_suffix(comb: dict, solver):
     return suffix
 
 
+def result_path(N: int) -> str:
+    return f"res/MIP/{N}.json"
+
+def model_fingerprint(N: int, solver_idx: int, comb: dict) -> str:
+    # the model is generated by AMPL statements, so the code of load_model stands in for it
+    return fingerprint(inspect.getsource(load_model), N, installed_solvers()[solver_idx], sorted(comb.items()),
+                       time_limit)
+
 def create_solution_json(solver, sol_matrix, output, solve_result, comb):
     optimal = solve_result in ("solved", "infeasible")
     obj = 'None'
     if comb['optimise']:
-        obj = ampl.get_objective('TotalImbalance').value() if solve_result not in ("limit", "infeasible", "?") else 'None'
+        obj = get_ampl().get_objective('TotalImbalance').value() if solve_result not in ("limit", "infeasible", "?") else 'None'
     time = 0
     if solve_result in ("solved", "solved?", "infeasible"):
         time = floor(parse_timing_from_output(output)['Total time'])
@@ -150,7 +162,12 @@ def create_solution_json(solver, sol_matrix, output, solve_result, comb):
 # ----------------------------------------------------------------------------
 # The model
 # ----------------------------------------------------------------------------
-def load_model(N:int, optimise: bool, symm_break: bool, can_pair: bool):
+# Solvers that read the .lazy suffix (1 = lazy constraint)
+LAZY_SOLVERS = ('gurobi', 'cplex')
+
+def load_model(N:int, optimise: bool, symm_break: bool, can_pair: bool, symmetry: str = None,
+               valid_ineq: bool = False, lazy: bool = False, lex: str = "dense"):
+    ampl = get_ampl()
     ampl.eval(f"param N := {N};")
     ampl.eval("""
         set TEAMS = 1..N;
@@ -188,7 +205,32 @@ def load_model(N:int, optimise: bool, symm_break: bool, can_pair: bool):
                 home_away_diff[i] >= away_games[i] - home_games[i];
         """)
 
-    if symm_break:
+        if valid_ineq:
+            # N-1 games per team, an odd number: the imbalance is at least 1
+            ampl.eval("""
+                subject to HomeAwayTotal {i in TEAMS}:
+                    home_games[i] + away_games[i] = card(WEEKS);
+
+                subject to OddImbalance {i in TEAMS}:
+                    home_away_diff[i] >= 1;
+            """)
+
+    if symm_break and lex == "tight":
+        # same symmetry as the lexicographical ordering (week permutations),
+        # without the coefficients up to N^2
+        # with the canonical pairing team 1 meets team N in week 1, so the
+        # order starts at week 2 (the weeks set of symmetry.py)
+        if can_pair:
+            ampl.eval("""
+                subject to WeekOrderTight {w in WEEKS: w > 1}:
+                    sum {p in PERIODS} (x[1,w,p,w] + x[w,1,p,w]) = 1;
+            """)
+        else:
+            ampl.eval("""
+                subject to WeekOrderTight {w in WEEKS}:
+                    sum {p in PERIODS} (x[1,w+1,p,w] + x[w+1,1,p,w]) = 1;
+            """)
+    elif symm_break:
         ampl.eval("""
             param game_value {i in TEAMS, j in TEAMS: i != j} := (i-1) * card(TEAMS) + j;
                   
@@ -215,6 +257,18 @@ def load_model(N:int, optimise: bool, symm_break: bool, can_pair: bool):
     subject to TwoGamesPerPeriod {i in TEAMS, p in PERIODS}:
         sum {j in TEAMS: i != j} sum {w in WEEKS} (x[i,j,p,w] + x[j,i,p,w]) <= 2;
     """)
+    if lazy:
+        ampl.eval("""
+        suffix lazy IN;
+        let {i in TEAMS, p in PERIODS} TwoGamesPerPeriod[i,p].lazy := 1;
+        """)
+
+    if valid_ineq:
+        # N-1 games over N/2 periods, at most 2 per period: at least 1 in each
+        ampl.eval("""
+        subject to TeamPeriodCover {i in TEAMS, p in PERIODS}:
+            sum {j in TEAMS: i != j} sum {w in WEEKS} (x[i,j,p,w] + x[j,i,p,w]) >= 1;
+        """)
 
     # CONSTR 4: in every slot there is at the most one match
     ampl.eval("""
@@ -229,6 +283,9 @@ def load_model(N:int, optimise: bool, symm_break: bool, can_pair: bool):
             x[p, N + 1 - p, p, 1] = 1;
         """)
 
+    if symmetry:
+        ampl.eval(ampl_constraints(N, symmetry))
+
 # ----------------------------------------------------------------------------
 # Solver set up 
 # ----------------------------------------------------------------------------
@@ -240,12 +297,21 @@ opt_names = {
 } 
 
 def solve_instance(N: int, solver_idx: int, combination: dict) -> None:
+    solver_name = installed_solvers()[solver_idx]
+    ampl = get_ampl()
+    lazy = combination.get('lazy', False)
+    if lazy and solver_name not in LAZY_SOLVERS:
+        print(f"[WARN] {solver_name} ignores lazy constraints, TwoGamesPerPeriod stays a regular constraint")
+        lazy = False
+
+    budget = Budget(time_limit)                # model generation counts against the limit
     ampl.reset()                               # fresh model
-    load_model(N, optimise=comb['optimise'], symm_break=comb['symm_break'], can_pair=['can_pair'])
+    with profiling.phase("build"):
+        load_model(N, optimise=combination['optimise'], symm_break=combination['symm_break'],
+                   can_pair=combination['can_pair'], symmetry=combination.get('symmetry'),
+                   valid_ineq=combination.get('valid_ineq', False), lazy=lazy, lex=combination.get('lex', "dense"))
 
-    solver_name = available_solvers[solver_idx]
-
-    mp_options_str = f'lim:time={time_limit} report_times=1 tech:timing=2 tech:threads=1 '
+    mp_options_str = f'lim:time={budget.timeout_s():.1f} report_times=1 tech:timing=2 tech:threads=1 '
     ampl.option["solver"] = solver_name
     if solver_name == 'cplex' and combination['cplex_barr']: mp_options_str += 'alg:barrier'
 
@@ -253,10 +319,11 @@ def solve_instance(N: int, solver_idx: int, combination: dict) -> None:
     ampl.option[opt_name] = mp_options_str
 
     print('\n' + '-'*90)
-    print(f"SOLVING N = {N} with {solver_name + get_sol_suffix(comb, solver_name)}")
+    print(f"SOLVING N = {N} with {solver_name + get_sol_suffix(combination, solver_name)}")
     print(f'- Solver\'s options: {ampl.get_option(opt_name)}')
 
-    output = ampl.solve(verbose=True, return_output=True)
+    with profiling.phase("solve"):
+        output = ampl.solve(verbose=True, return_output=True)
     solve_result = ampl.solve_result
 
     print(f'***{solve_result}***')
@@ -267,44 +334,94 @@ def solve_instance(N: int, solver_idx: int, combination: dict) -> None:
         if solve_result in ("limit", "infeasible", "?"):
             sol_matrix = []
         else:
-            sol_matrix = get_solution_matrix()
-
-        filename = f"res/MIP/{N}.json"
-        data = {}
-        if os.path.exists(filename):
-            try:
-                with open(filename) as f:
-                    data = json.load(f)
-            except Exception:
-                pass
-        data.update(create_solution_json(solver_name, sol_matrix, output, solve_result, comb))
-        with open(filename, "w") as f:
-            json.dump(data, f, indent=4)
+            with profiling.phase("decode"):
+                sol_matrix = get_solution_matrix()
+
+        filename = result_path(N)
+        with profiling.phase("write"):
+            data = {}
+            if os.path.exists(filename):
+                try:
+                    with open(filename) as f:
+                        data = json.load(f)
+                except Exception:
+                    pass
+            data.update(create_solution_json(solver_name, sol_matrix, output, solve_result, combination))
+            with open(filename, "w") as f:
+                json.dump(data, f, indent=4)
 
 
 # ----------------------------------------------------------------------------
 # Solving
 # ----------------------------------------------------------------------------
-if automatic:
-    instances = range(4, 15, 2)               # 4,6,…,14
-    for N in instances:
-        for idx in range(len(available_solvers)):
-            flags = ["optimise", "can_pair", "symm_break"]
-            if available_solvers[idx] == 'cplex':
-                flags.append('cplex_barr')
-    
-            all_combinations = []
-            for values in product([False, True], repeat=len(flags)):
-                combo = dict(zip(flags, values))
-                all_combinations.append(combo)
-
-            for comb in all_combinations:
-                solve_instance(N, idx, comb)
-else:
-    comb = {
-        'optimise': optimise,
-        'can_pair': can_pair,
-        'symm_break': symm_break,
-        'cplex_barr': cplex_barr
-    }
-    solve_instance(args.N, args.solver, comb)
+def main():
+    parser = argparse.ArgumentParser(description="Script to read two parameters")
+
+    parser.add_argument('N', type=check_N_range, nargs="?", help="N")
+    parser.add_argument('solver', type=check_solver_range, nargs="?", help=get_solvers_help())
+    parser.add_argument('-a', '--automatic', action='store_true', help="Run all N and solver combinations automatically")
+    parser.add_argument("-o", "--optimise", action="store_true", help="Turn on optimisation mode")
+    parser.add_argument('-cp', '--can-pair',action='store_true',help="Enable canonical pairing")
+    parser.add_argument('-sb', '--symm_break',action='store_true',help="Enable symmetry breaking on the weeks")
+    parser.add_argument('-cplex_br', '--cplex_barr',action='store_true',help="Use barrier algorithm for cplex")
+    parser.add_argument('--symmetry', metavar='SET', help="Add a set of the shared symmetry library, e.g. teams+weeks or full")
+    parser.add_argument('-vi', '--valid-ineq', action='store_true', help="Add valid inequalities (team-period cover, home/away balance bounds)")
+    parser.add_argument('-lazy', '--lazy', action='store_true', help="Make TwoGamesPerPeriod lazy (gurobi, cplex)")
+    parser.add_argument('--lex', choices=("dense", "tight"), default="dense", help="Week ordering used by -sb (default: dense)")
+    parser.add_argument('--force', action='store_true', help="With -a, re-run configurations that already have a valid optimal result")
+    governor.add_arguments(parser)
+
+    args = parser.parse_args()
+    limits = governor.limits_from_args(parser, args)
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.automatic:
+        # user typed:  python mip_model.py -a
+        if args.N is not None or args.solver is not None:
+            parser.error("-a/--automatic cannot be combined with N or solver.")
+        sweep = Sweep("MIP", force=args.force)
+        available_solvers = installed_solvers()
+        instances = range(4, 15, 2)               # 4,6,…,14
+        for N in instances:
+            for idx in range(len(available_solvers)):
+                flags = ["optimise", "can_pair", "symm_break"]
+                if available_solvers[idx] == 'cplex':
+                    flags.append('cplex_barr')
+
+                all_combinations = []
+                for values in product([False, True], repeat=len(flags)):
+                    combo = dict(zip(flags, values))
+                    all_combinations.append(combo)
+
+                for comb in all_combinations:
+                    key = available_solvers[idx] + get_sol_suffix(comb, available_solvers[idx])
+                    fp = model_fingerprint(N, idx, comb)
+                    if not sweep.should_run(result_path(N), key, fp):
+                        continue
+                    governor.run_job("MIP", N, key, result_path(N), limits, solve_instance, N, idx, comb,
+                                     time_limit=time_limit, profile=args.profile)
+                    sweep.record(result_path(N), key, fp)
+    else:
+        # user typed:  python mip_model.py N solver
+        if args.N is None or args.solver is None:
+            parser.error("Positional arguments N and solver are required unless -a/--automatic is used.")
+        comb = {
+            'optimise': args.optimise,
+            'can_pair': args.can_pair,
+            'symm_break': args.symm_break,
+            'cplex_barr': args.cplex_barr,
+            'symmetry': args.symmetry,
+            'valid_ineq': args.valid_ineq,
+            'lazy': args.lazy,
+            'lex': args.lex
+        }
+        solver = installed_solvers()[args.solver]
+        governor.run_job("MIP", args.N, solver + get_sol_suffix(comb, solver), result_path(args.N), limits,
+                         solve_instance, args.N, args.solver, comb, time_limit=time_limit, profile=args.profile)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
-import os, time, json, argparse, resource,gc
+import os, sys, time, json, random, inspect, argparse, resource
+import multiprocessing as mp
 from z3 import *
 from constraints import *  # constraint encodings
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "LS"))
+from symmetry import add_z3_constraints, parse_set, facts
+from constructions import half_split, rotational
+from sweep import Sweep, fingerprint
+import z3_config
+import governor
+import profiling
+from budget import Budget, TIME_LIMIT_S
+
 # ----------------------------------------------------------------------------
 # Parameters and Variable Setup
 # ----------------------------------------------------------------------------
@@ -23,10 +34,11 @@ def build_variables(n, W, P):
 # Extracting, Printing and Saving Solutions
 # ----------------------------------------------------------------------------
 def extract_solution(model, M, W, P):
-    sol = [[None for _ in range(W)] for _ in range(P)]
-    for (i, j, w, p), var in M.items():
-        if is_true(model.evaluate(var)):
-            sol[p][w] = [i + 1, j + 1]  # 1-based indexing
+    with profiling.phase("decode"):
+        sol = [[None for _ in range(W)] for _ in range(P)]
+        for (i, j, w, p), var in M.items():
+            if is_true(model.evaluate(var)):
+                sol[p][w] = [i + 1, j + 1]  # 1-based indexing
     return sol
 
 def print_solution(sol_matrix):
@@ -34,7 +46,10 @@ def print_solution(sol_matrix):
     for row in sol_matrix:
         print(row)
 
-def save_solution_json(n, status, runtime_s, sol):
+def result_path(n):
+    return os.path.join("../../res/SAT", f"n{n}.json")
+
+def save_solution_json(n, status, runtime_s, sol, key="SAT_dec"):
     if status == 'sat':
         time_val, optimal = runtime_s, True
     elif status == 'unsat':
@@ -49,19 +64,19 @@ def save_solution_json(n, status, runtime_s, sol):
         "sol": sol
     }
 
-    out_dir = "../../res/SAT"
-    os.makedirs(out_dir, exist_ok=True)
-    path = os.path.join(out_dir, f"n{n}.json")
+    path = result_path(n)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
 
-    data = {}
-    if os.path.isfile(path):
-        with open(path) as f:
-            data = json.load(f)
+    with profiling.phase("write"):
+        data = {}
+        if os.path.isfile(path):
+            with open(path) as f:
+                data = json.load(f)
 
-    data["SAT_dec"] = entry
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
-    print(f"✔ SAT_dec written to {path}")
+        data[key] = entry
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+    print(f"✔ {key} written to {path}")
 
 # ----------------------------------------------------------------------------
 # Timing Helper
@@ -78,29 +93,57 @@ def get_time_info(start_time):
 # ----------------------------------------------------------------------------
 # Core Solving Routine
 # ----------------------------------------------------------------------------
-def solve_instance(n):
+def result_key(args):
+    key = f"SAT_dec_sym-{args.symmetry}" if args.symmetry else "SAT_dec"
+    return key + z3_config.config_suffix(args.z3_config, args.threads)
+
+def method_suffix(args):
+    """Result-key suffix of the solving methods other than the plain model."""
+    if getattr(args, "cubes", False):
+        return "_cube"
+    if getattr(args, "decompose", False):
+        return "_decomp"
+    return "_rolling" if getattr(args, "rolling", False) else ""
+
+def build_solver(n, args):
     n, W, P = get_parameters(n)
-    print(f"\n{'-'*80}\n[INFO] Solving STS-SAT for N = {n} teams\n{'-'*80}")
+    with profiling.phase("build"):
+        M = build_variables(n, W, P)
 
-    M = build_variables(n, W, P)
+        seed = getattr(args, "seed", None)
+        s = z3_config.make_solver(args.z3_config, args.threads, timeout_ms=300_000, seed=42 if seed is None else seed)
 
-    s = Solver()
-    s.set(timeout=300_000, random_seed=42)
+        # Constraints
+        constraint_each_pair_once(s, M, n, W, P)
+        constraint_one_match_per_slot(s, M, n, W, P)
+        constraint_team_once_per_week(s, M, n, W, P)
+        at_most_two_per_period(s, M, n, W, P)
 
-    # Constraints
-    constraint_each_pair_once(s, M, n, W, P)
-    constraint_one_match_per_slot(s, M, n, W, P)
-    constraint_team_once_per_week(s, M, n, W, P)
-    at_most_two_per_period(s, M, n, W, P)
+        if args.symmetry:
+            add_z3_constraints(s, M, n, W, P, args.symmetry)
+        elif not args.no_sb:
+            simple_rowcol_lex(s, M, n, W, P)
+    return s, M
+
+def solve_instance(n, args):
+    if args.cubes:
+        return solve_cubes(n, args)
+    if args.decompose:
+        return solve_decomposed(n, args)
+    if args.rolling:
+        return solve_rolling(n, args)
+    n, W, P = get_parameters(n)
+    print(f"\n{'-'*80}\n[INFO] Solving STS-SAT for N = {n} teams\n{'-'*80}")
 
-    if not args.no_sb:
-        simple_rowcol_lex(s, M, n, W, P)
+    budget = Budget(TIME_LIMIT_S)
+    s, M = build_solver(n, args)
 
     # Solve
-    t0 = time.time()
-    res = s.check()
-    timing = get_time_info(t0)
-    elapsed = int(timing["Total time"])
+    s.set("timeout", budget.timeout_ms())
+    with profiling.phase("solve"):
+        res = s.check()
+    timing = get_time_info(budget.start)
+    elapsed = budget.seconds()
 
     print("[Timing]")
     for k, v in timing.items():
@@ -109,43 +152,661 @@ def solve_instance(n):
     if res == sat:
         sol = extract_solution(s.model(), M, W, P)
         print_solution(sol)
-        save_solution_json(n, 'sat', elapsed, sol)
+        save_solution_json(n, 'sat', elapsed, sol, result_key(args))
     elif res == unsat:
         print(f"[RESULT] UNSAT in {elapsed}s")
-        save_solution_json(n, 'unsat', elapsed, [])
+        save_solution_json(n, 'unsat', elapsed, [], result_key(args))
     else:
+        governor.check_z3(s)
         print(f"[RESULT] TIMEOUT after {elapsed}s")
-        save_solution_json(n, 'timeout', elapsed, [])
-    # Cleanup memory
-    del M, s
-    gc.collect()
+        save_solution_json(n, 'timeout', elapsed, [], result_key(args))
+
+# ----------------------------------------------------------------------------
+# Cube-and-conquer
+# ----------------------------------------------------------------------------
+# A cube fixes the pairs playing in the first `depth` periods of one week. The
+# cubes of a week cover every possible assignment of those slots, so if all of
+# them are UNSAT the instance is UNSAT. The week is week 0 unless the symmetry
+# set already fixes it completely (teams+periods), in which case it is week 1.
+# Pairs a symmetry fact puts in another week, or that clash with a pair fixed
+# in this week, are never tried.
+CUBE_DIR = "../../res/SAT/cubes"
+
+def cube_week(n, args):
+    sets = parse_set(args.symmetry) if args.symmetry else ()
+    return 1 if "teams" in sets and "periods" in sets else 0
+
+def generate_cubes(n, W, P, args, depth):
+    week = cube_week(n, args)
+    placed = [f[1:] for f in facts(n, args.symmetry) if f[0] == "week"] if args.symmetry else []
+    def allowed(i, j):
+        for a, b, w in placed:
+            if (a, b) == (i, j) and w != week:
+                return False
+            if w == week and {i, j} & {a, b} and (a, b) != (i, j):
+                return False
+        return True
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n) if allowed(i, j)]
+
+    def extend(cube, used):
+        p = len(cube)
+        if p == min(depth, P):
+            yield tuple(cube)
+            return
+        for i, j in pairs:
+            if i not in used and j not in used:
+                yield from extend(cube + [(i, j, week, p)], used | {i, j})
+    return list(extend([], frozenset()))
+
+def cube_log_path(n, args, depth):
+    # the result key leaves out --no-sb, which changes the model the cubes ran on
+    sb = "_nosb" if args.no_sb and not args.symmetry else ""
+    return os.path.join(CUBE_DIR, f"n{n}_{result_key(args)}{sb}_d{depth}.jsonl")
+
+def load_unsat_cubes(path):
+    done = set()
+    if os.path.isfile(path):
+        with open(path) as f:
+            for line in f:
+                done.add(tuple(tuple(lit) for lit in json.loads(line)))
+    return done
+
+# Each worker builds its own solver once; fork gives it a private Z3 context.
+_worker = {}
+
+def _init_worker(n, args):
+    _worker["s"], _worker["M"] = build_solver(n, args)
+    _worker["WP"] = get_parameters(n)[1:]
+
+def _solve_cube(job):
+    cube, deadline = job
+    left = deadline - time.time()
+    if left <= 0:
+        return cube, "unknown", None
+    s, M = _worker["s"], _worker["M"]
+    s.set(timeout=int(left * 1000))
+    res = s.check([M[lit] for lit in cube])
+    if res == sat:
+        return cube, "sat", extract_solution(s.model(), M, *_worker["WP"])
+    return cube, str(res), None
+
+def solve_cubes(n, args):
+    n, W, P = get_parameters(n)
+    depth, workers = args.cube_depth, args.workers or os.cpu_count()
+    print(f"\n{'-'*80}\n[INFO] Solving STS-SAT for N = {n} teams by cube-and-conquer "
+          f"({workers} workers, depth {depth})\n{'-'*80}")
+
+    budget = Budget(TIME_LIMIT_S)
+    log_path = cube_log_path(n, args, depth)
+    done = load_unsat_cubes(log_path) if args.resume else set()
+    cubes = [c for c in generate_cubes(n, W, P, args, depth) if c not in done]
+    print(f"[INFO] {len(cubes)} cubes to solve ({len(done)} already UNSAT)")
+    os.makedirs(CUBE_DIR, exist_ok=True)
+
+    deadline = budget.deadline
+    status, sol, unknown_left = "unsat", [], 0
+    with mp.get_context("fork").Pool(workers, _init_worker, (n, args)) as pool, \
+         open(log_path, "a" if args.resume else "w") as log:
+        for cube, res, found in pool.imap_unordered(_solve_cube, [(c, deadline) for c in cubes]):
+            if res == "sat":
+                status, sol = "sat", found
+                pool.terminate()
+                break
+            if res == "unsat":
+                log.write(json.dumps(cube) + "\n")
+                log.flush()
+            else:
+                unknown_left += 1
+    if status == "unsat" and unknown_left:
+        status = "timeout"
+    elapsed = budget.seconds()
+
+    key = result_key(args) + method_suffix(args)
+    if status == "sat":
+        print_solution(sol)
+    else:
+        print(f"[RESULT] {status.upper()} after {elapsed}s ({unknown_left} cubes unresolved)")
+    save_solution_json(n, status, elapsed, sol, key)
+
+# ----------------------------------------------------------------------------
+# Decomposition: 1-factorization master + period subproblem
+# ----------------------------------------------------------------------------
+# The weeks of a schedule are a 1-factorization of K_n (n-1 perfect matchings).
+# Once they are fixed, the periods are a much smaller problem: put the n/2
+# matches of every week into the n/2 periods, at most twice per team and
+# period. Candidate factorizations come first from the circle method, then
+# from the master, the SAT model without periods (Y[(i, j, w)], with the
+# teams+weeks facts of symmetry.py). The subproblem has one assumption literal
+# per week; when it is UNSAT, its core (shrunk by deletion) is a set of
+# matchings that no schedule can contain together, wherever they are placed,
+# so the master gets the nogood Or(Not z_F for F in core), where z_F holds if
+# matching F is one of the weeks. An UNSAT master proves the instance UNSAT.
+# Every subproblem check gets at most PERIODS_CAP_S. When the subproblem is
+# unknown, the tabu search of LS_STS repairs the hint (or the identity periods)
+# for at most REPAIR_CAP_S; if that fails too, the whole candidate is cut from
+# the master without proof, and an UNSAT master only ends the run as unknown.
+def circle_factorization(n):
+    """The weeks of the circle method as lists of pairs (i, j), i < j."""
+    W = n - 1
+    weeks = []
+    for w in range(W):
+        week = [(w, n - 1)]
+        for k in range(1, n // 2):
+            a, b = (w + k) % W, (w - k) % W
+            week.append((min(a, b), max(a, b)))
+        weeks.append(week)
+    return weeks
+
+def circle_periods(n):
+    """Period of match k of week w in the assignment of LS_STS: match k in period
+    k, with the first match and match |2w| (mod n-1) swapped. It is already valid
+    when 3 does not divide n-1."""
+    W, P = n - 1, n // 2
+    periods = []
+    for w in range(W):
+        q, row = min(2 * w % W, -2 * w % W), list(range(P))
+        row[0], row[q] = row[q], row[0]
+        periods.append(row)
+    return periods
+
+# the subproblem is pure PB: bit-blasted it solves much faster than with the
+# default solver, which is only used to find the core of an UNSAT candidate
+PERIODS_CONFIG = "pb2sat"
+PERIODS_CAP_S = 10
+REPAIR_CAP_S = 20
+
+def period_model(weeks, z3_conf=PERIODS_CONFIG):
+    W, P = len(weeks), len(weeks[0])
+    n = 2 * P
+    s = z3_config.make_solver(z3_conf, 1, seed=42)
+    X = {(w, k, p): Bool(f"x_{w}_{k}_{p}") for w in range(W) for k in range(P) for p in range(P)}
+    active = [Bool(f"week_{w}") for w in range(W)]
+    for w in range(W):
+        for k in range(P):
+            s.add(Implies(active[w], exactly_one([X[w, k, p] for p in range(P)])))
+        for p in range(P):
+            s.add(at_most_one([X[w, k, p] for k in range(P)]))
+    # the periods are interchangeable: fix them in the first week
+    for k in range(P):
+        s.add(Implies(active[0], X[0, k, k]))
+    # a team plays n-1 = 2P-1 matches, so it is in every period once or twice
+    for t in range(n):
+        for p in range(P):
+            lits = [(X[w, k, p], 1) for w in range(W) for k in range(P) if t in weeks[w][k]]
+            s.add(PbLe(lits, 2))
+            s.add(Implies(And(active), PbGe(lits, 1)))
+    return s, X, active
+
+def assign_periods(weeks, budget, hint=None):
+    """Periods for fixed weeks: ("sat", sol, None), ("unsat", [], core weeks) or
+    ("unknown", [], None). hint[w][k] is a period for match k of week w that is
+    taken as it is if it is valid."""
+    W, P = len(weeks), len(weeks[0])
+    sol = [[None] * W for _ in range(P)]
+    if hint:
+        for w, week in enumerate(weeks):
+            for k, (i, j) in enumerate(week):
+                sol[hint[w][k]][w] = [i + 1, j + 1]
+        if all(sum(t in m for m in row) <= 2 for row in sol for t in range(1, 2 * P + 1)):
+            return "sat", sol, None
+
+    def check(s, lits):
+        s.set("timeout", budget.timeout_ms(cap_s=PERIODS_CAP_S))
+        return s.check(lits)
+
+    s, X, active = period_model(weeks)
+    res = check(s, active)
+    if res == sat:
+        m = s.model()
+        for (w, k, p), x in X.items():
+            if is_true(m.evaluate(x)):
+                sol[p][w] = [weeks[w][k][0] + 1, weeks[w][k][1] + 1]
+        return "sat", sol, None
+    if res != unsat:
+        return "unknown", [], None
+    s, _, active = period_model(weeks, "default")
+    core = list(range(W))
+    if check(s, active) == unsat:
+        core = [w for w in range(W) if any(eq(a, active[w]) for a in s.unsat_core())] or core
+        for w in list(core):
+            if budget.expired():
+                break
+            if check(s, [active[v] for v in core if v != w]) == unsat:
+                core.remove(w)
+    return "unsat", [], core
+
+class FactorizationMaster:
+    def __init__(self, n, z3_conf="default"):
+        self.n, self.W, _ = get_parameters(n)
+        n, W = self.n, self.W
+        self.s = z3_config.make_solver(z3_conf, 1, seed=42)
+        self.Y = {(i, j, w): Bool(f"y_{i}_{j}_w{w}") for i in range(n) for j in range(i + 1, n) for w in range(W)}
+        for i in range(n):
+            for j in range(i + 1, n):
+                self.s.add(exactly_one([self.Y[i, j, w] for w in range(W)]))
+        for t in range(n):
+            for w in range(W):
+                self.s.add(exactly_one([self.Y[min(t, o), max(t, o), w] for o in range(n) if o != t]))
+        for f in facts(n, "teams+weeks"):
+            if f[0] == "week":
+                self.s.add(self.Y[f[1], f[2], f[3]])
+        self.z = {}
+
+    def _used(self, matching):
+        # z_F: matching F is one of the weeks
+        if matching not in self.z:
+            z = self.z[matching] = Bool(f"z_{len(self.z)}")
+            for w in range(self.W):
+                self.s.add(Implies(And([self.Y[i, j, w] for i, j in matching]), z))
+        return self.z[matching]
+
+    def cut(self, matchings):
+        self.s.add(Or([Not(self._used(frozenset(F))) for F in matchings]))
+
+    def next(self, budget):
+        self.s.set("timeout", budget.timeout_ms())
+        res = self.s.check()
+        if res != sat:
+            return str(res), None
+        m = self.s.model()
+        weeks = [[] for _ in range(self.W)]
+        for (i, j, w), y in self.Y.items():
+            if is_true(m.evaluate(y)):
+                weeks[w].append((i, j))
+        return "sat", weeks
+
+def decompose(n, budget, z3_conf="default", log=print):
+    """Returns (status, sol, stats) with status sat, unsat or unknown."""
+    n, W, P = get_parameters(n)
+    stats = {"candidates": 0, "nogoods": 0, "repaired": 0, "skipped": 0, "master_s": 0.0, "periods_s": 0.0}
+    weeks, hint, master = circle_factorization(n), circle_periods(n), None
+    while True:
+        t0 = time.time()
+        res, sol, core = assign_periods(weeks, budget, hint)
+        if res == "unknown" and not budget.expired():
+            import LS_STS
+            s = LS_STS.repair(weeks, hint or [list(range(P))] * W, time_limit=budget.timeout_s(cap_s=REPAIR_CAP_S))
+            if s.cost == 0:
+                res, sol = "sat", s.to_sol()
+                stats["repaired"] += 1
+        stats["periods_s"] += time.time() - t0
+        stats["candidates"] += 1
+        if res == "sat":
+            return res, sol, stats
+        if budget.expired():
+            return "unknown", [], stats
+        if res == "unknown":
+            core = list(range(W))
+            stats["skipped"] += 1
+            log(f"[INFO] candidate {stats['candidates']}: periods unknown, skipped")
+        else:
+            log(f"[INFO] candidate {stats['candidates']}: no period assignment, nogood on {len(core)} weeks")
+        t0 = time.time()
+        master = master or FactorizationMaster(n, z3_conf)
+        master.cut([weeks[w] for w in core])
+        stats["nogoods"] += 1
+        res, weeks = master.next(budget)
+        hint = None
+        stats["master_s"] += time.time() - t0
+        if res != "sat":
+            return "unknown" if stats["skipped"] else res, [], stats
+
+def solve_decomposed(n, args):
+    n, W, P = get_parameters(n)
+    print(f"\n{'-'*80}\n[INFO] Solving STS-SAT for N = {n} teams by decomposition\n{'-'*80}")
+    budget = Budget(TIME_LIMIT_S)
+    with profiling.phase("solve"):
+        status, sol, stats = decompose(n, budget, args.z3_config)
+    profiling.record("master", stats["master_s"])
+    profiling.record("periods", stats["periods_s"])
+    elapsed = budget.seconds()
+    print(f"[INFO] {stats['candidates']} candidate factorization(s), {stats['nogoods']} nogood(s), "
+          f"{stats['repaired']} repaired by tabu search, {stats['skipped']} skipped, "
+          f"master {stats['master_s']:.2f}s, periods {stats['periods_s']:.2f}s")
+    key = result_key(args) + method_suffix(args)
+    if status == "sat":
+        print_solution(sol)
+    else:
+        print(f"[RESULT] {status.upper()} after {elapsed}s")
+    save_solution_json(n, "timeout" if status == "unknown" else status, elapsed, sol, key)
+
+# ----------------------------------------------------------------------------
+# Rolling horizon: weeks committed in blocks
+# ----------------------------------------------------------------------------
+# For large n the whole cube is too big. The weeks are committed in blocks of
+# `block` weeks (the last block takes what is left once at most 2 x block weeks
+# are). The state carried from block to block is
+#   - the rounds of a 1-factorization not played yet: a block picks one of them
+#     for each of its weeks, so the pairs left always form a 1-factorization
+#     (free pairings run into remaining graphs that cannot be split in weeks);
+#   - the period counts used[t][p] of the committed blocks: the block gets the
+#     capacities 2 - used[t][p]. As a team plays 2P-1 matches, it plays once in
+#     exactly one period, and every period has exactly two such teams; the
+#     choice d_t_p is shared by all the blocks.
+# Lookahead: once at most `lookahead` weeks follow the block, the rounds left
+# are also put in periods (week order does not matter for the counts), so a
+# block cannot leave a state without completion. Earlier blocks have no
+# lookahead, which is what keeps them small.
+# Each round comes with a hint period for every pair, and each block keeps as
+# many of them as the unsat cores allow, so it only moves the matches its
+# capacities force out. When the hints are a valid schedule no block deviates.
+# One Z3 session keeps a frame per committed block, fixed to its assignment.
+# When a block is UNSAT the session pops the block before it, forbids that
+# assignment and solves it again, going back at most `window` blocks from the
+# deepest failure and retrying a block at most `retries` times; past that the
+# attempt gives up (the search is not complete). Week 0 is the canonical
+# pairing with pair {i, n-1-i} in period i (teams+periods of symmetry.py).
+#
+# rolling_horizon() makes attempts until one succeeds or the budget runs out,
+# each with a fresh session and seed, over the rounds of
+#   1. the half split (n/2 odd) or the rotational schedule (n = 4 mod 12) of
+#      constructions.py, with its periods as hints;
+#   2. the circle method, with the periods of LS_STS as hints (valid when 3 does
+#      not divide n-1);
+#   3. then other factorizations: the circle rounds after n random Kempe swaps
+#      (the pairs of an alternating cycle of two weeks trade weeks), every pair
+#      keeping its circle period as a hint.
+# The teams and periods of every factorization are relabelled so that its first
+# round is the canonical week 0.
+def canonical_rounds(weeks, periods):
+    """weeks/periods relabelled so that week 0 has pair {i, n-1-i} in period i."""
+    n = 2 * len(weeks[0])
+    team, period = {}, {}
+    for i, ((a, b), p) in enumerate(sorted(zip(weeks[0], periods[0]), key=lambda m: m[1])):
+        team[a], team[b], period[p] = i, n - 1 - i, i
+    rounds = [[(min(team[a], team[b]), max(team[a], team[b])) for a, b in week] for week in weeks]
+    return rounds, [[period[p] for p in row] for row in periods]
+
+def kempe_shuffled(weeks, periods, rng, swaps):
+    """A 1-factorization `swaps` random Kempe swaps away from weeks; week 0 is left
+    as it is and every pair keeps its period."""
+    n, W = 2 * len(weeks[0]), len(weeks)
+    mate = [{} for _ in range(W)]
+    hint = {}
+    for w, (week, row) in enumerate(zip(weeks, periods)):
+        for (i, j), p in zip(week, row):
+            mate[w][i], mate[w][j], hint[i, j] = j, i, p
+    for _ in range(swaps):
+        w1, w2 = rng.sample(range(1, W), 2)
+        cycle = [rng.randrange(n)]
+        while True:
+            cycle.append(mate[w1][cycle[-1]])
+            if mate[w2][cycle[-1]] == cycle[0]:
+                break
+            cycle.append(mate[w2][cycle[-1]])
+        pairs = [(cycle[k], cycle[(k + 1) % len(cycle)]) for k in range(len(cycle))]
+        for k, (i, j) in enumerate(pairs):
+            w = w2 if k % 2 == 0 else w1
+            mate[w][i], mate[w][j] = j, i
+    weeks = [[(i, j) for i, j in sorted(m.items()) if i < j] for m in mate]
+    return weeks, [[hint[pair] for pair in week] for week in weeks]
+
+class RollingHorizon:
+    def __init__(self, n, block=2, window=2, lookahead=None, retries=5, z3_conf="default", seed=42,
+                 rounds=None, periods=None):
+        self.n, self.W, self.P = n, W, P = get_parameters(n)
+        self.window, self.retries = window, retries
+        self.lookahead = 4 * block if lookahead is None else lookahead
+        self.s = z3_config.make_solver(z3_conf, 1, seed=seed)
+        self.D = {(t, p): Bool(f"d_{t}_p{p}") for t in range(n) for p in range(P)}
+        for t in range(n):
+            self.s.add(exactly_one([self.D[t, p] for p in range(P)]))
+        for p in range(P):
+            self.s.add(PbEq([(self.D[t, p], 1) for t in range(n)], 2))
+        self.plan, w = [], 0                        # (first week, weeks) of each block
+        while w < W:
+            size = W - w if W - w <= 2 * block else block
+            self.plan.append((w, size))
+            w += size
+        # the 1-factorization and the hint periods, circle method by default
+        self.rounds = rounds or circle_factorization(n)
+        self.periods = periods or circle_periods(n)
+        self.committed = []                         # true variables of each committed block
+        self.nogoods = [[] for _ in self.plan]
+        self.stats = {"blocks": len(self.plan), "checks": 0, "backtracks": 0}
+
+    def _state(self):
+        played, used = set(), [[0] * self.P for _ in range(self.n)]
+        for assignment in self.committed:
+            for i, j, w, p in assignment:
+                played.add((i, j))
+                used[i][p] += 1
+                used[j][p] += 1
+        return played, used
+
+    def _solve_block(self, b, budget):
+        n, P = self.n, self.P
+        w0, size = self.plan[b]
+        weeks = range(w0, w0 + size)
+        last = w0 + size == self.W
+        played, used = self._state()
+        rounds = [r for r, pairs in enumerate(self.rounds) if pairs[0] not in played]
+        M = {(i, j, w, p): Bool(f"m_{i}_{j}_w{w}_p{p}")
+             for r in rounds for i, j in self.rounds[r] for w in weeks for p in range(P)}
+        U = {(w, r): Bool(f"u_w{w}_r{r}") for w in weeks for r in rounds}
+        s = self.s
+        s.push()
+        for w in weeks:
+            s.add(exactly_one([U[w, r] for r in rounds]))
+            for r in rounds:
+                for i, j in self.rounds[r]:
+                    s.add(PbEq([(M[i, j, w, p], 1) for p in range(P)] + [(Not(U[w, r]), 1)], 1))
+            for p in range(P):
+                s.add(exactly_one([M[i, j, w, p] for r in rounds for i, j in self.rounds[r]]))
+        for r in rounds:
+            lits = [U[w, r] for w in weeks]
+            s.add(exactly_one(lits) if last else at_most_one(lits))
+        # lookahead: R puts the pairs of the rounds left after the block in periods
+        left = self.W - w0 - size
+        after = [(i, j) for r in rounds for i, j in self.rounds[r]] if 0 < left <= self.lookahead else []
+        R = {(i, j, p): Bool(f"r_{i}_{j}_b{b}_p{p}") for i, j in after for p in range(P)}
+        for i, j in after:
+            s.add(exactly_one([R[i, j, p] for p in range(P)] + [M[i, j, w, p] for w in weeks for p in range(P)]))
+        if after:
+            for r in rounds:
+                for p in range(P):
+                    s.add(exactly_one([R[i, j, p] for i, j in self.rounds[r]] + [U[w, r] for w in weeks]))
+        here = {(t, p): [(self.D[t, p], 1)] for t in range(n) for p in range(P)}
+        for (i, j, *_, p), x in list(M.items()) + list(R.items()):
+            here[i, p].append((x, 1))
+            here[j, p].append((x, 1))
+        for (t, p), terms in here.items():
+            s.add(PbLe(terms, 2 - used[t][p]))
+        if w0 == 0:
+            for i in range(P):
+                s.add(M[i, n - 1 - i, 0, i])
+        for assignment in self.nogoods[b]:
+            s.add(Or([Not(M[k]) for k in assignment]))
+        # keep as many slots of the circle method as the cores allow
+        kept = [U[w, w] for w in weeks if w in rounds]
+        kept += [M[i, j, w, self.periods[w][k]] for w in weeks if w in rounds for k, (i, j) in enumerate(self.rounds[w])]
+        while True:
+            s.set("timeout", budget.timeout_ms())
+            self.stats["checks"] += 1
+            res = s.check(*kept)
+            core = {str(x) for x in s.unsat_core()} if res == unsat else set()
+            if not core:
+                break
+            kept = [x for x in kept if str(x) not in core]
+        if res != sat:
+            s.pop()
+            return str(res)
+        m = s.model()
+        assignment = [k for k, x in M.items() if is_true(m.evaluate(x))]
+        s.add([M[k] for k in assignment])
+        self.committed.append(assignment)
+        return "sat"
+
+    def solve(self, budget):
+        """Returns (status, sol) with status sat or unknown."""
+        b, deepest = 0, 0
+        while b < len(self.plan):
+            if budget.expired():
+                return "unknown", []
+            res = self._solve_block(b, budget)
+            if res == "sat":
+                b += 1
+                continue
+            if res != "unsat":
+                return "unknown", []
+            deepest = max(deepest, b)
+            self.nogoods[b] = []
+            # go back to the previous block, unless it is out of the window or
+            # has been retried too often
+            while b > 0:
+                b -= 1
+                self.s.pop()
+                self.nogoods[b].append(self.committed.pop())
+                self.stats["backtracks"] += 1
+                if b < deepest - self.window:
+                    return "unknown", []
+                if len(self.nogoods[b]) <= self.retries:
+                    break
+                self.nogoods[b] = []
+            else:
+                return "unknown", []
+        sol = [[None] * self.W for _ in range(self.P)]
+        for assignment in self.committed:
+            for i, j, w, p in assignment:
+                sol[p][w] = [i + 1, j + 1]
+        return "sat", sol
+
+def rolling_horizon(n, budget, block=2, window=2, lookahead=None, retries=5, z3_conf="default", seed=42,
+                    log=print):
+    """Returns (status, sol, stats) with status sat or unknown."""
+    n, W, P = get_parameters(n)
+    rng = random.Random(seed)
+    stats = {"attempts": 0, "checks": 0, "backtracks": 0}
+    circle = ("circle", circle_factorization(n), circle_periods(n))
+    candidates = [circle]
+    schedule = half_split(n, rng) if (n // 2) % 2 else rotational(n, rng)
+    if schedule is not None:
+        candidates.insert(0, ("constructed", [[tuple(sorted(m)) for m in week] for week in schedule],
+                              [list(range(P)) for _ in range(W)]))
+    while not budget.expired():
+        if stats["attempts"] < len(candidates):
+            name, weeks, periods = candidates[stats["attempts"]]
+        else:
+            name, (weeks, periods) = "shuffled", kempe_shuffled(circle[1], circle[2], rng, n)
+        rh = RollingHorizon(n, block, window, lookahead, retries, z3_conf, seed + stats["attempts"],
+                            *canonical_rounds(weeks, periods))
+        stats["attempts"] += 1
+        status, sol = rh.solve(budget)
+        stats["blocks"] = rh.stats["blocks"]
+        stats["checks"] += rh.stats["checks"]
+        stats["backtracks"] += rh.stats["backtracks"]
+        if status == "sat":
+            return status, sol, stats
+        log(f"[INFO] attempt {stats['attempts']} ({name} rounds) gave up after {budget.seconds()}s")
+    return "unknown", [], stats
+
+def solve_rolling(n, args):
+    n, W, P = get_parameters(n)
+    print(f"\n{'-'*80}\n[INFO] Solving STS-SAT for N = {n} teams by rolling horizon "
+          f"(blocks of {args.block} weeks, window {args.window})\n{'-'*80}")
+    budget = Budget(TIME_LIMIT_S)
+    with profiling.phase("solve"):
+        status, sol, stats = rolling_horizon(n, budget, args.block, args.window, args.lookahead,
+                                             z3_conf=args.z3_config, seed=42 if args.seed is None else args.seed)
+    elapsed = budget.seconds()
+    print(f"[INFO] {stats['attempts']} attempt(s), {stats['blocks']} blocks, {stats['checks']} checks, "
+          f"{stats['backtracks']} backtracks")
+    key = result_key(args) + method_suffix(args)
+    if status == "sat":
+        print_solution(sol)
+    else:
+        print(f"[RESULT] UNKNOWN after {elapsed}s")
+    save_solution_json(n, "sat" if status == "sat" else "timeout", elapsed, sol, key)
+
+def method_fingerprint(args):
+    """Sweep fingerprint of --decompose and --rolling. They never solve the model
+    of build_solver, so the code of the functions they run stands in for it."""
+    import LS_STS, constructions
+    encodings = inspect.getmodule(exactly_one)
+    if args.decompose:
+        code = (decompose, assign_periods, period_model, FactorizationMaster, LS_STS)
+        parts = ("decomp", PERIODS_CONFIG, PERIODS_CAP_S, REPAIR_CAP_S)
+    else:
+        code = (rolling_horizon, RollingHorizon, canonical_rounds, kempe_shuffled, constructions)
+        parts = ("rolling", args.block, args.window, args.lookahead)
+    code += (circle_factorization, circle_periods, encodings)
+    return fingerprint(*(inspect.getsource(c) for c in code), *parts)
 
 # ----------------------------------------------------------------------------
 # CLI Argument Parsing
 # ----------------------------------------------------------------------------
-parser = argparse.ArgumentParser(
-    description="SAT (Z3) decision solver for the Sports Timetable Scheduling (STS) problem"
-)
-parser.add_argument('N', type=int, nargs='?',
-                    help='even number of teams (single instance)')
-parser.add_argument('-a', '--automatic', action='store_true',
-                    help='solve N = 4,6,...,14 in batch')
-parser.add_argument('-o', '--optimise', action='store_true',
-                    help='[ignored] optimization handled by MIP script')
-parser.add_argument('--no-sb', action='store_true',
-                    help='disable row/column symmetry-breaking clauses')
-args = parser.parse_args()
-
-if args.optimise:
-    print('[INFO] -o/--optimise ignored: SAT model is decision-only.')
-
-# ----------------------------------------------------------------------------
-# Driver
-# ----------------------------------------------------------------------------
-if args.automatic:
-    for n in range(4, 15, 2):
-        solve_instance(n)
-else:
-    if args.N is None:
-        parser.error("Positional N required unless -a is used.")
-    solve_instance(args.N)
+def main():
+    parser = argparse.ArgumentParser(
+        description="SAT (Z3) decision solver for the Sports Timetable Scheduling (STS) problem"
+    )
+    parser.add_argument('N', type=int, nargs='?',
+                        help='even number of teams (single instance)')
+    parser.add_argument('-a', '--automatic', action='store_true',
+                        help='solve N = 4,6,...,14 in batch')
+    parser.add_argument('-o', '--optimise', action='store_true',
+                        help='[ignored] optimization handled by MIP script')
+    parser.add_argument('--no-sb', action='store_true',
+                        help='disable row/column symmetry-breaking clauses')
+    parser.add_argument('--symmetry', metavar='SET',
+                        help='use a set of the shared symmetry library instead, e.g. teams+weeks or full')
+    parser.add_argument('--cubes', action='store_true',
+                        help='cube-and-conquer: split on the first periods of a week and solve the cubes in parallel')
+    parser.add_argument('--cube-depth', type=int, default=2, metavar='D',
+                        help='number of periods fixed by each cube (default: 2)')
+    parser.add_argument('--workers', type=int, default=None, metavar='K',
+                        help='worker processes for --cubes (default: number of CPUs)')
+    parser.add_argument('--decompose', action='store_true',
+                        help='search the weeks and the periods separately, with nogoods from failed period assignments')
+    parser.add_argument('--rolling', action='store_true',
+                        help='rolling horizon: commit the weeks in blocks, backtracking over a limited window')
+    parser.add_argument('--block', type=int, default=2, metavar='B',
+                        help='weeks per block for --rolling (default: 2)')
+    parser.add_argument('--window', type=int, default=2, metavar='K',
+                        help='blocks --rolling may go back from the deepest failure (default: 2)')
+    parser.add_argument('--lookahead', type=int, default=None, metavar='L',
+                        help='weeks after a block checked for completion by --rolling (default: 4 x B)')
+    parser.add_argument('--resume', action='store_true',
+                        help='with --cubes, skip the cubes logged as UNSAT by a previous run')
+    parser.add_argument('--force', action='store_true',
+                        help='with -a, re-run instances that already have a valid optimal result')
+    z3_config.add_arguments(parser)
+    governor.add_arguments(parser)
+    args = parser.parse_args()
+    limits = governor.limits_from_args(parser, args)
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.decompose + args.rolling + args.cubes > 1:
+        parser.error("--cubes, --decompose and --rolling cannot be combined")
+    if args.block < 1 or args.window < 0 or (args.lookahead or 0) < 0:
+        parser.error("--block must be >= 1, --window and --lookahead >= 0")
+
+    if args.optimise:
+        print('[INFO] -o/--optimise ignored: SAT model is decision-only.')
+
+    # ------------------------------------------------------------------------
+    # Driver
+    # ------------------------------------------------------------------------
+    if args.automatic:
+        sweep = Sweep("SAT", force=args.force)
+        for n in range(4, 15, 2):
+            key = result_key(args) + method_suffix(args)
+            if args.decompose or args.rolling:
+                fp = method_fingerprint(args)
+            else:
+                fp = fingerprint(build_solver(n, args)[0].sexpr(), args.cubes and args.cube_depth)
+            if not sweep.should_run(result_path(n), key, fp):
+                continue
+            governor.run_job("SAT", n, key, result_path(n), limits, solve_instance, n, args, profile=args.profile)
+            sweep.record(result_path(n), key, fp)
+    else:
+        if args.N is None:
+            parser.error("Positional N required unless -a is used.")
+        key = result_key(args) + method_suffix(args)
+        governor.run_job("SAT", args.N, key, result_path(args.N), limits, solve_instance, args.N, args,
+                         profile=args.profile)
+
+if __name__ == "__main__":
+    main()
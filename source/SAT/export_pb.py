@@ -0,0 +1,205 @@
+import os, sys, argparse
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from symmetry import facts, parse_set
+
+# ----------------------------------------------------------------------------
+# WCNF (MaxSAT) and OPB (pseudo-Boolean) export of the STS optimisation problem
+# ----------------------------------------------------------------------------
+# Variables (1-based DIMACS numbers):
+#   m[i,j,w,p]  pair i < j plays in week w, period p   (same cube as SAT_STS)
+#   h[i,j]      i plays at home against j
+#   y[t,k]      team t plays at least k home games     (k = 1..n-1)
+# The imbalance of t is f(H) = |2H - (n-1)| with H = sum_k y[t,k]. f falls by 2
+# for every k <= (n-2)/2, is flat at k = n/2 and rises by 2 above, so
+#   f(H) = 1 + sum_{k < n/2} 2 [not y[t,k]] + sum_{k > n/2} 2 [y[t,k]]
+# and the objective is n + sum of those terms: weight-2 soft unit clauses in
+# WCNF, a linear objective in OPB.
+
+class Formula:
+    def __init__(self):
+        self.nvars = 0
+        self.clauses = []          # hard clauses, lists of ints
+        self.pbs = []              # (terms [(coef, lit)], op, rhs), op in ">=", "="
+        self.soft = []             # (weight, lit)
+
+    def new_var(self):
+        self.nvars += 1
+        return self.nvars
+
+    # -- cardinality, used as clauses (WCNF) or as a linear row (OPB) --------
+    def at_most(self, lits, k, cnf):
+        if cnf:
+            self._seq_counter(lits, k)
+        else:
+            self.pbs.append(([(-1, l) for l in lits], ">=", -k))
+
+    def exactly(self, lits, k, cnf):
+        if cnf:
+            if k == 1:
+                self.clauses.append(list(lits))
+                self._seq_counter(lits, 1)
+            else:
+                raise ValueError("only exactly-one is needed in CNF")
+        else:
+            self.pbs.append(([(1, l) for l in lits], "=", k))
+
+    def _seq_counter(self, lits, k):
+        # Sinz' sequential counter: s[i][c] <=> at least c+1 of lits[:i+1]
+        n = len(lits)
+        if n <= k:
+            return
+        s = [[self.new_var() for _ in range(k)] for _ in range(n - 1)]
+        self.clauses.append([-lits[0], s[0][0]])
+        for c in range(1, k):
+            self.clauses.append([-s[0][c]])
+        for i in range(1, n - 1):
+            self.clauses.append([-lits[i], s[i][0]])
+            self.clauses.append([-s[i - 1][0], s[i][0]])
+            for c in range(1, k):
+                self.clauses.append([-lits[i], -s[i - 1][c - 1], s[i][c]])
+                self.clauses.append([-s[i - 1][c], s[i][c]])
+            self.clauses.append([-lits[i], -s[i - 1][k - 1]])
+        self.clauses.append([-lits[n - 1], -s[n - 2][k - 1]])
+
+    def totalizer(self, lits):
+        """Outputs y[0..len-1] with y[k] <=> at least k+1 of lits are true."""
+        if len(lits) == 1:
+            return list(lits)
+        mid = len(lits) // 2
+        a, b = self.totalizer(lits[:mid]), self.totalizer(lits[mid:])
+        out = [self.new_var() for _ in range(len(lits))]
+        for i in range(len(a) + 1):
+            for j in range(len(b) + 1):
+                # a >= i and b >= j  =>  out >= i + j
+                if i + j > 0:
+                    self.clauses.append(([-a[i - 1]] if i else []) + ([-b[j - 1]] if j else []) + [out[i + j - 1]])
+                # a < i+1 and b < j+1  =>  out < i + j + 1
+                if i + j < len(out):
+                    self.clauses.append(([a[i]] if i < len(a) else []) + ([b[j]] if j < len(b) else [])
+                                        + [-out[i + j]])
+        return out
+
+# ----------------------------------------------------------------------------
+# The STS optimisation model
+# ----------------------------------------------------------------------------
+def build_formula(n, cnf, symmetry=None):
+    if n % 2:
+        raise ValueError("N must be even")
+    W, P = n - 1, n // 2
+    f = Formula()
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    m = {(i, j, w, p): f.new_var() for i, j in pairs for w in range(W) for p in range(P)}
+    h = {(i, j): f.new_var() for i, j in pairs}
+    pair = lambda t, o: (min(t, o), max(t, o))
+
+    for i, j in pairs:
+        f.exactly([m[(i, j, w, p)] for w in range(W) for p in range(P)], 1, cnf)
+    for w in range(W):
+        for p in range(P):
+            f.exactly([m[(i, j, w, p)] for i, j in pairs], 1, cnf)
+    for t in range(n):
+        for w in range(W):
+            f.exactly([m[pair(t, o) + (w, p)] for o in range(n) if o != t for p in range(P)], 1, cnf)
+        for p in range(P):
+            f.at_most([m[pair(t, o) + (w, p)] for o in range(n) if o != t for w in range(W)], 2, cnf)
+
+    if symmetry:
+        for fact in facts(n, symmetry):
+            if fact[0] == "week":
+                _, i, j, w = fact
+                f.clauses.append([m[(i, j, w, p)] for p in range(P)])
+            else:
+                w = fact[1]
+                for p in range(P - 1):
+                    for k in range(1, n - 1):
+                        lits = [m[(i, j, w, p)] for i, j in pairs if i >= k] + \
+                               [m[(i, j, w, p + 1)] for i, j in pairs if i < k]
+                        f.at_most(lits, 1, cnf)
+
+    # home counts and the objective
+    for t in range(n):
+        home = [h[(t, o)] if t < o else -h[(o, t)] for o in range(n) if o != t]
+        if cnf:
+            ys = f.totalizer(home)
+        else:
+            ys = [f.new_var() for _ in range(n - 1)]
+            # sum(home) - sum(y) = 0 with y ordered, where not x = 1 - x
+            negs = sum(1 for l in home if l < 0)
+            f.pbs.append(([(1 if l > 0 else -1, abs(l)) for l in home] + [(-1, v) for v in ys], "=", -negs))
+            for k in range(n - 2):
+                f.pbs.append(([(1, ys[k]), (-1, ys[k + 1])], ">=", 0))
+        for k, v in enumerate(ys, start=1):
+            if k != n // 2:
+                f.soft.append((2, v) if k < n // 2 else (2, -v))
+    return f, m, h
+
+# ----------------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------------
+def write_wcnf(f, path):
+    top = sum(w for w, _ in f.soft) + 1
+    with open(path, "w") as out:
+        out.write(f"p wcnf {f.nvars} {len(f.clauses) + len(f.soft)} {top}\n")
+        for c in f.clauses:
+            out.write(f"{top} " + " ".join(map(str, c)) + " 0\n")
+        for w, l in f.soft:
+            out.write(f"{w} {l} 0\n")
+
+def _opb_term(coef, lit):
+    return f"{coef:+d} x{lit}"
+
+def write_opb(f, path):
+    # soft clause (w, l) costs w when l is false: w*(1 - x) for l = x, w*x for l = -x
+    obj = [(-w, l) if l > 0 else (w, -l) for w, l in f.soft]
+    with open(path, "w") as out:
+        out.write(f"* #variable= {f.nvars} #constraint= {len(f.pbs)}\n")
+        out.write("min: " + " ".join(_opb_term(c, v) for c, v in obj) + " ;\n")
+        for terms, op, rhs in f.pbs:
+            out.write(" ".join(_opb_term(c, v) for c, v in terms) + f" {op} {rhs} ;\n")
+
+def opb_constant(f):
+    """Soft cost = OPB objective + opb_constant(f)."""
+    return sum(w for w, l in f.soft if l > 0)
+
+def decode(model, m, h, n):
+    """Schedule from a set of true DIMACS variables."""
+    W, P = n - 1, n // 2
+    sol = [[None for _ in range(W)] for _ in range(P)]
+    for (i, j, w, p), v in m.items():
+        if v in model:
+            sol[p][w] = [i + 1, j + 1] if h[(i, j)] in model else [j + 1, i + 1]
+    return sol
+
+def imbalance(sol, n):
+    home, away = [0] * (n + 1), [0] * (n + 1)
+    for row in sol:
+        for a, b in row:
+            home[a] += 1; away[b] += 1
+    return sum(abs(home[t] - away[t]) for t in range(1, n + 1))
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the STS home/away optimisation problem as WCNF (MaxSAT) or OPB (pseudo-Boolean)"
+    )
+    parser.add_argument("N", type=int, help="even number of teams")
+    parser.add_argument("--format", choices=("wcnf", "opb"), default="wcnf", help="output format (default: wcnf)")
+    parser.add_argument("--symmetry", metavar="SET", help="add a set of the shared symmetry library")
+    parser.add_argument("-o", "--out", help="output file (default: n<N>.<format>)")
+    args = parser.parse_args()
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+
+    f, _, _ = build_formula(args.N, args.format == "wcnf", args.symmetry)
+    path = args.out or f"n{args.N}.{args.format}"
+    (write_wcnf if args.format == "wcnf" else write_opb)(f, path)
+    print(f"✔ {args.format.upper()} written to {path} ({f.nvars} variables)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import os, re, json, time, shutil, signal, shlex, argparse, tempfile, subprocess
+
+from export_pb import build_formula, write_wcnf, write_opb, decode, imbalance, parse_set
+from solution_checker import check_solution
+
+# ----------------------------------------------------------------------------
+# Run an external MaxSAT / pseudo-Boolean solver on the exported problem
+# ----------------------------------------------------------------------------
+# The solver is any command line containing {file}; its output must follow the
+# MaxSAT / PB competition conventions ("s ..." status, "o ..." cost and "v ..."
+# model lines, the model either as literals or as a 0/1 string). At the time
+# limit the solver gets SIGTERM, which makes most of them print the best model
+# found so far. A model that does not decode to a valid schedule (e.g. a
+# truncated "v" line) is dropped, as if the solver had printed none.
+
+TIME_LIMIT_S = 300
+GRACE_S = 5
+RES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "res", "SAT")
+DEFAULT_SOLVERS = {"wcnf": "open-wbo {file}", "opb": "roundingsat {file}"}
+
+def run_solver(cmd, path, time_limit):
+    argv = [a.replace("{file}", path) for a in shlex.split(cmd)]
+    proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        out, _ = proc.communicate(timeout=time_limit)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            out, _ = proc.communicate(timeout=GRACE_S)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            out, _ = proc.communicate()
+        timed_out = True
+    return out, timed_out
+
+def parse_output(out, nvars):
+    """(status, set of true variables) from the solver output."""
+    status, model = "UNKNOWN", None
+    for line in out.splitlines():
+        if line.startswith("s "):
+            status = line[2:].strip()
+        elif line.startswith("v "):
+            tokens = line[2:].split()
+            if model is None:
+                model = set()
+            if len(tokens) == 1 and re.fullmatch(r"[01]+", tokens[0]) and len(tokens[0]) >= nvars:
+                model = {i + 1 for i, c in enumerate(tokens[0]) if c == "1"}
+                continue
+            for tok in tokens:
+                neg = tok.startswith("-")
+                tok = tok.lstrip("-").lstrip("x")
+                if tok.isdigit() and int(tok) and not neg:
+                    model.add(int(tok))
+    return status, model
+
+def valid(sol):
+    return all(all(row) for row in sol) and check_solution(sol, None, 0, True) == "Valid solution"
+
+def save_solution_json(n, key, entry):
+    os.makedirs(RES_DIR, exist_ok=True)
+    path = os.path.join(RES_DIR, f"n{n}.json")
+    data = json.load(open(path)) if os.path.isfile(path) else {}
+    data[key] = entry
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    print(f"✔ {key} written to {path}")
+
+def solve_instance(n, fmt, cmd, time_limit=TIME_LIMIT_S, symmetry=None, name=None):
+    print(f"\n{'-'*80}\n[INFO] Solving STS-{fmt.upper()} for N = {n} teams with `{cmd}`\n{'-'*80}")
+    f, m, h = build_formula(n, fmt == "wcnf", symmetry)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"n{n}.{fmt}")
+        (write_wcnf if fmt == "wcnf" else write_opb)(f, path)
+        t0 = time.time()
+        out, timed_out = run_solver(cmd, path, time_limit)
+        elapsed = time.time() - t0
+    status, model = parse_output(out, f.nvars)
+    print(f"[RESULT] {status} after {elapsed:.1f}s{' (time limit)' if timed_out else ''}")
+
+    optimal = status == "OPTIMUM FOUND" and not timed_out
+    sol, obj = decode(model, m, h, n) if model else [], None
+    if status == "UNSATISFIABLE":
+        sol, optimal = [], True
+    elif sol and valid(sol):
+        obj = imbalance(sol, n)
+        print(f"[RESULT] total_imbalance = {obj}")
+    else:
+        print("[WARN] the solver's model is not a valid schedule" if sol else
+              "[WARN] the solver printed no model (v lines)")
+        sol, optimal = [], False
+    name = name or os.path.basename(shlex.split(cmd)[0])
+    key = ("MaxSAT" if fmt == "wcnf" else "PB") + f"_{name}_opt" + (f"_sym-{symmetry}" if symmetry else "")
+    save_solution_json(n, key, {
+        "time": int(elapsed) if optimal else time_limit,
+        "optimal": optimal,
+        "obj": obj,
+        "sol": sol,
+    })
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve the STS home/away optimisation with an external MaxSAT or PB solver"
+    )
+    parser.add_argument("N", type=int, nargs="?", help="even number of teams")
+    parser.add_argument("-a", "--automatic", action="store_true", help="solve N = 6,8,...,14 in batch")
+    parser.add_argument("--format", choices=("wcnf", "opb"), default="wcnf", help="problem format (default: wcnf)")
+    parser.add_argument("--solver", metavar="CMD",
+                        help="solver command line with {file} for the problem, "
+                             f"default: '{DEFAULT_SOLVERS['wcnf']}' or '{DEFAULT_SOLVERS['opb']}'")
+    parser.add_argument("--name", help="solver name in the result key (default: the command's basename)")
+    parser.add_argument("--symmetry", metavar="SET", help="add a set of the shared symmetry library")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit in s (default: {TIME_LIMIT_S})")
+    args = parser.parse_args()
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+    cmd = args.solver or DEFAULT_SOLVERS[args.format]
+    if "{file}" not in cmd:
+        parser.error("--solver must contain {file}")
+    if shutil.which(shlex.split(cmd)[0]) is None:
+        parser.error(f"solver binary not found: {shlex.split(cmd)[0]}")
+
+    if args.automatic:
+        for n in range(6, 15, 2):
+            solve_instance(n, args.format, cmd, args.time_limit, args.symmetry, args.name)
+    else:
+        if args.N is None:
+            parser.error("Positional N required unless -a is used.")
+        solve_instance(args.N, args.format, cmd, args.time_limit, args.symmetry, args.name)
+
+if __name__ == "__main__":
+    main()
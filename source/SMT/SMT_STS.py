@@ -1,7 +1,15 @@
-import os, time, json, argparse, resource, gc, random
+import os, sys, time, json, argparse, resource, random
 from z3 import *
 from constraints import *
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from symmetry import add_z3_constraints, add_z3_pair_constraints, parse_set
+from sweep import Sweep, fingerprint
+import z3_config
+import governor
+import profiling
+from budget import Budget, TIME_LIMIT_S
+
 # ----------------------------------------------------------------------------
 # Parameters & variables
 # ----------------------------------------------------------------------------
@@ -19,10 +27,20 @@ def build_variables(n, W, P):
 # Helpers
 # ----------------------------------------------------------------------------
 def extract_solution(model, M, W, P):
-    sol = [[None for _ in range(W)] for _ in range(P)]
-    for (i, j, w, p), v in M.items():
-        if is_true(model.evaluate(v)):
-            sol[p][w] = [i + 1, j + 1]
+    with profiling.phase("decode"):
+        sol = [[None for _ in range(W)] for _ in range(P)]
+        for (i, j, w, p), v in M.items():
+            if is_true(model.evaluate(v)):
+                sol[p][w] = [i + 1, j + 1]
+    return sol
+
+def extract_pair_solution(model, V, W, P):
+    with profiling.phase("decode"):
+        sol = [[None for _ in range(W)] for _ in range(P)]
+        ev = lambda x: model.evaluate(x, model_completion=True)
+        for (i, j) in V["week"]:
+            w, p = ev(V["week"][(i, j)]).as_long(), ev(V["period"][(i, j)]).as_long()
+            sol[p][w] = [i + 1, j + 1] if is_true(ev(V["home"][(i, j)])) else [j + 1, i + 1]
     return sol
 
 def print_solution(sol_matrix):
@@ -30,14 +48,18 @@ def print_solution(sol_matrix):
     for row in sol_matrix:
         print(row)
 
-def seconds_since(t0):
-    # Restituisce i secondi interi trascorsi
-    return int(time.time() - t0)
-
 # ----------------------------------------------------------------------------
 # JSON persistence
 # ----------------------------------------------------------------------------
-def save_solution_json(n, status, runtime_s, sol, *, optimise=False, obj_val=None):
+def result_path(n):
+    return os.path.join("../../res/SMT", f"n{n}.json")
+
+def result_suffix(args):
+    return ("" if args.encoding == "bool" else f"_{args.encoding}") \
+        + (f"_sym-{args.symmetry}" if args.symmetry else "") \
+        + z3_config.config_suffix(args.z3_config, args.threads)
+
+def save_solution_json(n, status, runtime_s, sol, *, optimise=False, obj_val=None, key_suffix=""):
     # time_val in secondi interi
     time_val = 300 if status == 'timeout' else runtime_s
     optimal = (status in ('sat','unsat'))
@@ -47,21 +69,48 @@ def save_solution_json(n, status, runtime_s, sol, *, optimise=False, obj_val=Non
         "obj": obj_val if optimise else None,
         "sol": sol
     }
-    out_dir = "../../res/SMT"
-    os.makedirs(out_dir, exist_ok=True)
-    path = os.path.join(out_dir, f"n{n}.json")
-    data = json.load(open(path)) if os.path.isfile(path) else {}
-    key = "SMT_opt" if optimise else "SMT_dec"
-    data[key] = entry
-    with open(path, 'w') as f:
-        json.dump(data, f, indent=2)
+    path = result_path(n)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    key = ("SMT_opt" if optimise else "SMT_dec") + key_suffix
+    with profiling.phase("write"):
+        data = json.load(open(path)) if os.path.isfile(path) else {}
+        data[key] = entry
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
     print(f"✔ {key} written to {path}")
 
 # ----------------------------------------------------------------------------
-# SMT-LIB2 export (check-sat only)
+# SMT-LIB2 export
 # ----------------------------------------------------------------------------
-def export_to_smtlib2(solver, filename: str):
-    smt_text = "(set-logic QF_LIA)\n" + solver.to_smt2()
+# The decision model ends with (check-sat) (get-model). The optimisation model
+# either uses (minimize ...) (z3, OptiMathSAT) or, portably, tightens the bound
+# on the objective in push/pop scopes, from the trivial upper bound down to n.
+SMT2_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "res", "SMT", "smt2")
+
+def smtlib2_logic(args):
+    # the bv encoding still counts with Int sums
+    return "ALL" if args.encoding == "bv" else "QF_LIA"
+
+def smtlib2_text(solver, logic: str = "QF_LIA"):
+    """Declarations and assertions, without any command."""
+    return f"(set-option :produce-models true)\n(set-logic {logic})\n" + solver.sexpr()
+
+def smtlib2_path(n, optimise, sfx):
+    os.makedirs(SMT2_DIR, exist_ok=True)
+    return os.path.join(SMT2_DIR, f"n{n}_{'opt' if optimise else 'dec'}{sfx}.smt2")
+
+def export_to_smtlib2(solver, filename: str, logic: str = "QF_LIA", objective=None,
+                      style: str = "bounds", bounds=()):
+    smt_text = smtlib2_text(solver, logic)
+    if objective is None:
+        smt_text += "(check-sat)\n(get-model)\n"
+    elif style == "minimize":
+        smt_text += f"(minimize {objective.sexpr()})\n(check-sat)\n(get-objectives)\n(get-model)\n"
+    else:
+        smt_text += "(check-sat)\n(get-model)\n"
+        for k in bounds:
+            smt_text += (f"(push 1)\n(assert (<= {objective.sexpr()} {k}))\n"
+                         "(check-sat)\n(get-model)\n(pop 1)\n")
     with open(filename, 'w') as f:
         f.write(smt_text)
     print(f"✔ SMT-LIB2 written to {filename}")
@@ -69,32 +118,76 @@ def export_to_smtlib2(solver, filename: str):
 # ----------------------------------------------------------------------------
 # Core solving routine
 # ----------------------------------------------------------------------------
-def solve_instance(n: int, args, *, optimise: bool = False):
+def build_pair_model(s, n, W, P, args):
+    week, period = build_pair_variables(n, W, P, args.encoding)
+    constraint_pair_domains(s, week, period, W, P)
+    constraint_pair_team_weeks_distinct(s, week, n)
+    constraint_pair_slots_distinct(s, week, period, P)
+    constraint_pair_slot_counts(s, week, period, W, P)
+    constraint_pair_at_most_two_per_period(s, period, n, P)
+    # symmetry-breaking if enabled: by default the canonical first week
+    if args.symmetry:
+        add_z3_pair_constraints(s, week, period, n, args.symmetry)
+    elif not args.no_sb:
+        add_z3_pair_constraints(s, week, period, n, "teams")
+    home = {k: Bool(f"h_{k[0]}_{k[1]}") for k in week}
+    return {"week": week, "period": period, "home": home}
+
+def solver_seed(args, optimise: bool = False):
+    """Z3 seed of build_solver: --seed, else 42 for the decision version and none
+    when optimising."""
+    seed = getattr(args, "seed", None)
+    return 42 if seed is None and not optimise else seed
+
+def build_solver(n: int, args, *, optimise: bool = False):
     n, W, P = get_parameters(n)
-    print(f"\n{'-'*80}\n[INFO] Solving STS-SMT | N = {n} | optimise = {optimise}\n{'-'*80}")
+    s = z3_config.make_solver(args.z3_config, args.threads, timeout_ms=300_000, seed=solver_seed(args, optimise))
+    if args.encoding != "bool":
+        return s, build_pair_model(s, n, W, P, args)
     M = build_variables(n, W, P)
-    s = Solver(); s.set("timeout",300_000)
-    if not optimise:
-        seed = 42; s.set("random_seed",seed)
-        print(f"[INFO] Decision mode seed = {seed}")
     # core constraints
     constraint_each_pair_once_smt(s,M,n,W,P)
     constraint_one_match_per_slot_smt(s,M,n,W,P)
     constraint_team_once_per_week_smt(s,M,n,W,P)
     constraint_at_most_two_per_period_smt(s,M,n,W,P)
     # symmetry-breaking if enabled
-    if not args.no_sb:
+    if args.symmetry:
+        add_z3_constraints(s,M,n,W,P,args.symmetry,pb=False)
+    elif not args.no_sb:
         simple_rowcol_lex(s,M,n,W,P)
-    # optional objective var
-    if optimise:
-        total_imbalance = add_total_home_away_imbalance_expr(s,M,n)
-        LB = n
+    return s, M
+
+def solve_instance(n: int, args, *, optimise: bool = False):
+    n, W, P = get_parameters(n)
+    print(f"\n{'-'*80}\n[INFO] Solving STS-SMT | N = {n} | optimise = {optimise}\n{'-'*80}")
+    if solver_seed(args, optimise) is not None:
+        print(f"[INFO] seed = {solver_seed(args, optimise)}")
+    budget = Budget(TIME_LIMIT_S)
+    pairs = args.encoding != "bool"
+    with profiling.phase("build"):
+        s, M = build_solver(n, args, optimise=optimise)
+        # optional objective var
+        if optimise:
+            total_imbalance = (add_pair_home_away_imbalance_expr(s,M["home"],n) if pairs
+                               else add_total_home_away_imbalance_expr(s,M,n))
+            LB = n
+    extract = extract_pair_solution if pairs else extract_solution
+    sfx = result_suffix(args)
     # export smt2
-    if args.export_smt2 and not optimise:
-        export_to_smtlib2(s,f"n{n}.smt2")
+    if args.export_smt2 is not None:
+        path = args.export_smt2 or smtlib2_path(n, optimise, sfx)
+        with profiling.phase("export"):
+            if optimise:
+                export_to_smtlib2(s, path, smtlib2_logic(args), total_imbalance, args.smt2_opt,
+                                  range(n*(n-1) - 2, LB - 1, -2))
+            else:
+                export_to_smtlib2(s, path, smtlib2_logic(args))
     # decision
     if not optimise:
-        t0 = time.time(); res = s.check(); elapsed = seconds_since(t0)
+        s.set("timeout", budget.timeout_ms())
+        with profiling.phase("solve"):
+            res = s.check()
+        elapsed = budget.seconds()
         timing = {
             "Total time (s)": elapsed,
             "User CPU (s)": int(resource.getrusage(resource.RUSAGE_SELF).ru_utime),
@@ -104,65 +197,108 @@ def solve_instance(n: int, args, *, optimise: bool = False):
         for k, v in timing.items():
             print(f"{k}: {v}s")
         if res == sat:
-            sol = extract_solution(s.model(), M, W, P)
+            sol = extract(s.model(), M, W, P)
             print_solution(sol)
-            save_solution_json(n, 'sat', elapsed, sol)
+            save_solution_json(n, 'sat', elapsed, sol, key_suffix=sfx)
         elif res == unsat:
             print(f"[RESULT] UNSAT in {elapsed}s")
-            save_solution_json(n, 'unsat', elapsed, [])
+            save_solution_json(n, 'unsat', elapsed, [], key_suffix=sfx)
         else:
+            governor.check_z3(s)
             print(f"[RESULT] TIMEOUT after {elapsed}s")
-            save_solution_json(n, 'timeout', elapsed, [])
+            save_solution_json(n, 'timeout', elapsed, [], key_suffix=sfx)
         return
     # optimisation
     print("[INFO] Phase 1: find any feasible schedule…")
-    s.set("timeout",120_000 if n>=8 else 60_000)
-    t0 = time.time(); res1 = s.check(); elapsed1 = seconds_since(t0)
+    s.set("timeout", budget.timeout_ms())
+    with profiling.phase("solve"):
+        res1 = s.check()
+    elapsed1 = budget.seconds()
     print(f"[Timing] Phase 1 solved in {elapsed1}s (res={res1})")
     if res1 == unsat:
-        save_solution_json(n, 'unsat', elapsed1, [], optimise=True)
+        save_solution_json(n, 'unsat', elapsed1, [], optimise=True, key_suffix=sfx)
         return
     if res1 != sat:
-        save_solution_json(n, 'timeout', elapsed1, [], optimise=True)
+        governor.check_z3(s)
+        save_solution_json(n, 'timeout', elapsed1, [], optimise=True, key_suffix=sfx)
         return
     best_model = s.model()
     best_val = int(best_model.evaluate(total_imbalance).as_long())
     print(f"[INFO] Initial model | imbalance = {best_val}")
-    if best_val > LB:
+    # every team's imbalance is odd, so the bound drops by 2; stop at the
+    # deadline with the incumbent, proven optimal only by an UNSAT bound or LB
+    proven = best_val <= LB
+    if not proven:
         print("[INFO] Phase 2: decremental search…")
-        per_iter = 60_000 if n>=8 else 30_000
-        for k in range(best_val-2, LB-1, -2):
-            s.push(); s.add(total_imbalance <= k); s.set("timeout", per_iter)
-            if s.check() == sat:
-                best_model, best_val = s.model(), k
+        while best_val > LB and not budget.expired():
+            s.push(); s.add(total_imbalance <= best_val - 2); s.set("timeout", budget.timeout_ms())
+            with profiling.phase("solve"):
+                res = s.check()
+            if res == sat:
+                best_model = s.model()
+                best_val = int(best_model.evaluate(total_imbalance).as_long())
             s.pop()
-    sol = extract_solution(best_model, M, W, P)
-    total_elapsed = seconds_since(t0)
+            if res != sat:
+                proven = res == unsat
+                break
+        proven = proven or best_val <= LB
+    sol = extract(best_model, M, W, P)
+    total_elapsed = budget.seconds()
     print(f"[Timing] Total optimisation time: {total_elapsed}s")
-    save_solution_json(n, 'sat', total_elapsed, sol, optimise=True, obj_val=best_val)
-    print(f"[RESULT] SMT | total_imbalance = {best_val}")
+    save_solution_json(n, 'sat' if proven else 'timeout', total_elapsed, sol, optimise=True, obj_val=best_val,
+                       key_suffix=sfx)
+    print(f"[RESULT] SMT | total_imbalance = {best_val}{'' if proven else ' (not proven optimal)'}")
 
 # ----------------------------------------------------------------------------
 # CLI
 # ----------------------------------------------------------------------------
-parser = argparse.ArgumentParser(
-    description="SMT (Z3) solver for Sports Tournament Scheduling – decision & optimisation"
-)
-parser.add_argument("N", type=int, nargs="?", help="even number of teams")
-parser.add_argument("-a", "--automatic", action="store_true",
-                    help="solve N=4,6,...,14 in batch")
-parser.add_argument("-o", "--optimise", action="store_true",
-                    help="minimise total home-away imbalance")
-parser.add_argument("--export-smt2", action="store_true",
-                    help="export SMT-LIB2 file n{N}.smt2")
-parser.add_argument("--no-sb", action="store_true",
-                    help="disable row/column symmetry breaking")
-args = parser.parse_args()
-
-if args.automatic:
-    for n in range(4,15,2):
-        solve_instance(n, args, optimise=args.optimise)
-else:
-    if not args.N:
-        parser.error("Positional N required unless -a is used.")
-    solve_instance(args.N, args, optimise=args.optimise)
+def main():
+    parser = argparse.ArgumentParser(
+        description="SMT (Z3) solver for Sports Tournament Scheduling – decision & optimisation"
+    )
+    parser.add_argument("N", type=int, nargs="?", help="even number of teams")
+    parser.add_argument("-a", "--automatic", action="store_true",
+                        help="solve N=4,6,...,14 in batch")
+    parser.add_argument("-o", "--optimise", action="store_true",
+                        help="minimise total home-away imbalance")
+    parser.add_argument("--export-smt2", nargs="?", const="", metavar="PATH",
+                        help="export the model as SMT-LIB2 (default path: res/SMT/smt2/n<N>_<dec|opt>.smt2)")
+    parser.add_argument("--smt2-opt", choices=("bounds", "minimize"), default="bounds",
+                        help="optimisation export: push/pop bound script or (minimize ...) (default: bounds)")
+    parser.add_argument("--no-sb", action="store_true",
+                        help="disable row/column symmetry breaking")
+    parser.add_argument("--symmetry", metavar="SET",
+                        help="use a set of the shared symmetry library instead, e.g. teams+weeks or full")
+    parser.add_argument("--encoding", choices=("bool", "int", "bv"), default="bool",
+                        help="bool: Boolean match cube; int/bv: week and period term per pair (default: bool)")
+    parser.add_argument("--force", action="store_true",
+                        help="with -a, re-run instances that already have a valid optimal result")
+    z3_config.add_arguments(parser)
+    governor.add_arguments(parser)
+    args = parser.parse_args()
+    limits = governor.limits_from_args(parser, args)
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.automatic:
+        sweep = Sweep("SMT", force=args.force)
+        for n in range(4,15,2):
+            key = ("SMT_opt" if args.optimise else "SMT_dec") + result_suffix(args)
+            fp = fingerprint(build_solver(n, args, optimise=args.optimise)[0].sexpr(), args.optimise)
+            if not sweep.should_run(result_path(n), key, fp):
+                continue
+            governor.run_job("SMT", n, key, result_path(n), limits, solve_instance, n, args, optimise=args.optimise,
+                             profile=args.profile)
+            sweep.record(result_path(n), key, fp)
+    else:
+        if not args.N:
+            parser.error("Positional N required unless -a is used.")
+        key = ("SMT_opt" if args.optimise else "SMT_dec") + result_suffix(args)
+        governor.run_job("SMT", args.N, key, result_path(args.N), limits, solve_instance, args.N, args,
+                         optimise=args.optimise, profile=args.profile)
+
+if __name__ == "__main__":
+    main()
@@ -77,4 +77,79 @@ def add_total_home_away_imbalance_expr(solver, M, n):
     UB = n * (n - 1)     
     solver.add(total_imbalance >= LB, total_imbalance <= UB)
 
-    return total_imbalance
\ No newline at end of file
+    return total_imbalance
+
+# ----------------------------------------------------------------------------
+# Pair viewpoint: week[i,j], period[i,j] per pair i < j (O(n^2) variables)
+# ----------------------------------------------------------------------------
+# Int or bit-vector terms. Every pair plays exactly once by construction, so
+# only three families of constraints are left:
+#   Distinct of each team's weeks        (once a week)
+#   Distinct of the (week, period) slots (one match per slot, every slot used)
+#   counting per team and period         (at most twice)
+# plus the implied number of matches per week and per period.
+def pair_of(t, o):
+    return (t, o) if t < o else (o, t)
+
+def build_pair_variables(n, W, P, encoding="int"):
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    if encoding == "bv":
+        wb, pb = max(1, (W - 1).bit_length()), max(1, (P - 1).bit_length())
+        week = {(i, j): BitVec(f"w_{i}_{j}", wb) for i, j in pairs}
+        period = {(i, j): BitVec(f"p_{i}_{j}", pb) for i, j in pairs}
+    else:
+        week = {(i, j): Int(f"w_{i}_{j}") for i, j in pairs}
+        period = {(i, j): Int(f"p_{i}_{j}") for i, j in pairs}
+    return week, period
+
+def constraint_pair_domains(solver, week, period, W, P):
+    for k in week:
+        if is_bv(week[k]):
+            # a bound equal to 2^width would wrap to 0
+            if W < 2 ** week[k].size():
+                solver.add(ULT(week[k], W))
+            if P < 2 ** period[k].size():
+                solver.add(ULT(period[k], P))
+        else:
+            solver.add(week[k] >= 0, week[k] < W, period[k] >= 0, period[k] < P)
+
+def constraint_pair_team_weeks_distinct(solver, week, n):
+    for t in range(n):
+        solver.add(Distinct([week[pair_of(t, o)] for o in range(n) if o != t]))
+
+def constraint_pair_slots_distinct(solver, week, period, P):
+    if is_bv(next(iter(week.values()))):
+        codes = [Concat(week[k], period[k]) for k in week]
+    else:
+        codes = [week[k] * P + period[k] for k in week]
+    solver.add(Distinct(codes))
+
+def constraint_pair_slot_counts(solver, week, period, W, P):
+    # implied by the slot Distinct, but they propagate much earlier
+    for w in range(W):
+        solver.add(Sum([If(week[k] == w, 1, 0) for k in week]) == P)
+    for p in range(P):
+        solver.add(Sum([If(period[k] == p, 1, 0) for k in period]) == W)
+
+def constraint_pair_at_most_two_per_period(solver, period, n, P):
+    for t in range(n):
+        for p in range(P):
+            solver.add(Sum([If(period[pair_of(t, o)] == p, 1, 0)
+                            for o in range(n) if o != t]) <= 2)
+
+def add_pair_home_away_imbalance_expr(solver, home, n):
+    # home[i,j] true iff i plays at home against j
+    matches_per_team = n - 1
+    diffs = []
+    for t in range(n):
+        home_t = Sum([If(home[(t, o)], 1, 0) if t < o else If(home[(o, t)], 0, 1)
+                      for o in range(n) if o != t])
+        d_t = Int(f"diff_{t}")
+        solver.add(d_t >=  2*home_t - matches_per_team)
+        solver.add(d_t >= -2*home_t + matches_per_team)
+        diffs.append(d_t)
+
+    total_imbalance = Int("total_imbalance")
+    solver.add(total_imbalance == Sum(diffs))
+    solver.add(total_imbalance >= n, total_imbalance <= n * (n - 1))
+    return total_imbalance
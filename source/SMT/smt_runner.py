@@ -0,0 +1,215 @@
+import os, re, time, shutil, shlex, argparse, tempfile, subprocess
+
+from SMT_STS import (get_parameters, build_solver, smtlib2_logic, smtlib2_text, save_solution_json,
+                     add_total_home_away_imbalance_expr, add_pair_home_away_imbalance_expr, parse_set)
+from solution_checker import check_solution
+
+# ----------------------------------------------------------------------------
+# Run the SMT model with an external SMT-LIB2 solver
+# ----------------------------------------------------------------------------
+# The model is built with the same functions as SMT_STS.py, printed as SMT-LIB2
+# and handed to a solver binary with (check-sat) (get-model). The model it
+# prints is parsed back into `sol`. The optimisation mode re-runs the solver
+# with (assert (<= total_imbalance k)) for k = obj - 2, obj - 4, ... until it
+# answers unsat (optimal), the bound n is reached, or time runs out; every run
+# is a fresh process, so any solver without incremental support works.
+# Every encoding counts with Int sums (QF_LIA, or ALL for bv), so pure
+# bit-vector solvers such as Bitwuzla cannot read the export. A model that
+# does not decode to a valid schedule counts as unknown.
+
+TIME_LIMIT_S = 300
+SOLVERS = {
+    "z3":       "z3 -smt2 {file}",
+    "cvc5":     "cvc5 --produce-models --lang=smt2 {file}",
+    "yices":    "yices-smt2 {file}",
+}
+
+# ----------------------------------------------------------------------------
+# Output parsing
+# ----------------------------------------------------------------------------
+def tokenize(text):
+    return re.findall(r"\(|\)|\|[^|]*\||[^\s()]+", text)
+
+def parse_sexprs(text):
+    stack = [[]]
+    for tok in tokenize(text):
+        if tok == "(":
+            stack.append([])
+        elif tok == ")":
+            if len(stack) > 1:
+                done = stack.pop()
+                stack[-1].append(done)
+        else:
+            stack[-1].append(tok.strip("|"))
+    return stack[0]
+
+def value_of(v):
+    if v == "true" or v == "false":
+        return v == "true"
+    if isinstance(v, list):
+        if len(v) == 2 and v[0] == "-":
+            return -value_of(v[1])
+        if len(v) == 3 and v[0] == "_" and v[1].startswith("bv"):
+            return int(v[1][2:])
+        return None
+    if v.startswith("#b"):
+        return int(v[2:], 2)
+    if v.startswith("#x"):
+        return int(v[2:], 16)
+    try:
+        return int(v)
+    except ValueError:
+        return None
+
+def parse_output(out):
+    """(status, {name: value}) from the solver output."""
+    status = "unknown"
+    for line in out.splitlines():
+        if line.strip() in ("sat", "unsat", "unknown"):
+            status = line.strip()
+            break
+    model = {}
+    def walk(e):
+        if isinstance(e, list):
+            if len(e) == 5 and e[0] == "define-fun" and e[2] == []:
+                model[e[1]] = value_of(e[4])
+            else:
+                for x in e:
+                    walk(x)
+    walk(parse_sexprs(out))
+    return status, model
+
+def decode(model, n, encoding):
+    W, P = n - 1, n // 2
+    sol = [[None for _ in range(W)] for _ in range(P)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            if encoding == "bool":
+                for w in range(W):
+                    for p in range(P):
+                        if model.get(f"m_{i}_{j}_w{w}_p{p}"):
+                            sol[p][w] = [i + 1, j + 1]
+            else:
+                w, p = model.get(f"w_{i}_{j}"), model.get(f"p_{i}_{j}")
+                if not (isinstance(w, int) and isinstance(p, int) and 0 <= w < W and 0 <= p < P):
+                    continue
+                sol[p][w] = [i + 1, j + 1] if model.get(f"h_{i}_{j}") else [j + 1, i + 1]
+    return sol
+
+def valid(sol):
+    return all(all(row) for row in sol) and check_solution(sol, None, 0, True) == "Valid solution"
+
+def imbalance(sol, n):
+    home, away = [0] * (n + 1), [0] * (n + 1)
+    for row in sol:
+        for a, b in row:
+            home[a] += 1; away[b] += 1
+    return sum(abs(home[t] - away[t]) for t in range(1, n + 1))
+
+# ----------------------------------------------------------------------------
+# Solving
+# ----------------------------------------------------------------------------
+def run_solver(cmd, text, time_limit, n, encoding):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.smt2")
+        with open(path, "w") as f:
+            f.write(text)
+        argv = [a.replace("{file}", path) for a in shlex.split(cmd)]
+        try:
+            out = subprocess.run(argv, capture_output=True, text=True, timeout=max(1, time_limit)).stdout
+        except subprocess.TimeoutExpired:
+            return "unknown", {}
+    status, model = parse_output(out)
+    if status == "sat" and not valid(decode(model, n, encoding)):
+        print("[WARN] the solver's model is not a valid schedule")
+        return "unknown", {}
+    return status, model
+
+def solve_instance(n, args, optimise=False):
+    n, W, P = get_parameters(n)
+    cmd = SOLVERS.get(args.solver, args.solver)
+    name = args.name or (args.solver if args.solver in SOLVERS else os.path.basename(shlex.split(cmd)[0]))
+    print(f"\n{'-'*80}\n[INFO] Solving STS-SMT | N = {n} | optimise = {optimise} | `{cmd}`\n{'-'*80}")
+
+    s, V = build_solver(n, args, optimise=optimise)
+    if optimise:
+        obj = (add_pair_home_away_imbalance_expr(s, V["home"], n) if args.encoding != "bool"
+               else add_total_home_away_imbalance_expr(s, V, n))
+    base = smtlib2_text(s, smtlib2_logic(args))
+    sfx = (f"_{args.encoding}" if args.encoding != "bool" else "") + \
+          (f"_sym-{args.symmetry}" if args.symmetry else "") + f"_{name}"
+
+    t0 = time.time()
+    left = lambda: args.time_limit - (time.time() - t0)
+    status, model = run_solver(cmd, base + "(check-sat)\n(get-model)\n", left(), n, args.encoding)
+    elapsed = int(time.time() - t0)
+    if status != "sat":
+        print(f"[RESULT] {status.upper()} after {elapsed}s")
+        save_solution_json(n, status if status == "unsat" else "timeout", elapsed, [],
+                           optimise=optimise, key_suffix=sfx)
+        return
+    sol = decode(model, n, args.encoding)
+    if not optimise:
+        print(f"[RESULT] SAT in {elapsed}s")
+        save_solution_json(n, "sat", elapsed, sol, key_suffix=sfx)
+        return
+
+    best, proven = imbalance(sol, n), False
+    print(f"[INFO] Initial model | imbalance = {best}")
+    while best > n and left() > 1:
+        status, model = run_solver(cmd, base + f"(assert (<= {obj.sexpr()} {best - 2}))\n(check-sat)\n(get-model)\n",
+                                   left(), n, args.encoding)
+        if status == "sat":
+            sol = decode(model, n, args.encoding)
+            best = imbalance(sol, n)
+            print(f"[INFO] imbalance = {best} ({time.time() - t0:.1f}s)")
+        else:
+            proven = status == "unsat"
+            break
+    elapsed = int(time.time() - t0)
+    optimal = proven or best == n
+    print(f"[RESULT] total_imbalance = {best}{'' if optimal else ' (not proven optimal)'}")
+    save_solution_json(n, "sat" if optimal else "timeout", elapsed, sol, optimise=True, obj_val=best,
+                       key_suffix=sfx)
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Solve the STS SMT model with an external SMT-LIB2 solver")
+    parser.add_argument("N", type=int, nargs="?", help="even number of teams")
+    parser.add_argument("-a", "--automatic", action="store_true", help="solve N=4,6,...,14 in batch")
+    parser.add_argument("-o", "--optimise", action="store_true", help="minimise total home-away imbalance")
+    parser.add_argument("--solver", default="z3",
+                        help=f"one of {', '.join(SOLVERS)} or a command line with {{file}} (default: z3)")
+    parser.add_argument("--name", help="solver name in the result key (default: preset or command basename)")
+    parser.add_argument("--encoding", choices=("bool", "int", "bv"), default="bool",
+                        help="model encoding, as in SMT_STS.py (default: bool)")
+    parser.add_argument("--no-sb", action="store_true", help="disable row/column symmetry breaking")
+    parser.add_argument("--symmetry", metavar="SET", help="use a set of the shared symmetry library instead")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit in s (default: {TIME_LIMIT_S})")
+    args = parser.parse_args()
+    if args.symmetry:
+        try:
+            parse_set(args.symmetry)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.solver not in SOLVERS and "{file}" not in args.solver:
+        parser.error("--solver must be a preset or contain {file}")
+    binary = shlex.split(SOLVERS.get(args.solver, args.solver))[0]
+    if shutil.which(binary) is None:
+        parser.error(f"solver binary not found: {binary}")
+    # the model is only printed, so the in-process Z3 settings do not matter
+    args.z3_config, args.threads = "default", 1
+
+    if args.automatic:
+        for n in range(4, 15, 2):
+            solve_instance(n, args, optimise=args.optimise)
+    else:
+        if args.N is None:
+            parser.error("Positional N required unless -a is used.")
+        solve_instance(args.N, args, optimise=args.optimise)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os, sys, json, argparse
+
+# ----------------------------------------------------------------------------
+# Scaling of the decomposition against the monolithic models
+# ----------------------------------------------------------------------------
+# Solves the decision problem for every n with
+#   decomp    SAT_STS --decompose: weeks from the circle method or the master,
+#             then the period subproblem, with nogoods (see SAT/SAT_STS.py)
+#   sat       the Boolean model of SAT_STS
+#   smt       the int pair model of SMT_STS
+#   highspy   the MIP model of mip_highs
+# Every run is a job of its own (governor.py), so the peak RSS is reported next
+# to the time. The report is written to res/bench/decomposition.json.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+import sts, governor
+from budget import Budget
+
+TIME_LIMIT_S = 300
+OUT_PATH = os.path.join(HERE, "..", "res", "bench", "decomposition.json")
+RUNS = {
+    "decomp":  ("sat", {"decompose": True}),
+    "sat":     ("sat", {}),
+    "smt":     ("smt", {"encoding": "int"}),
+    "highspy": ("highspy", {}),
+}
+
+def _run(n, name, time_limit):
+    approach, options = RUNS[name]
+    if name == "decomp":
+        budget = Budget(time_limit)
+        status, sol, stats = sts.backend("sat").decompose(n, budget, log=lambda msg: None)
+        return status, budget.elapsed(), stats
+    r = sts.solve(n, approach, "dec", time_limit=time_limit, **options)
+    return r.status, r.build_time + r.time, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the decomposition against the monolithic models")
+    parser.add_argument("ns", type=int, nargs="+", help="even numbers of teams")
+    parser.add_argument("--runs", nargs="+", choices=RUNS, default=list(RUNS),
+                        help="solvers to compare (default: all)")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit per run in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--out", default=OUT_PATH, help="JSON report path")
+    args = parser.parse_args()
+    for n in args.ns:
+        if n < 4 or n % 2:
+            parser.error("every n must be an even integer >= 4")
+
+    report = {}
+    for n in args.ns:
+        rows = report.setdefault(str(n), {})
+        for name in args.runs:
+            job = governor.run(_run, n, name, args.time_limit, wall_limit=args.time_limit + governor.GRACE_S)
+            status, elapsed, stats = job.value if job.status == "ok" else (job.status, None, None)
+            solved = status in ("sat", "unsat", "Optimal", "Infeasible")
+            rows[name] = {"status": status, "time": round(elapsed, 3) if solved else None,
+                          "peak_rss_mb": job.peak_rss_mb}
+            if stats:
+                rows[name]["decomposition"] = {k: round(v, 3) for k, v in stats.items()}
+            t = f"{elapsed:8.3f}s" if solved else "  timeout"
+            print(f"n={n:<3} {name:<8} {status:<10} {t}  {job.peak_rss_mb:8.1f} MB", flush=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import os, sys, time, json, argparse
+
+# ----------------------------------------------------------------------------
+# Benchmark of the two MIP backends: AMPL (mip_model.py) vs highspy (mip_highs.py)
+# ----------------------------------------------------------------------------
+# Both build the same model and solve it with HiGHS on one thread, so the
+# difference is the model-generation overhead:
+#   highspy  NumPy matrix construction + passModel
+#   ampl     ampl.eval of the model + the part of ampl.solve that is not spent in
+#            the solver (AMPL translator, .nl file, reading it back, solution)
+# The AMPL column is skipped when amplpy or AMPL_LICENSE_UUID is missing.
+#
+# --formulations runs highspy once per formulation ("base", or "vi", "lazy",
+# "tight" joined with '+', see mip_highs.py) and adds the LP relaxation bound,
+# the root gap (obj - bound) / obj, the branch-and-bound node count and the
+# number of lazy rows to the report.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "MIP"))
+
+TIME_LIMIT_S = 300
+FORMULATION_PARTS = {"vi": "valid_ineq", "lazy": "lazy", "tight": "lex"}
+
+def parse_formulation(name):
+    parts = [] if name == "base" else name.split("+")
+    unknown = [p for p in parts if p not in FORMULATION_PARTS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown formulation part {unknown[0]!r} "
+                                         f"(choose from base, {', '.join(FORMULATION_PARTS)})")
+    return name
+
+def run_highspy(n, comb, time_limit, formulation="base"):
+    import mip_highs
+    parts = [] if formulation == "base" else formulation.split("+")
+    comb = dict(comb, valid_ineq="vi" in parts, lazy="lazy" in parts, lex="tight" if "tight" in parts else "dense")
+    t0 = time.time()
+    lp, index = mip_highs.model_from(n, comb)
+    h = mip_highs.new_highs(time_limit, verbose=False)
+    h.passModel(lp)
+    gen = time.time() - t0
+    bound = mip_highs.root_bound(lp)
+    t0 = time.time()
+    status, stats = mip_highs.run(h, index, comb["lazy"], time_limit)
+    row = {"status": h.modelStatusToString(status), "gen": gen, "solve": time.time() - t0,
+           "root_bound": round(bound, 3), **stats}
+    if comb["optimise"] and h.getInfo().primal_solution_status:
+        obj = h.getInfo().objective_function_value
+        row["obj"] = round(obj)
+        row["root_gap"] = round((obj - bound) / obj, 3) if obj else 0.0
+    return row
+
+def load_ampl():
+    import mip_model
+    try:
+        mip_model.get_ampl()
+    except ImportError as e:
+        return None, f"amplpy not available ({e})"
+    except RuntimeError as e:
+        return None, str(e)
+    if "highs" not in mip_model.installed_solvers():
+        return None, "the AMPL highs module is not installed"
+    return mip_model, None
+
+def run_ampl(mip_model, n, comb, time_limit):
+    ampl = mip_model.get_ampl()
+    t0 = time.time()
+    ampl.reset()
+    mip_model.load_model(n, comb["optimise"], comb["symm_break"], comb["can_pair"])
+    ampl.option["solver"] = "highs"
+    ampl.option["highs_options"] = f"lim:time={time_limit} report_times=1 tech:timing=2 tech:threads=1"
+    output = ampl.solve(verbose=False, return_output=True)
+    total = time.time() - t0
+    solver = mip_model.parse_timing_from_output(output).get("Solver time", 0.0)
+    return {"status": ampl.solve_result, "gen": total - solver, "solve": solver}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the AMPL and highspy MIP backends")
+    parser.add_argument("ns", type=int, nargs="+", help="even numbers of teams")
+    parser.add_argument("-o", "--optimise", action="store_true", help="benchmark the optimisation model")
+    parser.add_argument("-cp", "--can-pair", action="store_true", help="enable canonical pairing")
+    parser.add_argument("-sb", "--symm_break", action="store_true", help="enable symmetry breaking on the weeks")
+    parser.add_argument("--formulations", type=parse_formulation, nargs="+", default=["base"],
+                        help="highspy formulations to compare, e.g. base vi vi+lazy tight (default: base)")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit per run in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--out", help="JSON report path (default: res/bench/mip.json)")
+    args = parser.parse_args()
+    comb = {"optimise": args.optimise, "can_pair": args.can_pair, "symm_break": args.symm_break}
+
+    mip_model, reason = load_ampl()
+    if reason:
+        print(f"[INFO] skipping AMPL: {reason}")
+    report = {}
+    for n in args.ns:
+        rows = report.setdefault(str(n), {})
+        for formulation in args.formulations:
+            name = "highspy" if formulation == "base" else f"highspy/{formulation}"
+            rows[name] = run_highspy(n, comb, args.time_limit, formulation)
+        if mip_model:
+            rows["ampl"] = run_ampl(mip_model, n, comb, args.time_limit)
+        for name, r in rows.items():
+            r["gen"], r["solve"] = round(r["gen"], 3), round(r["solve"], 3)
+            extra = f"  nodes {r['nodes']:<7} root gap {r.get('root_gap', '-')}" if "nodes" in r else ""
+            print(f"[mip] n={n:<3} {name:<22} {r['status']:<18} gen {r['gen']:8.3f}s  "
+                  f"solve {r['solve']:8.3f}s{extra}")
+        if "ampl" in rows and rows.get("highspy", {}).get("gen"):
+            rows["gen_speedup"] = round(rows["ampl"]["gen"] / rows["highspy"]["gen"], 1)
+            print(f"[mip] n={n:<3} generation x{rows['gen_speedup']}")
+
+    out = args.out or os.path.join(HERE, "..", "res", "bench", "mip.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {out}")
+
+if __name__ == "__main__":
+    main()
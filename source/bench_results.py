@@ -0,0 +1,243 @@
+import os, re, sys, json, glob, time, argparse, subprocess
+from collections import defaultdict
+
+# ----------------------------------------------------------------------------
+# Result history, plots and regression check over res/CP, res/MIP, res/SAT, res/SMT
+# ----------------------------------------------------------------------------
+#   record  appends every (approach, key, n) entry of the result files to
+#           res/bench/history.jsonl, tagged with the model fingerprint of the
+#           sweep checkpoint (see sweep.py) or else a hash of the approach's
+#           source files, and the git revision. Unchanged entries are not
+#           appended again.
+#   plot    cactus plot (instances solved within t), time-vs-n scaling curves
+#           and, per approach, the virtual best of its configurations against
+#           the virtual best of all approaches, as PNGs in res/bench/plots/
+#   check   compares the latest record of every (approach, key, n) with the
+#           one of the previous model/code version and flags it when it became
+#           slower by more than --threshold (relative) and --min-delta seconds,
+#           or stopped being solved. Exits with 1 if anything is flagged.
+# An entry counts as solved if it is optimal (proven for the decision version).
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from sweep import RES_DIR, STATE_DIR, fingerprint
+
+APPROACHES = ("CP", "MIP", "SAT", "SMT")
+BENCH_DIR = os.path.join(RES_DIR, "bench")
+HISTORY_PATH = os.path.join(BENCH_DIR, "history.jsonl")
+PLOT_DIR = os.path.join(BENCH_DIR, "plots")
+TIME_LIMIT_S = 300
+# times are stored in whole seconds; 0s is drawn at this value on the log scales
+LOG_FLOOR_S = 0.5
+# shared modules that are part of every approach's models
+SHARED_SOURCES = ("symmetry.py", "z3_config.py")
+
+# ----------------------------------------------------------------------------
+# Reading results
+# ----------------------------------------------------------------------------
+def load_results(approaches=APPROACHES):
+    """Yields (approach, key, n, entry) for every entry in res/<approach>/*.json."""
+    for approach in approaches:
+        for path in sorted(glob.glob(os.path.join(RES_DIR, approach, "*.json"))):
+            m = re.fullmatch(r"n?(\d+)\.json", os.path.basename(path))
+            if not m:
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                print(f"[WARN] cannot read {path}")
+                continue
+            for key, entry in data.items():
+                yield approach, key, int(m.group(1)), entry
+
+def solved(entry) -> bool:
+    return bool(entry.get("optimal")) and entry.get("time", TIME_LIMIT_S) < TIME_LIMIT_S
+
+def as_obj(value):
+    """The objective as an int, None when the run has none (MIP files store "None")."""
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+def source_hash(approach: str) -> str:
+    files = sorted(glob.glob(os.path.join(HERE, approach, "*.py")) + glob.glob(os.path.join(HERE, approach, "*.mzn")))
+    files += [os.path.join(HERE, name) for name in SHARED_SOURCES]
+    contents = []
+    for path in files:
+        with open(path, "rb") as f:
+            contents.append(f.read())
+    return fingerprint(*contents)
+
+def git_revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=HERE, capture_output=True,
+                               text=True).stdout.strip()
+        return rev + ("+dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def load_history():
+    records = []
+    if os.path.isfile(HISTORY_PATH):
+        with open(HISTORY_PATH) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    return records
+
+def latest_per_config(records):
+    latest = {}
+    for r in records:
+        latest[(r["approach"], r["key"], r["n"])] = r
+    return latest
+
+# ----------------------------------------------------------------------------
+# record
+# ----------------------------------------------------------------------------
+def record(approaches):
+    fingerprints = {}
+    for approach in approaches:
+        path = os.path.join(STATE_DIR, f"{approach}.json")
+        if os.path.isfile(path):
+            with open(path) as f:
+                fingerprints[approach] = json.load(f)
+    code = {a: source_hash(a) for a in approaches}
+    rev = git_revision()
+    latest = latest_per_config(load_history())
+
+    new = []
+    for approach, key, n, entry in load_results(approaches):
+        files = fingerprints.get(approach, {})
+        fp = next((v[key] for f, v in files.items() if re.fullmatch(rf"{approach}/n?{n}\.json", f) and key in v),
+                  None)
+        r = {"approach": approach, "key": key, "n": n, "time": entry.get("time"),
+             "optimal": entry.get("optimal"), "obj": as_obj(entry.get("obj")),
+             "model": fp or code[approach], "rev": rev}
+        prev = latest.get((approach, key, n))
+        if prev and all(prev.get(k) == r[k] for k in ("time", "optimal", "obj", "model")):
+            continue
+        r["recorded_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        new.append(r)
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(HISTORY_PATH, "a") as f:
+        for r in new:
+            f.write(json.dumps(r) + "\n")
+    print(f"✔ {len(new)} new record(s) appended to {HISTORY_PATH}")
+
+# ----------------------------------------------------------------------------
+# plot
+# ----------------------------------------------------------------------------
+def plot(approaches, min_solved):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    times = defaultdict(dict)  # (approach, key) -> {n: time} of the solved instances
+    for approach, key, n, entry in load_results(approaches):
+        if solved(entry):
+            times[(approach, key)][n] = entry["time"]
+    configs = sorted(c for c in times if len(times[c]) >= min_solved)
+    if not configs:
+        print("[INFO] nothing to plot")
+        return
+    os.makedirs(PLOT_DIR, exist_ok=True)
+    label = lambda c: f"{c[0]}/{c[1]}"
+
+    # cactus: k-th fastest solved instance of every configuration
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for c in configs:
+        ts = sorted(times[c].values())
+        ax.plot(range(1, len(ts) + 1), [max(t, LOG_FLOOR_S) for t in ts], marker=".", label=label(c))
+    ax.set(xlabel="instances solved", ylabel="time (s)", yscale="log", title="Cactus plot")
+    ax.legend(fontsize="x-small", ncol=2, loc="upper left", bbox_to_anchor=(1.01, 1))
+    fig.savefig(os.path.join(PLOT_DIR, "cactus.png"), dpi=120, bbox_inches="tight")
+    plt.close(fig)
+
+    # scaling: time vs n, one figure per approach
+    for approach in approaches:
+        mine = [c for c in configs if c[0] == approach]
+        if not mine:
+            continue
+        fig, ax = plt.subplots(figsize=(10, 6))
+        for c in mine:
+            ns = sorted(times[c])
+            ax.plot(ns, [max(times[c][n], LOG_FLOOR_S) for n in ns], marker="o", label=c[1])
+        ax.axhline(TIME_LIMIT_S, color="grey", linestyle="--", linewidth=0.8)
+        ax.set(xlabel="n", ylabel="time (s)", yscale="log", title=f"{approach}: time vs n")
+        ax.legend(fontsize="x-small", ncol=2, loc="upper left", bbox_to_anchor=(1.01, 1))
+        fig.savefig(os.path.join(PLOT_DIR, f"scaling_{approach}.png"), dpi=120, bbox_inches="tight")
+        plt.close(fig)
+
+    # virtual best per approach and overall
+    vbs = defaultdict(dict)
+    for (approach, _), ts in times.items():
+        for n, t in ts.items():
+            for name in (approach, "virtual best"):
+                vbs[name][n] = min(t, vbs[name].get(n, t))
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for name, ts in sorted(vbs.items(), key=lambda kv: kv[0] == "virtual best"):
+        ns = sorted(ts)
+        style = {"color": "black", "linestyle": "--"} if name == "virtual best" else {}
+        ax.plot(ns, [max(ts[n], LOG_FLOOR_S) for n in ns], marker="o", label=name, **style)
+    ax.set(xlabel="n", ylabel="time (s)", yscale="log", title="Virtual best configuration per approach")
+    ax.legend()
+    fig.savefig(os.path.join(PLOT_DIR, "virtual_best.png"), dpi=120, bbox_inches="tight")
+    plt.close(fig)
+    with open(os.path.join(PLOT_DIR, "virtual_best.json"), "w") as f:
+        json.dump({name: {str(n): t for n, t in sorted(ts.items())} for name, ts in vbs.items()}, f, indent=2)
+    print(f"✔ plots written to {PLOT_DIR}")
+
+# ----------------------------------------------------------------------------
+# check
+# ----------------------------------------------------------------------------
+def check(approaches, threshold, min_delta):
+    history = defaultdict(list)
+    for r in load_history():
+        if r["approach"] in approaches:
+            history[(r["approach"], r["key"], r["n"])].append(r)
+
+    flagged = []
+    for config, records in sorted(history.items()):
+        last = records[-1]
+        older = [r for r in records if r["model"] != last["model"]]
+        if not older:
+            continue
+        prev = older[-1]
+        now_solved, was_solved = solved(last), solved(prev)
+        if was_solved and not now_solved:
+            flagged.append((config, prev, last, "no longer solved"))
+        elif was_solved and last["time"] - prev["time"] > max(min_delta, threshold * prev["time"]):
+            flagged.append((config, prev, last, f"{prev['time']}s -> {last['time']}s"))
+        elif None not in (as_obj(last.get("obj")), as_obj(prev.get("obj"))) and last["obj"] > prev["obj"]:
+            flagged.append((config, prev, last, f"obj {prev['obj']} -> {last['obj']}"))
+
+    for (approach, key, n), prev, last, why in flagged:
+        print(f"[REGRESSION] {approach}/{key} n={n}: {why} ({prev['rev']} -> {last['rev']})")
+    print(f"[INFO] {len(history)} configurations checked, {len(flagged)} regression(s)")
+    return 1 if flagged else 0
+
+# ----------------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Result history, plots and regression check over res/")
+    parser.add_argument("command", choices=("record", "plot", "check"))
+    parser.add_argument("--approaches", choices=APPROACHES, nargs="+", default=list(APPROACHES),
+                        help="result folders to use (default: all)")
+    parser.add_argument("--min-solved", type=int, default=1,
+                        help="plot only configurations with at least this many solved instances (default: 1)")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown flagged as a regression (default: 0.2)")
+    parser.add_argument("--min-delta", type=float, default=2.0,
+                        help="ignore slowdowns below this many seconds (default: 2)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.approaches)
+    elif args.command == "plot":
+        plot(args.approaches, args.min_solved)
+    else:
+        sys.exit(check(args.approaches, args.threshold, args.min_delta))
+
+if __name__ == "__main__":
+    main()
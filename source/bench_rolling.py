@@ -0,0 +1,94 @@
+import os, sys, json, argparse
+
+# ----------------------------------------------------------------------------
+# Time to solution of the rolling horizon for large n
+# ----------------------------------------------------------------------------
+# Solves the decision problem for every n with SAT_STS --rolling (weeks
+# committed in blocks, see SAT/SAT_STS.py) and, unless --no-decompose, with
+# --decompose for comparison. The construction row is the baseline: the circle
+# method when 3 does not divide n-1, else the half split (n/2 odd) or the
+# rotational schedule (n = 4 mod 12) of constructions.py, else none. Every run is a job of its own (governor.py), so
+# the peak RSS is reported next to the time. The report is written to
+# res/bench/rolling.json.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+import sts, governor
+from budget import Budget
+from constructions import half_split, rotational
+from solution_checker import check_solution
+
+TIME_LIMIT_S = 300
+OUT_PATH = os.path.join(HERE, "..", "res", "bench", "rolling.json")
+DEFAULT_NS = list(range(18, 41, 2))
+
+def _construction(n, time_limit):
+    budget = Budget(time_limit)
+    sat = sts.backend("sat")
+    P = n // 2
+    if (n - 1) % 3:
+        schedule = [[None] * P for _ in range(n - 1)]
+        for w, (week, row) in enumerate(zip(sat.circle_factorization(n), sat.circle_periods(n))):
+            for pair, p in zip(week, row):
+                schedule[w][p] = pair
+    else:
+        schedule = half_split(n) if (n // 2) % 2 else rotational(n)
+    if schedule is None:
+        return "none", budget.elapsed(), None
+    sol = [[[schedule[w][p][0] + 1, schedule[w][p][1] + 1] for w in range(n - 1)] for p in range(P)]
+    status = "sat" if check_solution(sol, None, 0, True) == "Valid solution" else "invalid"
+    return status, budget.elapsed(), None
+
+def _rolling(n, block, window, lookahead, time_limit):
+    budget = Budget(time_limit)
+    status, sol, stats = sts.backend("sat").rolling_horizon(n, budget, block, window, lookahead,
+                                                            log=lambda msg: None)
+    if status == "sat" and check_solution(sol, None, 0, True) != "Valid solution":
+        status = "invalid"
+    return status, budget.elapsed(), stats
+
+def _decomp(n, time_limit):
+    budget = Budget(time_limit)
+    status, sol, stats = sts.backend("sat").decompose(n, budget, log=lambda msg: None)
+    return status, budget.elapsed(), stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rolling horizon of the SAT model for large n")
+    parser.add_argument("ns", type=int, nargs="*", default=DEFAULT_NS,
+                        help="even numbers of teams (default: 18..40)")
+    parser.add_argument("--block", type=int, default=2, help="weeks per block (default: 2)")
+    parser.add_argument("--window", type=int, default=2, help="backtracking window in blocks (default: 2)")
+    parser.add_argument("--lookahead", type=int, default=None, help="lookahead in weeks (default: 4 x block)")
+    parser.add_argument("--no-decompose", action="store_true", help="do not run --decompose for comparison")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit per run in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--out", default=OUT_PATH, help="JSON report path")
+    args = parser.parse_args()
+    for n in args.ns:
+        if n < 4 or n % 2:
+            parser.error("every n must be an even integer >= 4")
+
+    report = {"block": args.block, "window": args.window, "lookahead": args.lookahead}
+    runs = [("construction", _construction, ()), ("rolling", _rolling, (args.block, args.window, args.lookahead))]
+    if not args.no_decompose:
+        runs.append(("decomp", _decomp, ()))
+    for n in args.ns:
+        rows = report.setdefault(str(n), {})
+        for name, fn, extra in runs:
+            job = governor.run(fn, n, *extra, args.time_limit, wall_limit=args.time_limit + governor.GRACE_S)
+            status, elapsed, stats = job.value if job.status == "ok" else (job.status, None, None)
+            solved = status in ("sat", "unsat")
+            rows[name] = {"status": status, "time": round(elapsed, 3) if solved else None,
+                          "peak_rss_mb": job.peak_rss_mb}
+            if stats:
+                rows[name]["stats"] = {k: round(v, 3) for k, v in stats.items()}
+            t = f"{elapsed:8.3f}s" if solved else "        -" if status == "none" else "  timeout"
+            print(f"n={n:<3} {name:<12} {status:<10} {t}  {job.peak_rss_mb:8.1f} MB", flush=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os, sys, time, json, argparse, resource, statistics
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+
+# ----------------------------------------------------------------------------
+# Multi-seed runs: timing statistics per configuration
+# ----------------------------------------------------------------------------
+# Solves every (n, configuration) once per seed and reports the median time,
+# the quartiles and IQR, min/max and the success rate under the cutoff. A run
+# that does not finish counts as the cutoff in the time statistics, so the
+# median of a configuration that fails half of the time is the cutoff.
+# Backends and what the seed drives:
+#   sat, smt   Z3 sat.random_seed / smt.random_seed (decision model)
+#   cp         the MiniZinc solver's random seed (--solver chuffed|gecode|ortools)
+#   highspy    the HiGHS random_seed option (decision or -o optimisation model)
+#   ls         the tabu search of LS/LS_STS.py
+# Every run is a fresh process; --workers runs several at once, which keeps the
+# machine busy but makes the runs compete for memory bandwidth and caches.
+# --pin gives every running process a CPU of its own, --mem-limit caps the
+# address space of each run (see governor.py); a memout counts as unsolved.
+# The peak RSS of every run is reported next to its time.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+import governor
+
+TIME_LIMIT_S = 300
+BACKENDS = ("sat", "smt", "cp", "highspy", "ls")
+_free_cpus = None
+_cpu = None
+
+def _import(folder, module):
+    sys.path.insert(0, os.path.join(HERE, folder))
+    sys.path.append(HERE)
+    return __import__(module)
+
+def z3_args(opts, seed):
+    return SimpleNamespace(z3_config=opts["z3_config"], threads=1, symmetry=opts["symmetry"],
+                           no_sb=opts["no_sb"], encoding=opts["encoding"], seed=seed)
+
+def config_name(backend, opts):
+    if backend == "sat":
+        return _import("SAT", "SAT_STS").result_key(z3_args(opts, None))
+    if backend == "smt":
+        return "SMT_dec" + _import("SMT", "SMT_STS").result_suffix(z3_args(opts, None))
+    if backend == "cp":
+        sb = f"_sym-{opts['symmetry']}" if opts["symmetry"] else ("_nosb" if opts["no_sb"] else "")
+        return f"{opts['solver']}_{'opt' if opts['opt'] else 'sat'}{'_hf' if opts['heuristics'] else ''}{sb}"
+    if backend == "highspy":
+        return "highspy" + _import("MIP", "mip_highs").get_sol_suffix(highspy_comb(opts))
+    return "LS_dec"
+
+def highspy_comb(opts):
+    return {"optimise": opts["opt"], "can_pair": False, "symm_break": not opts["no_sb"],
+            "symmetry": opts["symmetry"], "valid_ineq": opts["valid_ineq"]}
+
+def _init_worker(free_cpus):
+    global _free_cpus, _cpu
+    _free_cpus = free_cpus
+    if free_cpus is not None:
+        _cpu = free_cpus.get()
+        os.sched_setaffinity(0, {_cpu})
+
+def run_one(job):
+    """Solves one (n, seed) in this process: (solved, time in s, peak RSS in MB)."""
+    backend, n, seed, opts, time_limit, mem_limit = job
+    governor.apply(governor.Limits(mem_limit))
+    try:
+        solved, elapsed = _solve(backend, n, seed, opts, time_limit)
+    except Exception as e:
+        if not governor.is_memout(e):
+            raise
+        solved, elapsed = False, time_limit
+    finally:
+        if _cpu is not None:
+            _free_cpus.put(_cpu)
+    rss = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return solved, elapsed, rss / 1024
+
+def _solve(backend, n, seed, opts, time_limit):
+    if backend in ("sat", "smt"):
+        module = _import(*(("SAT", "SAT_STS") if backend == "sat" else ("SMT", "SMT_STS")))
+        s, _ = module.build_solver(n, z3_args(opts, seed))
+        s.set("timeout", time_limit * 1000)
+        t0 = time.time()
+        res = str(s.check())
+        return res in ("sat", "unsat"), time.time() - t0
+    if backend == "cp":
+        cp = _import("CP", "CP_STS")
+        t0 = time.time()
+        entry = cp.run_and_collect(n, opts["opt"], opts["heuristics"], opts["solver"], not opts["no_sb"],
+                                   time_limit=time_limit, symmetry=opts["symmetry"], seed=seed)
+        return bool(entry["optimal"]), time.time() - t0
+    if backend == "highspy":
+        mh = _import("MIP", "mip_highs")
+        lp, index = mh.model_from(n, highspy_comb(opts))
+        h = mh.new_highs(time_limit, verbose=False, seed=seed)
+        h.passModel(lp)
+        t0 = time.time()
+        status, _ = mh.run(h, index, False, time_limit)
+        solved = status in (mh.highspy.HighsModelStatus.kOptimal, mh.highspy.HighsModelStatus.kInfeasible)
+        return solved, time.time() - t0
+    ls = _import("LS", "LS_STS")
+    s, elapsed, _ = ls.local_search(n, seed=seed, time_limit=time_limit)
+    return s.penalty == 0, elapsed
+
+def summarize(runs, time_limit):
+    times = [t if ok else time_limit for ok, t, _ in runs]
+    q1, med, q3 = statistics.quantiles(times, n=4, method="inclusive") if len(times) > 1 else times * 3
+    return {"median": round(med, 3), "q1": round(q1, 3), "q3": round(q3, 3), "iqr": round(q3 - q1, 3),
+            "min": round(min(times), 3), "max": round(max(times), 3),
+            "success_rate": round(sum(ok for ok, _, _ in runs) / len(runs), 3), "cutoff": time_limit,
+            "times": [round(t, 3) for t in times], "peak_rss_mb": round(max(rss for _, _, rss in runs), 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Run configurations under several seeds and report timing statistics")
+    parser.add_argument("ns", type=int, nargs="+", help="even numbers of teams")
+    parser.add_argument("--backend", choices=BACKENDS, default="sat", help="model to run (default: sat)")
+    parser.add_argument("--seeds", type=int, default=5, help="number of seeds, 0..K-1 (default: 5)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="runs at the same time (default: min(seeds, CPUs))")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"cutoff per run in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--opt", action="store_true", help="optimisation version (cp, highspy)")
+    parser.add_argument("--no-sb", action="store_true", help="disable the built-in symmetry breaking")
+    parser.add_argument("--symmetry", metavar="SET", help="set of the shared symmetry library (not ls)")
+    parser.add_argument("--z3-config", default="default", help="Z3 configuration (sat, smt)")
+    parser.add_argument("--encoding", choices=("bool", "int", "bv"), default="bool", help="SMT encoding (smt)")
+    parser.add_argument("--solver", choices=("chuffed", "gecode", "ortools"), default="chuffed",
+                        help="MiniZinc solver (cp, default: chuffed)")
+    parser.add_argument("--heuristics", action="store_true", help="first-fail search (cp)")
+    parser.add_argument("--valid-ineq", action="store_true", help="add the valid inequalities (highspy)")
+    parser.add_argument("--pin", action="store_true", help="pin every running process to a CPU of its own")
+    parser.add_argument("--mem-limit", type=int, default=None, metavar="MB",
+                        help="address-space limit of every run in MB (default: none)")
+    parser.add_argument("--out", help="JSON report path (default: res/bench/seeds_<backend>.json)")
+    args = parser.parse_args()
+    if args.opt and args.backend not in ("cp", "highspy"):
+        parser.error("--opt is only available for the cp and highspy backends")
+    if args.seeds < 1:
+        parser.error("--seeds must be at least 1")
+
+    opts = {k: getattr(args, k) for k in ("opt", "no_sb", "symmetry", "z3_config", "encoding", "solver",
+                                          "heuristics", "valid_ineq")}
+    name = config_name(args.backend, opts)
+    workers = args.workers or min(args.seeds, os.cpu_count() or 1)
+    cpus = sorted(os.sched_getaffinity(0))
+    if args.pin and workers > len(cpus):
+        parser.error(f"--pin needs a CPU per worker: {workers} workers, {len(cpus)} CPUs")
+    out = args.out or os.path.join(HERE, "..", "res", "bench", f"seeds_{args.backend}.json")
+    report = {}
+    if os.path.isfile(out):
+        with open(out) as f:
+            report = json.load(f)
+
+    # spawn + one task per child: no Z3/HiGHS state is shared between runs
+    ctx = mp.get_context("spawn")
+    free_cpus = None
+    if args.pin:
+        # a finished run hands its CPU to the process that replaces it
+        free_cpus = ctx.Queue()
+        for cpu in cpus[:workers]:
+            free_cpus.put(cpu)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, max_tasks_per_child=1,
+                             initializer=_init_worker, initargs=(free_cpus,)) as pool:
+        for n in args.ns:
+            jobs = [(args.backend, n, seed, opts, args.time_limit, args.mem_limit) for seed in range(args.seeds)]
+            stats = summarize(list(pool.map(run_one, jobs)), args.time_limit)
+            report.setdefault(str(n), {})[name] = stats
+            print(f"[{args.backend}] n={n:<3} {name:<24} median {stats['median']:8.3f}s  "
+                  f"IQR {stats['iqr']:7.3f}s  [{stats['min']:.3f}, {stats['max']:.3f}]  "
+                  f"solved {stats['success_rate']:.0%} of {args.seeds}  peak RSS {stats['peak_rss_mb']} MB")
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os, sys, time, json, argparse
+
+# ----------------------------------------------------------------------------
+# Benchmark of the shared symmetry sets (see symmetry.py)
+# ----------------------------------------------------------------------------
+# Solves the decision problem once per (backend, n, set) and reports the solve
+# time and the speed-up over "none". Backends:
+#   sat   the Z3 Boolean model of SAT/SAT_STS.py (always available)
+#   cp    the MiniZinc model of CP/CP_STS.py (needs the minizinc binary)
+# The MIP model needs an AMPL licence and is not benchmarked here.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from symmetry import all_sets, parse_set
+
+TIME_LIMIT_S = 300
+OUT_PATH = os.path.join(HERE, "..", "res", "bench", "symmetry.json")
+
+def bench_sat(n, name, time_limit):
+    sys.path.insert(0, os.path.join(HERE, "SAT"))
+    import SAT_STS as sat
+    from z3 import Solver, sat as z3_sat, unknown
+
+    n, W, P = sat.get_parameters(n)
+    M = sat.build_variables(n, W, P)
+    s = Solver()
+    s.set(timeout=time_limit * 1000, random_seed=42)
+    sat.constraint_each_pair_once(s, M, n, W, P)
+    sat.constraint_one_match_per_slot(s, M, n, W, P)
+    sat.constraint_team_once_per_week(s, M, n, W, P)
+    sat.at_most_two_per_period(s, M, n, W, P)
+    sat.add_z3_constraints(s, M, n, W, P, name)
+    t0 = time.time()
+    res = s.check()
+    return str(res), time.time() - t0 if res != unknown else None
+
+def bench_cp(n, name, time_limit):
+    sys.path.insert(0, os.path.join(HERE, "CP"))
+    import CP_STS as cp
+
+    out = cp.run_and_collect(n, False, True, "gecode", False, time_limit=time_limit,
+                             symmetry=None if name == "none" else name)
+    if out["time"] >= time_limit and not out["optimal"]:
+        return "unknown", None
+    return ("sat" if out["sol"] else "unsat"), out["time"]
+
+BACKENDS = {"sat": bench_sat, "cp": bench_cp}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the symmetry-breaking sets on the STS models")
+    parser.add_argument("ns", type=int, nargs="+", help="even numbers of teams")
+    parser.add_argument("--backend", choices=BACKENDS, nargs="+", default=["sat"],
+                        help="models to benchmark (default: sat)")
+    parser.add_argument("--sets", nargs="+", default=all_sets(),
+                        help="symmetry sets to compare (default: every combination)")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit per run in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--out", default=OUT_PATH, help="JSON report path")
+    args = parser.parse_args()
+    for name in args.sets:
+        try:
+            parse_set(name)
+        except ValueError as e:
+            parser.error(str(e))
+    sets = ["none"] + [s for s in args.sets if s != "none"]
+
+    report = {}
+    for backend in args.backend:
+        for n in args.ns:
+            rows = report.setdefault(backend, {}).setdefault(str(n), {})
+            for name in sets:
+                status, elapsed = BACKENDS[backend](n, name, args.time_limit)
+                base = rows.get("none", {}).get("time")
+                speedup = round(base / elapsed, 2) if base and elapsed else None
+                rows[name] = {"status": status,
+                              "time": round(elapsed, 3) if elapsed is not None else None,
+                              "speedup": speedup}
+                t = f"{elapsed:8.3f}s" if elapsed is not None else "  timeout"
+                print(f"[{backend}] n={n:<3} {name:<22} {status:<8} {t}  x{speedup or '-'}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import os, sys, time, json, argparse
+
+# ----------------------------------------------------------------------------
+# Configuration variants on one incremental Z3 model per n
+# ----------------------------------------------------------------------------
+# The SAT and SMT sweeps rebuild the whole model for every variant. Here the
+# Boolean match cube M[(i, j, w, p)] and its exactly-one constraints are built
+# once per n, and every variant-specific part is added under a selector literal
+# (sel -> constraint), so running a variant is one check(selectors):
+#   period   pb        at most two per period as PbLe (SAT_STS)
+#            sum       the same as Sum(If) <= 2 (SMT_STS)
+#   sym      none      no symmetry breaking
+#            rowcol    simple_rowcol_lex of SAT_STS (its default)
+#            weekcode  simple_rowcol_lex of SMT_STS (its default)
+#            <SET>     a set of symmetry.py, e.g. teams or full
+#   mode     dec       satisfiability
+#            opt       total imbalance over home literals h_i_j (i at home
+#                      against j, as in the pair viewpoint of SMT_STS), lowered
+#                      by one literal "obj <= k" per bound
+# The selectors of the other variants are assumed false. Clauses learned by one
+# variant stay valid for the next ones, which can make later variants faster:
+# their times depend on the order they run in. The report compares the time to
+# build the shared model with the time to build every variant on its own
+# (measured unless --no-compare) and is written to res/bench/variants.json.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+import sts, z3_config
+from budget import Budget
+from symmetry import parse_set
+from solution_checker import check_solution
+
+TIME_LIMIT_S = 60
+OUT_PATH = os.path.join(HERE, "..", "res", "bench", "variants.json")
+PERIODS = ("pb", "sum")
+OWN_SYMMETRY = ("none", "rowcol", "weekcode")
+
+class Guarded:
+    """Stands in for the solver in the constraint functions of the backends:
+    everything they add only holds under the selector."""
+    def __init__(self, s, selector):
+        self.s, self.selector = s, selector
+
+    def add(self, *constraints):
+        from z3 import Implies
+        for c in constraints:
+            for x in (c if isinstance(c, (list, tuple)) else [c]):
+                self.s.add(Implies(self.selector, x))
+
+# ----------------------------------------------------------------------------
+# Model parts
+# ----------------------------------------------------------------------------
+def add_core(s, M, n, W, P):
+    sat = sts.backend("sat")
+    sat.constraint_each_pair_once(s, M, n, W, P)
+    sat.constraint_one_match_per_slot(s, M, n, W, P)
+    sat.constraint_team_once_per_week(s, M, n, W, P)
+
+def add_period(s, M, n, W, P, name):
+    if name == "pb":
+        sts.backend("sat").at_most_two_per_period(s, M, n, W, P)
+    else:
+        sts.backend("smt").constraint_at_most_two_per_period_smt(s, M, n, W, P)
+
+def add_symmetry(s, M, n, W, P, name):
+    if name == "rowcol":
+        sts.backend("sat").simple_rowcol_lex(s, M, n, W, P)
+    elif name == "weekcode":
+        sts.backend("smt").simple_rowcol_lex(s, M, n, W, P)
+    elif name != "none":
+        sts.backend("sat").add_z3_constraints(s, M, n, W, P, name)
+
+def add_objective(s, n):
+    """(home literals, total imbalance). The bool encoding of SMT_STS has no
+    sides (i < j is always at home), so its total would be a constant."""
+    from z3 import Bool
+    home = {(i, j): Bool(f"h_{i}_{j}") for i in range(n) for j in range(i + 1, n)}
+    return home, sts.backend("smt").add_pair_home_away_imbalance_expr(s, home, n)
+
+def build_separate(n, period, sym, mode) -> float:
+    """Time to build one variant the way the sweeps do, as a model of its own."""
+    n, W, P = sts.backend("sat").get_parameters(n)
+    t0 = time.time()
+    s = z3_config.make_solver("default", 1, seed=42)
+    M = sts.backend("sat").build_variables(n, W, P)
+    add_core(s, M, n, W, P)
+    add_period(s, M, n, W, P, period)
+    add_symmetry(s, M, n, W, P, sym)
+    if mode == "opt":
+        add_objective(s, n)
+    return time.time() - t0
+
+# ----------------------------------------------------------------------------
+# Shared model
+# ----------------------------------------------------------------------------
+class SharedModel:
+    def __init__(self, n, periods=PERIODS, symmetry=OWN_SYMMETRY, opt=True, seed=42):
+        from z3 import Bool
+        sat = sts.backend("sat")
+        self.n, self.W, self.P = sat.get_parameters(n)
+        n, W, P = self.n, self.W, self.P
+        t0 = time.time()
+        self.s = z3_config.make_solver("default", 1, seed=seed)
+        self.M = M = sat.build_variables(n, W, P)
+        add_core(self.s, M, n, W, P)
+        self.selectors = {}
+        for name in periods:
+            sel = self.selectors["period", name] = Bool(f"sel_period_{name}")
+            add_period(Guarded(self.s, sel), M, n, W, P, name)
+        for name in symmetry:
+            sel = self.selectors["sym", name] = Bool(f"sel_sym_{name}")
+            add_symmetry(Guarded(self.s, sel), M, n, W, P, name)
+        self.home = self.obj = None
+        if opt:
+            sel = self.selectors["mode", "opt"] = Bool("sel_opt")
+            self.home, self.obj = add_objective(Guarded(self.s, sel), n)
+        self.bounds = {}
+        self.build_s = time.time() - t0
+
+    def bound(self, k):
+        from z3 import Bool, Implies
+        if k not in self.bounds:
+            self.bounds[k] = Bool(f"obj_le_{k}")
+            self.s.add(Implies(self.bounds[k], self.obj <= k))
+        return self.bounds[k]
+
+    def assumptions(self, period, sym, mode):
+        from z3 import Not
+        on = {("period", period), ("sym", sym), ("mode", mode)}
+        return [sel if key in on else Not(sel) for key, sel in self.selectors.items()]
+
+    def run(self, period, sym, mode, time_limit=TIME_LIMIT_S) -> dict:
+        budget = Budget(time_limit)
+        lits = self.assumptions(period, sym, mode)
+
+        def check(*extra):
+            self.s.set("timeout", budget.timeout_ms())
+            return str(self.s.check(*lits, *extra))
+
+        from z3 import is_true
+        res, best = check(), None
+        optimal = res == "unsat"
+        if res == "sat":
+            model = self.s.model()
+            if mode == "opt":
+                best, r = model.evaluate(self.obj, model_completion=True).as_long(), res
+                # the imbalance of every team is odd, so the bound drops by 2
+                while best > self.n and not budget.expired():
+                    r = check(self.bound(best - 2))
+                    if r != "sat":
+                        break
+                    model = self.s.model()
+                    best = model.evaluate(self.obj, model_completion=True).as_long()
+                optimal = best == self.n or r == "unsat"
+            else:
+                optimal = True
+            sol = sts.backend("sat").extract_solution(model, self.M, self.W, self.P)
+            if mode == "opt":
+                sol = [[m if is_true(model.evaluate(self.home[m[0] - 1, m[1] - 1], model_completion=True))
+                        else m[::-1] for m in row] for row in sol]
+            if check_solution(sol, best, 0, optimal) != "Valid solution":
+                res = "invalid"
+        return {"status": res, "time": round(budget.elapsed(), 3), "obj": best, "optimal": optimal}
+
+# ----------------------------------------------------------------------------
+# Sweep
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run every configuration variant of the Z3 Boolean "
+                                                 "model on one incremental model per n")
+    parser.add_argument("ns", type=int, nargs="+", help="even numbers of teams")
+    parser.add_argument("--periods", nargs="+", choices=PERIODS, default=list(PERIODS),
+                        help="encodings of the period limit (default: pb sum)")
+    parser.add_argument("--symmetry", nargs="+", default=list(OWN_SYMMETRY), metavar="SYM",
+                        help="none, rowcol, weekcode or sets of symmetry.py (default: none rowcol weekcode)")
+    parser.add_argument("--modes", nargs="+", choices=("dec", "opt"), default=["dec", "opt"])
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit per variant in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--no-compare", action="store_true",
+                        help="do not build every variant on its own to measure the construction time saved")
+    parser.add_argument("--out", default=OUT_PATH, help="JSON report path")
+    args = parser.parse_args()
+    for n in args.ns:
+        if n < 4 or n % 2:
+            parser.error("every n must be an even integer >= 4")
+    for name in args.symmetry:
+        if name not in OWN_SYMMETRY:
+            try:
+                parse_set(name)
+            except ValueError as e:
+                parser.error(str(e))
+
+    report, shared_total, separate_total = {}, 0.0, 0.0
+    variants = [(p, s, m) for m in args.modes for p in args.periods for s in args.symmetry]
+    for n in args.ns:
+        model = SharedModel(n, args.periods, args.symmetry, "opt" in args.modes)
+        rows = {}
+        for period, sym, mode in variants:
+            name = f"{mode}_{period}_{sym}"
+            rows[name] = model.run(period, sym, mode, args.time_limit)
+            r = rows[name]
+            print(f"n={n:<3} {name:<24} {r['status']:<8} {r['time']:8.3f}s"
+                  + (f"  obj={r['obj']}" if r["obj"] is not None else ""))
+        entry = {"shared_build_s": round(model.build_s, 3), "variants": rows}
+        shared_total += model.build_s
+        if not args.no_compare:
+            separate = sum(build_separate(n, *v) for v in variants)
+            separate_total += separate
+            entry.update(separate_build_s=round(separate, 3), saved_s=round(separate - model.build_s, 3))
+            print(f"n={n:<3} construction: shared {model.build_s:.3f}s, one model per variant "
+                  f"{separate:.3f}s, saved {separate - model.build_s:.3f}s")
+        else:
+            print(f"n={n:<3} construction: shared {model.build_s:.3f}s for {len(variants)} variants")
+        report[str(n)] = entry
+
+    if not args.no_compare:
+        report["total"] = {"shared_build_s": round(shared_total, 3), "separate_build_s": round(separate_total, 3),
+                           "saved_s": round(separate_total - shared_total, 3)}
+        print(f"sweep construction: shared {shared_total:.3f}s, one model per variant {separate_total:.3f}s, "
+              f"saved {separate_total - shared_total:.3f}s")
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
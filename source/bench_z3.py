@@ -0,0 +1,85 @@
+import os, sys, time, json, argparse
+from itertools import product
+from types import SimpleNamespace
+
+# ----------------------------------------------------------------------------
+# Benchmark of the Z3 solver configurations (see z3_config.py)
+# ----------------------------------------------------------------------------
+# Solves the decision model of one backend once per (n, encoding, configuration,
+# threads) and reports the solve time and the speed-up over the Boolean
+# encoding with the "default" configuration and 1 thread. Only SMT has the
+# int/bv pair encodings.
+# SAT and SMT both import a module called `constraints`, so a run benchmarks
+# one backend only.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from z3_config import CONFIGS, config_suffix
+
+TIME_LIMIT_S = 300
+BACKENDS = {"sat": ("SAT", "SAT_STS"), "smt": ("SMT", "SMT_STS")}
+
+def load_backend(name):
+    folder, module = BACKENDS[name]
+    sys.path.insert(0, os.path.join(HERE, folder))
+    return __import__(module)
+
+def run(backend, n, config, threads, time_limit, symmetry=None, encoding="bool"):
+    args = SimpleNamespace(z3_config=config, threads=threads, symmetry=symmetry, no_sb=False,
+                           encoding=encoding)
+    s, _ = backend.build_solver(n, args)
+    s.set("timeout", time_limit * 1000)
+    t0 = time.time()
+    res = str(s.check())
+    if res == "unknown":
+        # a timeout, or a pipeline that cannot handle the formula
+        return res, None, s.reason_unknown()
+    return res, time.time() - t0, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Z3 solver configurations on the STS decision models")
+    parser.add_argument("ns", type=int, nargs="+", help="even numbers of teams")
+    parser.add_argument("--backend", choices=BACKENDS, default="sat", help="model to benchmark (default: sat)")
+    parser.add_argument("--configs", choices=CONFIGS, nargs="+", default=list(CONFIGS),
+                        help="configurations to compare (default: all)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1],
+                        help="thread counts to try for every configuration (default: 1)")
+    parser.add_argument("--encodings", choices=("bool", "int", "bv"), nargs="+", default=["bool"],
+                        help="SMT encodings to compare (default: bool)")
+    parser.add_argument("--symmetry", metavar="SET", help="symmetry set of symmetry.py (default: built-in)")
+    parser.add_argument("--time-limit", type=int, default=TIME_LIMIT_S,
+                        help=f"time limit per run in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--out", help="JSON report path (default: res/bench/z3_<backend>.json)")
+    args = parser.parse_args()
+    if args.backend == "sat" and args.encodings != ["bool"]:
+        parser.error("--encodings is only available for the smt backend")
+
+    backend = load_backend(args.backend)
+    report = {}
+    for n in args.ns:
+        rows = report.setdefault(str(n), {})
+        base = None
+        for encoding, config, threads in product(args.encodings, args.configs, args.threads):
+            status, elapsed, reason = run(backend, n, config, threads, args.time_limit,
+                                          args.symmetry, encoding)
+            name = config + config_suffix("default", threads)
+            if encoding != "bool":
+                name = f"{encoding}/{name}"
+            if (encoding, config, threads) == ("bool", "default", 1):
+                base = elapsed
+            speedup = round(base / elapsed, 2) if base and elapsed else None
+            rows[name] = {"status": status,
+                          "time": round(elapsed, 3) if elapsed is not None else None,
+                          "speedup": speedup, "reason": reason}
+            t = f"{elapsed:8.3f}s" if elapsed is not None else " " * 9
+            print(f"[{args.backend}] n={n:<3} {name:<16} {status:<8} {t}  x{speedup or '-'}"
+                  + (f"  ({reason[:60]})" if reason else ""))
+
+    out = args.out or os.path.join(HERE, "..", "res", "bench", f"z3_{args.backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✔ report written to {out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import time
+from math import floor
+
+# ----------------------------------------------------------------------------
+# Time budget of one solve
+# ----------------------------------------------------------------------------
+# Created before the model is built, so that building counts against the limit,
+# and asked for the timeout of every solver call after that (Z3 checks,
+# MiniZinc solves, HiGHS runs, AMPL solves, LNS sub-solves):
+#   budget = Budget(300)
+#   s.set("timeout", budget.timeout_ms(cap_s=60))   # at most 60s, never past the deadline
+#   while not budget.expired(): ...                 # stop at the deadline, keep the incumbent
+#   entry["time"] = budget.seconds()                # whole seconds, capped at the limit
+# A multi-phase solve passes its budget down instead of a time limit, so the
+# phases share one deadline.
+
+TIME_LIMIT_S = 300
+
+class Budget:
+    def __init__(self, total_s: float = TIME_LIMIT_S):
+        self.total = total_s
+        self.start = time.time()
+
+    @property
+    def deadline(self) -> float:
+        return self.start + self.total
+
+    def elapsed(self) -> float:
+        return time.time() - self.start
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.time())
+
+    def expired(self, margin_s: float = 0.0) -> bool:
+        """True once less than margin_s is left."""
+        return self.remaining() <= margin_s
+
+    def timeout_s(self, cap_s: float = None) -> float:
+        """Time for the next sub-call: what is left, at most cap_s."""
+        left = self.remaining()
+        return left if cap_s is None else min(left, cap_s)
+
+    def timeout_ms(self, cap_s: float = None) -> int:
+        # Z3 reads a timeout of 0 as no timeout
+        return max(1, int(self.timeout_s(cap_s) * 1000))
+
+    def seconds(self) -> int:
+        """Elapsed time as stored in the result entries."""
+        return min(floor(self.elapsed()), self.total)
+
+    def __repr__(self):
+        return f"Budget({self.elapsed():.1f}s of {self.total}s used)"
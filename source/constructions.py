@@ -0,0 +1,215 @@
+import random
+
+# ----------------------------------------------------------------------------
+# Direct constructions of STS schedules
+# ----------------------------------------------------------------------------
+# The circle method (SAT_STS.circle_factorization/circle_periods, LS_STS) gives
+# a valid schedule whenever 3 does not divide n-1. The half split below covers
+# n/2 odd and the rotational schedule n = 4 (mod 12) from 16 on, so only n = 4
+# and n = 10 are left.
+#
+# Half split. With k = n/2 odd, the teams are x_i = i and y_i = k + i (i in Z_k)
+# and the periods are Z_k. For j = 1..m, m = (k-1)/2:
+#   weeks r = 0..k-1          (x_r, y_r) in period r, (x_{r+j}, x_{r-j}) in
+#                             period r + c_j and (y_{r+j}, y_{r-j}) in period r - c_j
+#   weeks k-1+d, d = 1..k-1   (x_i, y_{i+d}) in period i + 2d
+# In the second part every team plays once in every period but its own (x_i and
+# y_i miss period i). In the first part x_i plays in the periods i, i + c_j - j
+# and i + c_j + j, so it is valid if the values c_j -+ j are the nonzero elements
+# of Z_k; the weeks need {0, c_j, -c_j} = Z_k. Both hold for c_j = u_j + v_j
+# with {u_j, v_j = u_j + j} a skew starter of Z_k: pairs partitioning Z_k \ {0}
+# whose differences are 1..m and whose sums are nonzero and distinct up to sign.
+# The randomised search below finds one in well under a second up to n = 100;
+# Z_5 has none (n = 10).
+#
+# Rotational schedule. With m = n/2 - 1 (m = 1 mod 6), the teams are x_u = u,
+# y_u = m + u (u in Z_m), i1 = 2m and i2 = 2m + 1, the periods are Z_m and a
+# fixed period m. A base week of m + 1 pairs is developed by u -> u + r:
+#   weeks r = 0..m-1        the base week shifted by r (i1, i2 and period m stay)
+#   weeks m+r, r = 0..m-1   the same with x and y swapped (and i1, i2 if m = 3
+#                           mod 4)
+#   week 2m                 (x_i, y_i) in period i, (i1, i2) in period m
+# Every difference class of pairs, {x_u, x_u+d} or {y_u, y_u+d} (d = 1..(m-1)/2,
+# the swap supplies the other one), {x_u, y_u+-d}, {i1, x_u} and {i2, y_u} (x_u
+# if m = 3 mod 4) then occurs once, so the weeks are a 1-factorization. A pair
+# {a, b} of positions u, v placed in period u + v gives the team of a the
+# offset (period - position) v and the team of b the offset u; a team plays
+# twice in a period iff two of its offsets agree, so the regular pairs fill the
+# periods on their own. The base week holds i1 with x_0 in period c1, i2 with
+# the position b in period b + c2 and the pair of positions c1, c2 in period m:
+# their offsets take the places of the positions they remove. The sums of the
+# squares of the pair sums and differences force b^2 - 2 b c2 + 2 c1 c2 = 0
+# (mod m); the other pairs are an exact cover of the classes, positions and
+# periods left, found by Algorithm X with restarts (about a second up to n = 88,
+# a few seconds for n = 100).
+
+def skew_starter(k, rng=None, max_nodes=20000):
+    """pairs[j-1] = (u_j, u_j + j) of a skew starter of Z_k, or None if there is none."""
+    rng = rng or random.Random(42)
+    m = (k - 1) // 2
+    while True:
+        used, sums = [False] * k, [False] * k
+        used[0] = sums[0] = True
+        pairs, nodes = {}, [0]
+
+        def options(j):
+            return [u for u in range(1, k)
+                    if not used[u] and not used[(u + j) % k] and not sums[(2 * u + j) % k]]
+
+        def extend():
+            if len(pairs) == m:
+                return True
+            nodes[0] += 1
+            if nodes[0] > max_nodes:
+                return False
+            # the difference with the fewest possible pairs first
+            j, opts = min(((j, options(j)) for j in range(1, m + 1) if j not in pairs), key=lambda t: len(t[1]))
+            rng.shuffle(opts)
+            for u in opts:
+                v, s = (u + j) % k, (2 * u + j) % k
+                used[u] = used[v] = sums[s] = sums[-s % k] = True
+                pairs[j] = (u, v)
+                if extend():
+                    return True
+                del pairs[j]
+                used[u] = used[v] = sums[s] = sums[-s % k] = False
+            return False
+
+        if extend():
+            return [pairs[j] for j in range(1, m + 1)]
+        if nodes[0] <= max_nodes:
+            return None     # the search was complete
+        # restart with another random order
+
+def exact_cover(X, Y, rng, max_nodes):
+    """Knuth's Algorithm X: X maps every item to its options, Y every option to
+    its items. The options of an exact cover, or None after max_nodes nodes.
+    X is consumed."""
+    chosen, nodes = [], [0]
+
+    def select(r):
+        cols = []
+        for j in Y[r]:
+            for i in X[j]:
+                for k in Y[i]:
+                    if k != j:
+                        X[k].discard(i)
+            cols.append(X.pop(j))
+        return cols
+
+    def deselect(r, cols):
+        for j in reversed(Y[r]):
+            X[j] = cols.pop()
+            for i in X[j]:
+                for k in Y[i]:
+                    if k != j:
+                        X[k].add(i)
+
+    def search():
+        if not X:
+            return True
+        nodes[0] += 1
+        if nodes[0] > max_nodes:
+            return False
+        opts = list(min(X.values(), key=len))
+        rng.shuffle(opts)
+        for r in opts:
+            chosen.append(r)
+            cols = select(r)
+            if search():
+                return True
+            deselect(r, cols)
+            chosen.pop()
+        return False
+
+    return chosen if search() else None
+
+def rotational_base(m, rng, max_nodes=3000):
+    """The base week of the rotational schedule as (a, b, period) triples."""
+    h = (m - 1) // 2
+    other = m if m % 4 == 1 else 0      # i2 plays a y if m = 1 (mod 4), else an x
+    classes = [(c, d) for c in ("s", "xy") for d in range(1, h + 1)]
+    pos = lambda t: t % m
+    while True:
+        b, c2 = rng.randrange(m), rng.randrange(1, m)
+        roots = [c for c in range(m) if (b * b - 2 * b * c2 + 2 * c * c2) % m == 0]
+        if not roots:
+            continue
+        c1 = rng.choice(roots)
+        d = (c2 - c1) % m
+        if d == 0:
+            continue
+        if rng.random() < 0.5:
+            kind = rng.choice((0, m))
+            fixed, cls = (kind + c1, kind + c2), ("s", min(d, m - d))
+        else:
+            fixed, cls = rng.choice(((c1, m + c2), (m + c1, c2))), ("xy", min(d, m - d))
+        q1, q2 = c1, (b + c2) % m
+        special = {*fixed, 0, other + b}
+        if len(special) < 4 or q1 == q2:
+            continue
+        Y = {}
+        for c, d in classes:
+            if (c, d) == cls:
+                continue
+            for u in range(m):
+                pairs = ([(u, (u + d) % m), (m + u, m + (u + d) % m)] if c == "s"
+                         else [(u, m + (u + d) % m), (u, m + (u - d) % m)])
+                for s, t in pairs:
+                    p = (pos(s) + pos(t)) % m
+                    if s not in special and t not in special and p not in (q1, q2):
+                        Y[s, t] = [(c, d), s, t, ("p", p)]
+        X = {}
+        for r, items in Y.items():
+            for j in items:
+                X.setdefault(j, set()).add(r)
+        # m - 2 classes, 2m - 4 teams and m - 2 periods to cover
+        if len(X) < 4 * m - 8:
+            continue
+        cover = exact_cover(X, Y, rng, max_nodes)
+        if cover is not None:
+            return ([(s, t, (pos(s) + pos(t)) % m) for s, t in cover]
+                    + [(*fixed, m), (2 * m, 0, q1), (2 * m + 1, other + b, q2)])
+
+def rotational(n, rng=None):
+    """schedule[w][p] = (a, b), the 0-based teams playing in period p of week w,
+    or None unless n = 4 (mod 12) and n >= 16."""
+    if n % 12 != 4 or n < 16:
+        return None
+    m = n // 2 - 1
+    base = rotational_base(m, rng or random.Random(42))
+
+    def team(t, r, swap):
+        if t >= 2 * m:
+            return 4 * m + 1 - t if swap and m % 4 == 3 else t
+        kind, u = divmod(t, m)
+        return (1 - kind if swap else kind) * m + (u + r) % m
+
+    schedule = []
+    for swap in (False, True):
+        for r in range(m):
+            week = [None] * (m + 1)
+            for a, b, p in base:
+                week[p if p == m else (p + r) % m] = (team(a, r, swap), team(b, r, swap))
+            schedule.append(week)
+    schedule.append([(i, m + i) for i in range(m)] + [(2 * m, 2 * m + 1)])
+    return schedule
+
+def half_split(n, rng=None):
+    """schedule[w][p] = (a, b), the 0-based teams playing in period p of week w,
+    or None if n/2 is even or Z_{n/2} has no skew starter."""
+    k = n // 2
+    starter = skew_starter(k, rng) if k % 2 and k > 1 else None
+    if starter is None:
+        return None
+    schedule = [[None] * k for _ in range(n - 1)]
+    for r in range(k):
+        schedule[r][r] = (r, k + r)
+        for j, (u, v) in enumerate(starter, 1):
+            c = (u + v) % k
+            schedule[r][(r + c) % k] = ((r + j) % k, (r - j) % k)
+            schedule[r][(r - c) % k] = (k + (r + j) % k, k + (r - j) % k)
+    for d in range(1, k):
+        for i in range(k):
+            schedule[k - 1 + d][(i + 2 * d) % k] = (i, k + (i + d) % k)
+    return schedule
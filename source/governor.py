@@ -0,0 +1,211 @@
+import os, re, sys, json, time, pickle, select, signal, resource, traceback
+from dataclasses import dataclass, asdict
+import profiling
+
+# ----------------------------------------------------------------------------
+# Resource governor: every solve of the command line tools is a job
+# ----------------------------------------------------------------------------
+# A job runs in a forked child process that first applies the limits:
+#   --mem-limit MB  RLIMIT_AS (address space) of the child, inherited by the
+#                   solver processes it starts (MiniZinc, AMPL). Linux does not
+#                   enforce RLIMIT_RSS, so the address space stands in for it;
+#                   multi-threaded solvers reserve more than they touch.
+#   --cpus LIST     CPU affinity, e.g. 0-3 or 2,5: parallel runs pinned to
+#                   disjoint sets do not disturb each other's timings
+# The parent waits for the child with wait4, which returns the peak RSS and the
+# CPU time of the child and of every solver process it waited for, so they are
+# exact even for a job that was killed. Every job is appended to
+# res/jobs/<backend>.jsonl. A job is a memout if it raised MemoryError or a
+# solver error mentioning an allocation failure, or died of SIGKILL (the OOM
+# killer) or, under a memory limit, of SIGABRT/SIGSEGV/SIGBUS; its result entry
+# is then written as {"sol": [], "time": 300, "optimal": false, "obj": None,
+# "status": "memout"}. The child also replaces the gc.collect() cleanup between
+# the runs of a sweep: its memory goes back to the OS when it exits.
+# --profile runs the job under profiling.py, which writes its report next to
+# the result file.
+# Linux only (fork, sched_setaffinity).
+
+RES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "res")
+JOBS_DIR = os.path.join(RES_DIR, "jobs")
+TIME_LIMIT_S = 300
+# extra wall-clock time before a job that ignores its own time limit is killed
+GRACE_S = 60
+MEMOUT_PATTERN = re.compile(r"out of memory|bad_alloc|cannot allocate memory|memoryerror|memory ?limit", re.I)
+MEMOUT_SIGNALS = (signal.SIGABRT, signal.SIGSEGV, signal.SIGBUS)
+
+@dataclass
+class Limits:
+    mem_mb: int = None
+    cpus: tuple = None
+
+@dataclass
+class Job:
+    status: str                 # ok | memout | timeout | error | crash
+    value: object = None        # return value of the job function
+    error: str = None
+    peak_rss_mb: float = 0.0
+    cpu_s: float = 0.0
+    wall_s: float = 0.0
+
+def parse_cpus(text: str) -> tuple:
+    """'0-3,6' -> (0, 1, 2, 3, 6)"""
+    cpus = set()
+    for part in text.split(","):
+        lo, _, hi = part.strip().partition("-")
+        try:
+            cpus.update(range(int(lo), int(hi or lo) + 1))
+        except ValueError:
+            raise ValueError(f"invalid CPU list {text!r} (expected e.g. 0-3,6)")
+    available = os.sched_getaffinity(0)
+    if not cpus or not cpus <= available:
+        raise ValueError(f"CPUs {sorted(cpus - available) or text} are not available "
+                         f"(this process may use {sorted(available)})")
+    return tuple(sorted(cpus))
+
+def add_arguments(parser):
+    parser.add_argument("--mem-limit", type=int, default=None, metavar="MB",
+                        help="address-space limit of every solve in MB (default: none)")
+    parser.add_argument("--cpus", default=None, metavar="LIST",
+                        help="pin every solve to these CPUs, e.g. 0-3 or 2,5 (default: no pinning)")
+    profiling.add_arguments(parser)
+
+def limits_from_args(parser, args) -> Limits:
+    try:
+        cpus = parse_cpus(args.cpus) if args.cpus else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.mem_limit is not None and args.mem_limit <= 0:
+        parser.error("--mem-limit must be positive")
+    return Limits(args.mem_limit, cpus)
+
+def apply(limits: Limits):
+    """Applies the limits to the calling process (and its future children)."""
+    if limits.mem_mb:
+        size = limits.mem_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (size, size))
+    if limits.cpus:
+        os.sched_setaffinity(0, limits.cpus)
+
+def is_memout(e: BaseException) -> bool:
+    return isinstance(e, MemoryError) or bool(MEMOUT_PATTERN.search(f"{type(e).__name__}: {e}"))
+
+def check_z3(solver):
+    """Z3 answers unknown when it cannot allocate; raises MemoryError then."""
+    reason = solver.reason_unknown()
+    if MEMOUT_PATTERN.search(reason):
+        raise MemoryError(f"Z3: {reason}")
+
+# ----------------------------------------------------------------------------
+# Running a job
+# ----------------------------------------------------------------------------
+def _child(w, limits, fn, args, kwargs):
+    os.setpgid(0, 0)
+    try:
+        apply(limits)
+        report = ("ok", fn(*args, **kwargs), None)
+    except BaseException as e:
+        if not is_memout(e):
+            traceback.print_exc()
+        report = ("memout" if is_memout(e) else "error", None, f"{type(e).__name__}: {e}")
+    try:
+        data = pickle.dumps(report)
+    except Exception:
+        data = pickle.dumps((report[0], None, report[2]))
+    with os.fdopen(w, "wb") as f:
+        f.write(data)
+
+def run(fn, *args, limits: Limits = Limits(), wall_limit: float = None, **kwargs) -> Job:
+    """Runs fn(*args, **kwargs) as a job; the return value must be picklable."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    r, w = os.pipe()
+    t0 = time.time()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        try:
+            _child(w, limits, fn, args, kwargs)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(0)
+    os.close(w)
+    chunks, killed = [], False
+    try:
+        with os.fdopen(r, "rb") as f:
+            while True:
+                left = None if wall_limit is None else wall_limit - (time.time() - t0)
+                if left is not None and left <= 0:
+                    killed = True
+                    break
+                ready, _, _ = select.select([f], [], [], left)
+                if ready:
+                    chunk = os.read(f.fileno(), 1 << 16)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+    except BaseException:
+        _kill(pid)
+        os.wait4(pid, 0)
+        raise
+    if killed:
+        _kill(pid)
+    _, status, usage = os.wait4(pid, 0)
+    job = Job("crash", peak_rss_mb=round(usage.ru_maxrss / 1024, 1),
+              cpu_s=round(usage.ru_utime + usage.ru_stime, 3), wall_s=round(time.time() - t0, 3))
+    if chunks:
+        job.status, job.value, job.error = pickle.loads(b"".join(chunks))
+    elif killed:
+        job.status, job.error = "timeout", f"killed after {wall_limit}s"
+    elif os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        if sig == signal.SIGKILL or (limits.mem_mb and sig in MEMOUT_SIGNALS):
+            job.status = "memout"
+        job.error = f"killed by {signal.Signals(sig).name}"
+    else:
+        job.error = f"exit status {os.WEXITSTATUS(status)}"
+    return job
+
+def _kill(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+# ----------------------------------------------------------------------------
+# Job log and memout entries
+# ----------------------------------------------------------------------------
+def log(backend: str, n: int, key: str, limits: Limits, job: Job):
+    record = {"n": n, "key": key, "mem_limit_mb": limits.mem_mb, "cpus": limits.cpus,
+              **{k: v for k, v in asdict(job).items() if k != "value"},
+              "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    with open(os.path.join(JOBS_DIR, f"{backend}.jsonl"), "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def write_memout(res_file, key: str, time_limit: int = TIME_LIMIT_S):
+    res_file = str(res_file)
+    data = {}
+    if os.path.isfile(res_file):
+        with open(res_file) as f:
+            data = json.load(f)
+    data[key] = {"sol": [], "time": time_limit, "optimal": False, "obj": None, "status": "memout"}
+    os.makedirs(os.path.dirname(os.path.abspath(res_file)), exist_ok=True)
+    with open(res_file, "w") as f:
+        json.dump(data, f, indent=2)
+
+def run_job(backend: str, n: int, key: str, res_file, limits: Limits, fn, *args,
+            time_limit: int = TIME_LIMIT_S, profile: bool = False, **kwargs) -> Job:
+    """Runs one solve of a command line tool as a job, logs it and writes the
+    memout entry if needed. Returns the Job."""
+    if profile:
+        fn = profiling.wrap(fn, res_file, key, backend=backend, n=n)
+    job = run(fn, *args, limits=limits, wall_limit=time_limit + GRACE_S, **kwargs)
+    log(backend, n, key, limits, job)
+    if job.status == "memout":
+        write_memout(res_file, key, time_limit)
+        print(f"[RESULT] MEMOUT {key} n={n} after {job.wall_s}s (peak RSS {job.peak_rss_mb} MB): {job.error}")
+    elif job.status != "ok":
+        print(f"[RESULT] {job.status.upper()} {key} n={n}: {job.error}")
+    print(f"[Job] peak RSS {job.peak_rss_mb} MB | CPU {job.cpu_s}s | wall {job.wall_s}s")
+    return job
@@ -0,0 +1,396 @@
+import os, sys, json, hashlib, argparse
+from collections import Counter
+
+# ----------------------------------------------------------------------------
+# Schedule pool: answering requests by relabelling known schedules
+# ----------------------------------------------------------------------------
+# A schedule stays a schedule under a relabelling of the teams, a permutation
+# of the weeks or of the periods (see symmetry.py) and under a swap of home and
+# away, so one schedule per n answers most requests of the form
+#   ("match", a, b, w)   teams a and b meet in week w
+#   ("home", t, w)       team t plays at home in week w
+# (1-based, like the result files). The pool keeps every verified schedule it
+# is given in res/pool/n<N>.json:
+#   - the key is an isomorphism-invariant signature (colour refinement over
+#     teams, weeks and periods, the same for both home/away orientations), so a
+#     relabelled copy of a pooled schedule is not stored again;
+#   - the schedule is stored with its teams numbered by first appearance and
+#     with its total imbalance.
+# answer() first searches a pooled schedule and a relabelling of its teams and
+# weeks that meets the constraints (backtracking over the constrained teams,
+# at most NODE_LIMIT nodes per schedule), and calls the solver (SMT, int pair
+# encoding, no symmetry breaking) only on a miss; what it finds is pooled.
+# In dec mode the side of every match is free; in opt mode only the global
+# home/away swap is used, which keeps the imbalance, and a pooled answer is
+# optimal if its imbalance is n or the solver proves that it cannot be beaten.
+#   python source/pool.py harvest                 # pool the schedules of res/*
+#   python source/pool.py query 8 --match 1 2 3 --home 4 1 [--mode opt]
+#   python source/pool.py stats
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from solution_checker import check_solution
+from schedule_state import ScheduleState
+from budget import Budget, TIME_LIMIT_S
+import sts
+
+RES_DIR = os.path.join(HERE, "..", "res")
+POOL_DIR = os.path.join(RES_DIR, "pool")
+# result folders that do not hold schedules
+SKIP_DIRS = ("pool", "jobs", "bench")
+NODE_LIMIT = 50_000
+REFINE_ROUNDS = 3
+
+# ----------------------------------------------------------------------------
+# Canonical form and signature
+# ----------------------------------------------------------------------------
+def normalise(sol):
+    """Numbers the teams by first appearance, week by week and period by period."""
+    label = {}
+    for w in range(len(sol[0])):
+        for row in sol:
+            for t in row[w]:
+                label.setdefault(t, len(label) + 1)
+    return [[[label[h], label[a]] for h, a in row] for row in sol]
+
+def _digest(obj):
+    # hash() of str is salted per process, the signatures are stored
+    return hashlib.blake2b(repr(obj).encode(), digest_size=8).hexdigest()
+
+def _refine(sol):
+    matches = [(p, w, h, a) for p, row in enumerate(sol) for w, (h, a) in enumerate(row)]
+    team = {t: "" for m in matches for t in m[2:]}
+    week, period = [""] * len(sol[0]), [""] * len(sol)
+    for _ in range(REFINE_ROUNDS):
+        t_nb, w_nb, p_nb = {t: [] for t in team}, [[] for _ in week], [[] for _ in period]
+        for p, w, h, a in matches:
+            t_nb[h].append(("H", team[a], week[w], period[p]))
+            t_nb[a].append(("A", team[h], week[w], period[p]))
+            w_nb[w].append((team[h], team[a], period[p]))
+            p_nb[p].append((team[h], team[a], week[w]))
+        team = {t: _digest((team[t], sorted(nb))) for t, nb in t_nb.items()}
+        week = [_digest((week[w], sorted(nb))) for w, nb in enumerate(w_nb)]
+        period = [_digest((period[p], sorted(nb))) for p, nb in enumerate(p_nb)]
+    return _digest((sorted(team.values()), sorted(week), sorted(period)))
+
+def signature(sol) -> str:
+    """Equal for schedules that differ by a relabelling of the teams, the weeks
+    or the periods, or by swapping home and away in every match."""
+    return min(_refine(sol), _refine([[[a, h] for h, a in row] for row in sol]))
+
+# ----------------------------------------------------------------------------
+# Constraints
+# ----------------------------------------------------------------------------
+def parse_constraints(n: int, items) -> list:
+    """Checks ["match", a, b, w] / ["home", t, w] items, returns them as tuples."""
+    out = []
+    for item in items:
+        kind, *args = list(item) or [None]
+        if (kind, len(args)) not in (("match", 3), ("home", 2)):
+            raise ValueError(f"invalid constraint {list(item)} (expected [\"match\", a, b, w] or [\"home\", t, w])")
+        teams, w = args[:-1], args[-1]
+        if any(not 1 <= t <= n for t in teams) or len(set(teams)) != len(teams):
+            raise ValueError(f"invalid teams in {list(item)} (1..{n}, distinct)")
+        if not 1 <= w <= n - 1:
+            raise ValueError(f"invalid week in {list(item)} (1..{n - 1})")
+        out.append((kind, *args))
+    return out
+
+def satisfies(sol, constraints) -> bool:
+    for kind, *args in constraints:
+        col = [row[args[-1] - 1] for row in sol]
+        if kind == "match" and [args[0], args[1]] not in col and [args[1], args[0]] not in col:
+            return False
+        if kind == "home" and not any(m[0] == args[0] for m in col):
+            return False
+    return True
+
+# ----------------------------------------------------------------------------
+# Relabelling search
+# ----------------------------------------------------------------------------
+class _Exhausted(Exception):
+    pass
+
+def relabel(sol, constraints, *, keep_sides=False, node_limit=NODE_LIMIT):
+    """A copy of `sol` with its teams and weeks relabelled (and sides swapped)
+    so that it meets the constraints, or None if there is none (or none within
+    node_limit nodes). With keep_sides only the global home/away swap is used."""
+    P, W = len(sol), len(sol[0])
+    n = 2 * P
+    meet, opp = {}, [[0] * W for _ in range(n + 1)]
+    at_home = [[False] * W for _ in range(n + 1)]
+    for row in sol:
+        for w, (h, a) in enumerate(row):
+            meet[h, a] = meet[a, h] = w
+            opp[h][w], opp[a][w] = a, h
+            at_home[h][w] = True
+    matches, homes = [], {}
+    for kind, *args in constraints:
+        if kind == "match":
+            matches.append((args[0], args[1], args[2] - 1))
+        else:
+            homes.setdefault(args[1] - 1, []).append(args[0])
+    # most constrained teams first; a match is checked once both teams are placed
+    load = Counter(t for a, b, _ in matches for t in (a, b)) + Counter(t for ts in homes.values() for t in ts)
+    order = sorted(load, key=lambda t: -load[t])
+    rank = {t: i for i, t in enumerate(order)}
+    due = {t: [] for t in order}
+    for a, b, w in matches:
+        due[max(a, b, key=rank.get)].append((a, b, w))
+    pi, used, wmap, wused = {}, set(), {}, set()
+    nodes = 0
+
+    def tick():
+        nonlocal nodes
+        nodes += 1
+        if nodes > node_limit:
+            raise _Exhausted
+
+    def week_ok(w, cw, flip):
+        # the home constraints of requested week w in pooled week cw
+        ts = [pi[t] for t in homes.get(w, ()) if t in pi]
+        if keep_sides:
+            return all(at_home[c][cw] != flip for c in ts)
+        # every side can be swapped, unless two of the teams play each other
+        return not any(opp[c][cw] in ts for c in ts)
+
+    def place_weeks(free, flip):
+        if not free:
+            return True
+        w = free[0]
+        for cw in range(W):
+            tick()
+            if cw not in wused and week_ok(w, cw, flip):
+                wmap[w] = cw
+                wused.add(cw)
+                if place_weeks(free[1:], flip):
+                    return True
+                del wmap[w]
+                wused.discard(cw)
+        return False
+
+    def assign(i, flip):
+        if i == len(order):
+            return place_weeks([w for w in sorted(homes) if w not in wmap], flip)
+        t = order[i]
+        for c in range(1, n + 1):
+            if c in used:
+                continue
+            tick()
+            pi[t] = c
+            used.add(c)
+            added, ok = [], True
+            for a, b, w in due[t]:
+                cw = meet[pi[a], pi[b]]
+                if w in wmap:
+                    ok = wmap[w] == cw
+                elif cw in wused:
+                    ok = False
+                else:
+                    wmap[w] = cw
+                    wused.add(cw)
+                    added.append(w)
+                if not ok:
+                    break
+            if ok and all(week_ok(w, wmap[w], flip) for w in homes if w in wmap) and assign(i + 1, flip):
+                return True
+            for w in added:
+                wused.discard(wmap.pop(w))
+            used.discard(c)
+            del pi[t]
+        return False
+
+    try:
+        for flip in ((False, True) if keep_sides else (False,)):
+            if assign(0, flip):
+                break
+        else:
+            return None
+    except _Exhausted:
+        return None
+
+    team_of = {c: t for t, c in pi.items()}
+    free = iter(t for t in range(1, n + 1) if t not in pi)
+    for c in range(1, n + 1):
+        if c not in team_of:
+            team_of[c] = next(free)
+    week_of = {cw: w for w, cw in wmap.items()}
+    free = iter(w for w in range(W) if w not in wmap)
+    for cw in range(W):
+        if cw not in week_of:
+            week_of[cw] = next(free)
+    out = [[None] * W for _ in range(P)]
+    for p, row in enumerate(sol):
+        for cw, (h, a) in enumerate(row):
+            h, a, w = team_of[h], team_of[a], week_of[cw]
+            swap = flip if keep_sides else a in homes.get(w, ())
+            out[p][w] = [a, h] if swap else [h, a]
+    return out
+
+# ----------------------------------------------------------------------------
+# Pool
+# ----------------------------------------------------------------------------
+class Pool:
+    def __init__(self, n: int, path: str = None):
+        self.n = n
+        self.path = path or os.path.join(POOL_DIR, f"n{n}.json")
+        self.entries = {}           # signature -> {"sol", "obj", "source"}
+        if os.path.isfile(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, sol, source: str = "") -> bool:
+        """Pools a valid schedule for n teams; False if invalid or already pooled."""
+        if not sol or check_solution(sol, None, 0, True) != "Valid solution" or 2 * len(sol) != self.n:
+            return False
+        key = signature(sol)
+        if key in self.entries:
+            return False
+        self.entries[key] = {"sol": normalise(sol), "obj": ScheduleState(sol).imbalance, "source": source}
+        return True
+
+    def schedules(self, by_obj: bool = False) -> list:
+        entries = list(self.entries.values())
+        return sorted(entries, key=lambda e: e["obj"]) if by_obj else entries
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+def harvest(res_dir: str = RES_DIR) -> dict:
+    """Pools every schedule stored in the result files; returns {n: added}."""
+    pools, added = {}, Counter()
+    for folder in sorted(os.listdir(res_dir)):
+        path = os.path.join(res_dir, folder)
+        if folder in SKIP_DIRS or not os.path.isdir(path):
+            continue
+        for name in sorted(f for f in os.listdir(path) if f.endswith(".json")):
+            try:
+                with open(os.path.join(path, name)) as f:
+                    data = json.load(f)
+            except ValueError:
+                continue
+            for key, entry in (data.items() if isinstance(data, dict) else ()):
+                sol = entry.get("sol") if isinstance(entry, dict) else None
+                if not sol or not isinstance(sol, list):
+                    continue
+                n = 2 * len(sol)
+                pool = pools.setdefault(n, Pool(n))
+                added[n] += pool.add(sol, f"{folder}/{name}:{key}")
+    for pool in pools.values():
+        pool.save()
+    return dict(sorted(added.items()))
+
+# ----------------------------------------------------------------------------
+# Answering requests
+# ----------------------------------------------------------------------------
+def z3_constraints(V, constraints) -> list:
+    """The constraints as terms over the SMT pair model (V of build_pair_model)."""
+    from z3 import Implies, Not
+    week, home = V["week"], V["home"]
+    n = max(j for _, j in week) + 1
+    terms = []
+    for kind, *args in constraints:
+        if kind == "match":
+            a, b = sorted(args[:2])
+            terms.append(week[a - 1, b - 1] == args[2] - 1)
+            continue
+        t, w = args[0] - 1, args[1] - 1
+        for o in range(n):
+            if o != t:
+                k = (min(t, o), max(t, o))
+                terms.append(Implies(week[k] == w, home[k] if t < o else Not(home[k])))
+    return terms
+
+def _solve(n, constraints, mode, budget, bound=None):
+    model = sts.build(n, "smt", mode, encoding="int", no_sb=True)
+    assertions, V, obj = model.data
+    extra = z3_constraints(V, constraints) + ([obj <= bound] if bound is not None else [])
+    model.data = (list(assertions) + extra, V, obj)
+    return sts.solve(n, "smt", mode, model=model, budget=budget)
+
+def answer(n: int, constraints=(), mode: str = "dec", time_limit: int = TIME_LIMIT_S,
+           solve: bool = True, pool: Pool = None) -> sts.Result:
+    """A schedule for n teams meeting the constraints: from the pool if one of
+    its schedules can be relabelled (approach "pool"), otherwise from the solver
+    (approach "smt", unless solve is False)."""
+    budget = Budget(time_limit)
+    constraints = parse_constraints(n, constraints)
+    pool = pool if pool is not None else Pool(n)
+    opt = mode == "opt"
+    hit = None
+    for entry in pool.schedules(by_obj=opt):
+        if budget.expired():
+            break
+        sol = relabel(entry["sol"], constraints, keep_sides=opt)
+        if sol is not None:
+            hit = (sol, entry["obj"])
+            break
+
+    def from_pool(optimal):
+        sol, obj = hit
+        return sts.Result("pool", mode, n, "hit", sol, obj if opt else None, optimal, budget.elapsed())
+
+    if hit and (not opt or hit[1] == n):
+        return from_pool(True)
+    if not solve:
+        return from_pool(False) if hit else sts.Result("pool", mode, n, "miss", time=budget.elapsed())
+    # the imbalance of every team is odd, so a better schedule is at least 2 lower
+    r = _solve(n, constraints, mode, budget, bound=hit[1] - 2 if hit else None)
+    if r.sol:
+        if not satisfies(r.sol, constraints):
+            raise RuntimeError("the solver returned a schedule that violates the constraints")
+        if pool.add(r.sol, "smt"):
+            pool.save()
+        return r
+    if hit:
+        return from_pool(r.status == "unsat")
+    return r
+
+# ----------------------------------------------------------------------------
+# Command line
+# ----------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="STS schedule pool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("harvest", help="pool the schedules of the result files")
+    p.add_argument("--res", default=RES_DIR, help="results folder (default: res/)")
+    p = sub.add_parser("query", help="answer a request from the pool, solving on a miss")
+    p.add_argument("N", type=int, help="even number of teams")
+    p.add_argument("--mode", choices=("dec", "opt"), default="dec")
+    p.add_argument("--match", nargs=3, type=int, action="append", default=[], metavar=("A", "B", "W"),
+                   help="teams A and B meet in week W (repeatable)")
+    p.add_argument("--home", nargs=2, type=int, action="append", default=[], metavar=("T", "W"),
+                   help="team T plays at home in week W (repeatable)")
+    p.add_argument("--no-solve", action="store_true", help="answer from the pool only")
+    p.add_argument("--time-limit", type=int, default=TIME_LIMIT_S, help=f"time limit in s (default: {TIME_LIMIT_S})")
+    sub.add_parser("stats", help="print the number of pooled schedules per n")
+    args = parser.parse_args()
+
+    if args.command == "harvest":
+        for n, added in harvest(args.res).items():
+            print(f"n={n}: {added} new schedule(s), {len(Pool(n))} pooled")
+    elif args.command == "query":
+        if args.N < 4 or args.N % 2:
+            parser.error("N must be an even integer >= 4")
+        items = [("match", *m) for m in args.match] + [("home", *h) for h in args.home]
+        try:
+            r = answer(args.N, items, args.mode, args.time_limit, solve=not args.no_solve)
+        except ValueError as e:
+            parser.error(str(e))
+        print(json.dumps(r.as_dict()))
+    else:
+        names = sorted(f for f in os.listdir(POOL_DIR) if f.endswith(".json")) if os.path.isdir(POOL_DIR) else []
+        for n in sorted(int(f[1:-5]) for f in names):
+            pool = Pool(n)
+            objs = [e["obj"] for e in pool.schedules()]
+            print(f"n={n}: {len(pool)} schedule(s), best imbalance {min(objs) if objs else None}")
+
+if __name__ == "__main__":
+    main()
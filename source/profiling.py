@@ -0,0 +1,136 @@
+import os, gc, json, time, cProfile, pstats, tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# ----------------------------------------------------------------------------
+# Profiling hooks: where the time goes before and after the solver
+# ----------------------------------------------------------------------------
+# With --profile a solve of the command line tools runs under a Profile:
+#   phases     wall time of the phases marked in the backends with
+#              `with profiling.phase("build"):` (build, export, solve, decode,
+#              write), summed over repeated entries, with the Python memory
+#              they allocated (tracemalloc) and the live objects per type
+#              (gc) at their end; times reported by a solver (MiniZinc
+#              flattening) are added with profiling.record()
+#   functions  the cProfile entries with the largest cumulative and own time
+#   allocs     the source lines holding the most Python memory at the end
+# The report goes to profiles/<result file>_<key>.json next to the result JSON
+# (e.g. res/SAT/profiles/n12_SAT_dec.json), with the raw cProfile data in a
+# .prof file of the same name for pstats or snakeviz. Memory of the solvers
+# themselves (Z3, HiGHS, MiniZinc, AMPL) is not seen by tracemalloc: the peak
+# RSS of the job is in res/jobs/<backend>.jsonl. Only the process of the job
+# is profiled, not the workers of --cubes.
+# When no profile is running the hooks do nothing.
+
+TOP = 25            # entries kept per table
+TYPES = 15          # object types kept per phase
+_active = None
+
+def add_arguments(parser):
+    parser.add_argument("--profile", action="store_true",
+                        help="record phase times, cProfile, tracemalloc and object counts of every solve "
+                             "in profiles/ next to the result JSON")
+
+def _mb(size):
+    return round(size / 2**20, 3)
+
+def _where(filename, line, name):
+    parts = os.path.normpath(filename).split(os.sep)
+    where = f"{os.path.join(*parts[-2:]) if len(parts) > 1 else filename}:{line}"
+    return f"{where}({name})" if name else where
+
+class Profile:
+    def __init__(self):
+        self.phases = {}
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        tracemalloc.start()
+        self.t0 = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.wall_s = time.perf_counter() - self.t0
+        self.snapshot = tracemalloc.take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    def _entry(self, name):
+        return self.phases.setdefault(name, {"wall_s": 0.0, "count": 0})
+
+    @contextmanager
+    def phase(self, name):
+        before = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            self.profiler.disable()
+            entry = self._entry(name)
+            entry["wall_s"] += wall
+            entry["count"] += 1
+            entry["alloc_mb"] = entry.get("alloc_mb", 0.0) + _mb(tracemalloc.get_traced_memory()[0] - before)
+            counts = Counter(type(o).__name__ for o in gc.get_objects())
+            entry["objects"] = dict(counts.most_common(TYPES))
+            self.profiler.enable()
+
+    def record(self, name, seconds):
+        entry = self._entry(name)
+        entry["wall_s"] += seconds
+        entry["count"] += 1
+
+    def report(self) -> dict:
+        stats = pstats.Stats(self.profiler).stats
+        rows = [{"function": _where(*f), "calls": nc, "tottime": round(tt, 4), "cumtime": round(ct, 4)}
+                for f, (cc, nc, tt, ct, callers) in stats.items()]
+        allocs = [{"line": _where(s.traceback[0].filename, s.traceback[0].lineno, ""),
+                   "mb": _mb(s.size), "blocks": s.count}
+                  for s in self.snapshot.statistics("lineno")[:TOP]]
+        phases = {k: {**v, "wall_s": round(v["wall_s"], 4)} for k, v in self.phases.items()}
+        return {"wall_s": round(self.wall_s, 4), "python_peak_mb": _mb(self.peak), "phases": phases,
+                "cumulative": sorted(rows, key=lambda r: -r["cumtime"])[:TOP],
+                "own": sorted(rows, key=lambda r: -r["tottime"])[:TOP], "allocs": allocs}
+
+def artifact_path(res_file, key) -> str:
+    res_file = str(res_file)
+    stem = os.path.splitext(os.path.basename(res_file))[0]
+    return os.path.join(os.path.dirname(res_file), "profiles", f"{stem}_{key}.json")
+
+def write(profile: Profile, res_file, key, **info):
+    path = artifact_path(res_file, key)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"key": key, **info, **profile.report()}, f, indent=2)
+    profile.profiler.dump_stats(os.path.splitext(path)[0] + ".prof")
+    print(f"✔ profile written to {path}")
+
+def wrap(fn, res_file, key, **info):
+    """fn run under a Profile, whose report is written when it returns or raises."""
+    def profiled(*args, **kwargs):
+        global _active
+        _active = Profile()
+        _active.start()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile, _active = _active, None
+            profile.stop()
+            write(profile, res_file, key, **info)
+    return profiled
+
+# ----------------------------------------------------------------------------
+# Hooks for the backends
+# ----------------------------------------------------------------------------
+@contextmanager
+def phase(name):
+    if _active is None:
+        yield
+    else:
+        with _active.phase(name):
+            yield
+
+def record(name, seconds):
+    if _active is not None and seconds is not None:
+        _active.record(name, seconds)
@@ -0,0 +1,237 @@
+import os, sys, json, time, argparse
+from dataclasses import dataclass, field, asdict
+from z3 import Bool, Implies, And, Not, AtLeast, is_true
+
+# ----------------------------------------------------------------------------
+# Incremental re-scheduling: "what if" queries on one built model
+# ----------------------------------------------------------------------------
+# The Boolean match cube M[(i, j, w, p)] of SAT_STS (or of SMT_STS with the
+# bool encoding) is built once, without symmetry breaking (it would forbid most
+# pinned matches), in a single Z3 solver. Every query is a list of side
+# constraints (1-based, like the result files):
+#   ("pin", a, b, w, p)    a and b play in week w, period p
+#   ("forbid", a, b, w)    a and b do not play in week w
+#   ("block", t, w, p)     team t does not play in week w, period p
+# Each constraint gets a tracking literal c with c -> constraint, asserted the
+# first time the constraint is asked for; a query is check(c1, ..., ck), so the
+# model is never rebuilt and the clauses learned by earlier queries are kept.
+# When the query is infeasible, the unsat core over the tracking literals names
+# the constraints that cannot hold together.
+# Minimum change: the answer is kept close to a reference schedule (the first
+# answer, or one given with --reference). The reference matches are assumed as
+# well and those in the unsat cores are dropped until the query is sat, then
+# the number of moved reference matches is lowered with one AtLeast literal per
+# bound until it is proven minimal or the time limit of the query is reached.
+# The checks with reference matches get at most half of the time left; if they
+# end unknown, the query is checked once more without them, so that a feasible
+# query still gets an answer (not minimal).
+# Home and away are taken from the reference, the models have no sides.
+#   python source/reschedule.py 8 [--reference res/SAT/n8.json:SAT_dec]
+#   {"constraints": [["pin", 1, 2, 3, 1], ["forbid", 3, 4, 1]], "accept": false}    (stdin, one per line)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+import sts
+from budget import Budget
+from solution_checker import check_solution
+
+TIME_LIMIT_S = 60
+KINDS = {"pin": 4, "forbid": 3, "block": 3}
+
+@dataclass
+class Answer:
+    status: str                                 # sat | unsat | unknown
+    sol: list = field(default_factory=list)     # [period][week] = [home, away], [] if none
+    changes: int = None                         # reference matches moved to another slot
+    minimal: bool = False                       # no answer moves fewer reference matches
+    core: list = field(default_factory=list)    # constraints that cannot hold together (unsat)
+    latency_s: float = 0.0
+    checks: int = 0                             # solver calls of the query
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+def parse_constraints(n: int, items) -> list:
+    """Checks the ["pin", a, b, w, p] / ["forbid", a, b, w] / ["block", t, w, p]
+    items, returns them as tuples."""
+    W, P, out = n - 1, n // 2, []
+    for item in items:
+        kind, *args = list(item) or [None]
+        if KINDS.get(kind) != len(args):
+            raise ValueError(f"invalid constraint {list(item)} (expected one of "
+                             f"[\"pin\", a, b, w, p], [\"forbid\", a, b, w], [\"block\", t, w, p])")
+        teams = args[:2] if kind != "block" else args[:1]
+        w = args[len(teams)]
+        p = 1 if kind == "forbid" else args[len(teams) + 1]
+        if any(not 1 <= t <= n for t in teams) or len(set(teams)) != len(teams):
+            raise ValueError(f"invalid teams in {list(item)} (1..{n}, distinct)")
+        if not 1 <= w <= W or not 1 <= p <= P:
+            raise ValueError(f"invalid slot in {list(item)} (weeks 1..{W}, periods 1..{P})")
+        out.append((kind, *args))
+    return out
+
+class Rescheduler:
+    def __init__(self, n: int, approach: str = "sat", reference: list = None, seed: int = None):
+        if approach not in ("sat", "smt"):
+            raise ValueError("approach must be sat or smt (Boolean match cube)")
+        sts.check(n, approach, "dec")
+        self.n, self.W, self.P = n, n - 1, n // 2
+        self.module = sts.backend(approach)
+        t0 = time.time()
+        # the Int sums of the SMT model leave the default solver in its slow
+        # incremental core once assumptions are used; QF_FD bit-blasts them
+        args = sts._z3_args({"no_sb": True, "seed": seed, "z3_config": "qf_fd" if approach == "smt" else "default"})
+        self.s, self.M = self.module.build_solver(n, args)
+        self.build_s = time.time() - t0
+        self.trackers = {}          # constraint -> tracking literal
+        self.bounds = {}            # (reference id, k) -> literal "at most k moved"
+        self.reference, self.ref_id = None, 0
+        if reference is not None:
+            self.set_reference(reference)
+
+    # ------------------------------------------------------------------------
+    # Literals
+    # ------------------------------------------------------------------------
+    def _pair(self, a, b):
+        return (a - 1, b - 1) if a < b else (b - 1, a - 1)
+
+    def _term(self, c):
+        M, P = self.M, self.P
+        kind, *args = c
+        if kind == "pin":
+            return M[self._pair(args[0], args[1]) + (args[2] - 1, args[3] - 1)]
+        if kind == "forbid":
+            i, j = self._pair(args[0], args[1])
+            return And([Not(M[i, j, args[2] - 1, p]) for p in range(P)])
+        t, w, p = args[0] - 1, args[1] - 1, args[2] - 1
+        return And([Not(M[min(t, o), max(t, o), w, p]) for o in range(self.n) if o != t])
+
+    def _tracker(self, c):
+        if c not in self.trackers:
+            lit = Bool(f"req_{len(self.trackers)}")
+            self.s.add(Implies(lit, self._term(c)))
+            self.trackers[c] = lit
+        return self.trackers[c]
+
+    def _bound(self, k):
+        # at most k of the reference matches leave their slot
+        key = (self.ref_id, k)
+        if key not in self.bounds:
+            lit = Bool(f"moved_r{self.ref_id}_le_{k}")
+            self.s.add(Implies(lit, AtLeast(*self.ref_lits, len(self.ref_lits) - k)))
+            self.bounds[key] = lit
+        return self.bounds[key]
+
+    # ------------------------------------------------------------------------
+    # Reference schedule
+    # ------------------------------------------------------------------------
+    def set_reference(self, sol):
+        if check_solution(sol, None, 0, True) != "Valid solution" or len(sol) != self.P:
+            raise ValueError(f"the reference is not a valid schedule for n={self.n}")
+        self.reference = [[list(m) for m in row] for row in sol]
+        self.ref_id += 1
+        self.sides = {}
+        self.ref_lits = []
+        for p, row in enumerate(sol):
+            for w, (h, a) in enumerate(row):
+                self.sides[self._pair(h, a)] = [h, a]
+                self.ref_lits.append(self.M[self._pair(h, a) + (w, p)])
+
+    def _decode(self, model):
+        sol = self.module.extract_solution(model, self.M, self.W, self.P)
+        if self.reference is None:
+            return sol, None
+        sol = [[self.sides[self._pair(*m)] for m in row] for row in sol]
+        moved = sum(not is_true(model.evaluate(x, model_completion=True)) for x in self.ref_lits)
+        return sol, moved
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+    def query(self, constraints=(), time_limit: float = TIME_LIMIT_S, accept: bool = False) -> Answer:
+        """Answers one what-if query; with accept the answer becomes the reference."""
+        budget = Budget(time_limit)
+        constraints = parse_constraints(self.n, constraints)
+        lits = [self._tracker(c) for c in dict.fromkeys(constraints)]
+        answer = Answer("unknown")
+
+        def check(*assumptions, cap_s=None):
+            self.s.set("timeout", budget.timeout_ms(cap_s))
+            answer.checks += 1
+            return str(self.s.check(*lits, *assumptions))
+
+        # keep as many reference matches as the cores allow
+        kept = list(self.ref_lits) if self.reference is not None else []
+        half = lambda: budget.remaining() / 2 if kept else None
+        res = check(*kept, cap_s=half())
+        while res == "unsat" and kept:
+            core = {str(x) for x in self.s.unsat_core()}
+            dropped = [x for x in kept if str(x) in core]
+            if not dropped:
+                break
+            kept = [x for x in kept if str(x) not in core]
+            res = check(*kept, cap_s=half())
+        if res == "unknown" and kept:
+            res = check()
+        if res == "unsat":
+            named = {str(lit): c for c, lit in self.trackers.items()}
+            answer.status = "unsat"
+            answer.core = [list(named[str(x)]) for x in self.s.unsat_core() if str(x) in named]
+        elif res == "sat":
+            answer.status = "sat"
+            answer.sol, answer.changes = self._decode(self.s.model())
+            answer.minimal = answer.changes == 0
+            while answer.changes and not budget.expired():
+                res = check(self._bound(answer.changes - 1))
+                if res != "sat":
+                    answer.minimal = res == "unsat"
+                    break
+                answer.sol, answer.changes = self._decode(self.s.model())
+                answer.minimal = answer.changes == 0
+            if accept or self.reference is None:
+                self.set_reference(answer.sol)
+        answer.latency_s = round(budget.elapsed(), 4)
+        return answer
+
+# ----------------------------------------------------------------------------
+# Command line: one query per line on stdin, one answer per line on stdout
+# ----------------------------------------------------------------------------
+def load_reference(spec):
+    path, _, key = spec.rpartition(":")
+    with open(path) as f:
+        data = json.load(f)
+    if key not in data or not data[key].get("sol"):
+        raise ValueError(f"{path} has no schedule under {key!r}")
+    return data[key]["sol"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental re-scheduling of an STS instance. "
+                                                 "Reads one JSON query per line from stdin.")
+    parser.add_argument("N", type=int, help="even number of teams")
+    parser.add_argument("--approach", choices=("sat", "smt"), default="sat",
+                        help="model providing the Boolean match cube (default: sat)")
+    parser.add_argument("--reference", metavar="PATH:KEY", default=None,
+                        help="reference schedule, e.g. res/SAT/n8.json:SAT_dec (default: the first answer)")
+    parser.add_argument("--time-limit", type=float, default=TIME_LIMIT_S,
+                        help=f"time limit of every query in s (default: {TIME_LIMIT_S})")
+    parser.add_argument("--seed", type=int, default=None, help="Z3 random seed (default: 42)")
+    args = parser.parse_args()
+    try:
+        reference = load_reference(args.reference) if args.reference else None
+        r = Rescheduler(args.N, args.approach, reference, args.seed)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    print(json.dumps({"n": args.N, "approach": args.approach, "build_s": round(r.build_s, 4)}), flush=True)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            q = json.loads(line)
+            q = {"constraints": q} if isinstance(q, list) else q
+            out = r.query(q.get("constraints", []), args.time_limit, q.get("accept", False)).as_dict()
+        except (ValueError, TypeError, AttributeError) as e:
+            out = {"error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(out), flush=True)
+
+if __name__ == "__main__":
+    main()
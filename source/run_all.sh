@@ -2,17 +2,22 @@
 set -eo pipefail
 
 # This script sequentially runs all four stages with -a (automatic) mode.
+# The sweeps skip configurations that already have a valid optimal result for
+# the same model (see source/sweep.py), so an interrupted run can be restarted.
+# Pass --force to re-run everything. The other arguments go to every stage as
+# well, e.g. --mem-limit 8000 --cpus 0-3 (see source/governor.py) or --profile
+# (see source/profiling.py).
 
 PY=python   # adjust if your container uses a different python command
 
 #echo "=== Running MIP stage ==="
-#$PY source/MIP/mip_model.py -a
+#$PY source/MIP/mip_model.py -a "$@"
 
 echo "=== Running SAT stage ==="
-$PY source/SAT/SAT_STS.py -a
+$PY source/SAT/SAT_STS.py -a "$@"
 
 echo "=== Running SMT stage ==="
-$PY source/SMT/SMT_STS.py -a
+$PY source/SMT/SMT_STS.py -a "$@"
 
 echo "=== Running CP stage ==="
-$PY source/CP/CP_STS.py -a
+$PY source/CP/CP_STS.py -a "$@"
@@ -0,0 +1,133 @@
+from solution_checker import get_elements, fatal_errors
+
+# ----------------------------------------------------------------------------
+# Incremental schedule state for repair / local-search / LNS code
+# ----------------------------------------------------------------------------
+# Keeps the counters behind every check of solution_checker.check_solution, so
+# that an edit costs O(1) instead of a full re-validation:
+#   pair_cnt[i][j]    matches between i < j            (duplicated matches)
+#   week_occ[w][t]    appearances of t in week w       (once a week)
+#   period_cnt[p][t]  appearances of t in period p     (at most twice)
+#   self_cnt          matches [t, t]                   (self-playing teams)
+#   home[t], away[t]  for the home/away imbalance sum_t |home[t] - away[t]|
+# Every edit permutes the entries of the matrix, so the set of teams and the
+# shape (the checker's fatal errors) never change after construction.
+
+class ScheduleState:
+
+    def __init__(self, sol):
+        if not sol:
+            raise ValueError("empty schedule")
+        periods, matches, teams = get_elements(sol)
+        if any(len(m) != 2 for m in matches):
+            raise ValueError("every slot must hold a [home, away] pair")
+        if any(type(t) != int or t < 1 for t in teams):
+            raise ValueError("teams must be positive integers")
+        self.sol = [[list(m) for m in row] for row in sol]
+        self.P, self.W = len(sol), len(sol[0])
+        self.n = max(teams)
+        self.fatal = fatal_errors(sol, None, 0, True, teams)
+
+        n, W, P = self.n, self.W, self.P
+        self.pair_cnt = [[0] * (n + 1) for _ in range(n + 1)]
+        self.week_occ = [[0] * (n + 1) for _ in range(W)]
+        self.period_cnt = [[0] * (n + 1) for _ in range(P)]
+        self.home = [0] * (n + 1)
+        self.away = [0] * (n + 1)
+        self.self_cnt = 0
+        self.violations = 0
+        self.imbalance = 0
+        for p, row in enumerate(self.sol):
+            for w, m in enumerate(row):
+                self._add(p, w, m[0], m[1])
+
+    # ------------------------------------------------------------------------
+    # O(1) primitive updates
+    # ------------------------------------------------------------------------
+    def _bump(self, table, idx, d, limit):
+        # change one counter and the number of excess entries over `limit`
+        old = table[idx]
+        table[idx] = old + d
+        self.violations += max(0, old + d - limit) - max(0, old - limit)
+
+    def _side(self, t, home, d):
+        old = abs(self.home[t] - self.away[t])
+        if home:
+            self.home[t] += d
+        else:
+            self.away[t] += d
+        self.imbalance += abs(self.home[t] - self.away[t]) - old
+
+    def _update(self, p, w, h, a, d):
+        if h == a:
+            self.self_cnt += d
+            self.violations += d
+        else:
+            i, j = min(h, a), max(h, a)
+            self._bump(self.pair_cnt[i], j, d, 1)
+        for t in (h, a):
+            self._bump(self.week_occ[w], t, d, 1)
+            self._bump(self.period_cnt[p], t, d, 2)
+        self._side(h, True, d)
+        self._side(a, False, d)
+
+    def _add(self, p, w, h, a):
+        self._update(p, w, h, a, 1)
+
+    def _remove(self, p, w, h, a):
+        self._update(p, w, h, a, -1)
+
+    def _set(self, p, w, h, a):
+        old = self.sol[p][w]
+        self._remove(p, w, old[0], old[1])
+        self.sol[p][w] = [h, a]
+        self._add(p, w, h, a)
+
+    # ------------------------------------------------------------------------
+    # Edits: each returns (delta violations, delta imbalance) and is its own
+    # inverse, so evaluate() can preview it by applying it twice.
+    # ------------------------------------------------------------------------
+    def swap_slots(self, p1, w1, p2, w2):
+        """Exchange the matches of slots (p1, w1) and (p2, w2)."""
+        v0, i0 = self.violations, self.imbalance
+        m1, m2 = self.sol[p1][w1], self.sol[p2][w2]
+        self._set(p1, w1, m2[0], m2[1])
+        self._set(p2, w2, m1[0], m1[1])
+        return self.violations - v0, self.imbalance - i0
+
+    def flip(self, p, w):
+        """Swap home and away of the match in slot (p, w)."""
+        v0, i0 = self.violations, self.imbalance
+        h, a = self.sol[p][w]
+        self._set(p, w, a, h)
+        return self.violations - v0, self.imbalance - i0
+
+    def swap_teams(self, p1, w1, s1, p2, w2, s2):
+        """Exchange entry s1 (0 home, 1 away) of slot (p1, w1) with entry s2 of (p2, w2)."""
+        v0, i0 = self.violations, self.imbalance
+        if (p1, w1) == (p2, w2):
+            if s1 != s2:
+                self.flip(p1, w1)
+            return self.violations - v0, self.imbalance - i0
+        m1, m2 = list(self.sol[p1][w1]), list(self.sol[p2][w2])
+        m1[s1], m2[s2] = m2[s2], m1[s1]
+        self._set(p1, w1, m1[0], m1[1])
+        self._set(p2, w2, m2[0], m2[1])
+        return self.violations - v0, self.imbalance - i0
+
+    def evaluate(self, op, *args):
+        """Delta of an edit without keeping it, e.g. evaluate('flip', p, w)."""
+        edit = getattr(self, op)
+        delta = edit(*args)
+        edit(*args)
+        return delta
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+    def is_valid(self):
+        """Same verdict as solution_checker.check_solution on to_solution()."""
+        return not self.fatal and self.violations == 0
+
+    def to_solution(self):
+        return [[list(m) for m in row] for row in self.sol]
@@ -0,0 +1,245 @@
+import os, sys, json, time, argparse, threading, statistics
+import multiprocessing as mp
+import urllib.request, urllib.error
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ----------------------------------------------------------------------------
+# Local scheduling service
+# ----------------------------------------------------------------------------
+# A localhost HTTP daemon answering
+#   POST /solve  {"n": 8, "approach": "sat", "mode": "dec", "options": {...}}
+#   GET  /stats
+# Requests are solved by a pool of long-lived worker processes, so z3, highspy,
+# minizinc and amplpy are imported once per worker (and the AMPL license is
+# activated once per worker, not once per run). Each worker also keeps its last
+# CACHE_SIZE built models, keyed by (approach, mode, n, options): asking for the
+# same instance again only re-runs the solver.
+# The approaches, modes and options are those of the library API (sts.py).
+# Admission control: at most --max-pending requests are queued or running, the
+# others get 503. Every answer reports its queueing and solving latency.
+# Z3 contexts are not thread-safe, which is why the pool is made of processes.
+# With --mem-limit every worker runs under the address-space limit of the
+# resource governor: a solve that runs out of memory is answered with status
+# "memout". A worker that dies anyway (OOM killer, crash in a solver) breaks the
+# pool: its requests get 503 and a new pool is started.
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import sts
+import governor
+from sts import APPROACHES, TIME_LIMIT_S
+from budget import Budget
+
+CACHE_SIZE = 16
+DEFAULT_PORT = 8765
+
+# ----------------------------------------------------------------------------
+# Worker side
+# ----------------------------------------------------------------------------
+_cache = OrderedDict()
+
+def _built(key, req):
+    """The built model of a request from the worker's LRU cache, or a new one."""
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key], True
+    model = sts.build(req["n"], req["approach"], req["mode"], **req["options"])
+    _cache[key] = model
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return model, False
+
+def run_request(req):
+    """Runs in a worker process. Returns the answer and the start/end timestamps."""
+    started = time.time()
+    key = (req["approach"], req["mode"], req["n"], json.dumps(req["options"], sort_keys=True))
+    try:
+        # the time limit covers building the model too
+        budget = Budget(req.get("time_limit", TIME_LIMIT_S))
+        model, cached = _built(key, req)
+        build_s = budget.elapsed()
+        result = sts.solve(req["n"], req["approach"], req["mode"], model=model, budget=budget)
+        answer = {k: v for k, v in result.as_dict().items() if k in ("status", "sol", "obj", "optimal")}
+        answer.update(cached_model=cached, build_s=round(build_s, 4))
+    except Exception as e:
+        if not governor.is_memout(e):
+            answer = {"error": f"{type(e).__name__}: {e}"}
+        else:
+            # the model may be half built: start afresh on the next request
+            _cache.clear()
+            answer = {"status": "memout", "sol": [], "obj": None, "optimal": False}
+    answer["worker"] = os.getpid()
+    return answer, started, time.time()
+
+def _warm_up(limits):
+    governor.apply(limits)
+    # import the Z3 and HiGHS backends up front; minizinc/amplpy on first use
+    for approach in ("sat", "smt", "highspy"):
+        try:
+            sts.backend(approach)
+        except ImportError:
+            pass
+
+# ----------------------------------------------------------------------------
+# Server side
+# ----------------------------------------------------------------------------
+def validate(req):
+    req.setdefault("mode", "dec")
+    try:
+        sts.check(req.get("n"), req.get("approach"), req["mode"])
+    except ValueError as e:
+        return str(e)
+    if not isinstance(req.setdefault("options", {}), dict):
+        return "options must be an object"
+    return None
+
+class Service:
+    def __init__(self, workers, max_pending, limits=governor.Limits()):
+        self.workers, self.limits = workers, limits
+        self.pool = self._new_pool()
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(lambda: {"queue_s": [], "solve_s": []})
+        self.rejected = 0
+        self.restarts = 0
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                                   initializer=_warm_up, initargs=(self.limits,))
+
+    def _restart(self, broken):
+        """Replaces a broken pool, once however many requests saw it break."""
+        with self.lock:
+            if self.pool is not broken:
+                return
+            self.pool = self._new_pool()
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def solve(self, req):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return 503, {"error": "too many pending requests"}
+        try:
+            received = time.time()
+            pool = self.pool
+            answer, started, finished = pool.submit(run_request, req).result()
+        except BrokenProcessPool:
+            self._restart(pool)
+            return 503, {"error": "a worker process died; the worker pool was restarted"}
+        finally:
+            self.slots.release()
+        answer["queue_s"] = round(started - received, 4)
+        answer["solve_s"] = round(finished - started, 4)
+        answer["total_s"] = round(time.time() - received, 4)
+        with self.lock:
+            lat = self.latencies[f"{req['approach']}_{req['mode']}"]
+            lat["queue_s"].append(answer["queue_s"])
+            lat["solve_s"].append(answer["solve_s"])
+        return (500 if "error" in answer else 200), answer
+
+    def stats(self):
+        with self.lock:
+            out = {"rejected": self.rejected, "restarts": self.restarts, "approaches": {}}
+            for name, lat in self.latencies.items():
+                out["approaches"][name] = {"requests": len(lat["solve_s"]),
+                                           **{f"median_{k}": round(statistics.median(v), 4) for k, v in lat.items()},
+                                           **{f"max_{k}": max(v) for k, v in lat.items()}}
+        return out
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, service.stats())
+            else:
+                self._reply(404, {"error": "unknown path"})
+
+        def do_POST(self):
+            if self.path != "/solve":
+                return self._reply(404, {"error": "unknown path"})
+            try:
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            except ValueError:
+                return self._reply(400, {"error": "invalid JSON"})
+            error = validate(req) if isinstance(req, dict) else "the body must be an object"
+            if error:
+                return self._reply(400, {"error": error})
+            self._reply(*service.solve(req))
+
+        def log_message(self, fmt, *args):
+            print(f"[service] {self.address_string()} {fmt % args}")
+    return Handler
+
+def serve(port, workers, max_pending, limits):
+    service = Service(workers, max_pending, limits)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(service))
+    print(f"[service] listening on http://127.0.0.1:{port} with {workers} worker(s), "
+          f"at most {max_pending} pending request(s)"
+          + (f", {limits.mem_mb} MB per worker" if limits.mem_mb else ""))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.pool.shutdown(cancel_futures=True)
+
+# ----------------------------------------------------------------------------
+# Client
+# ----------------------------------------------------------------------------
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+def main():
+    parser = argparse.ArgumentParser(description="Local STS scheduling service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="start the daemon")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"localhost port (default: {DEFAULT_PORT})")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="worker processes (default: number of CPUs)")
+    p.add_argument("--max-pending", type=int, default=None,
+                   help="queued + running requests before answering 503 (default: 4 x workers)")
+    p.add_argument("--mem-limit", type=int, default=None, metavar="MB",
+                   help="address-space limit of every worker in MB (default: none)")
+    p = sub.add_parser("solve", help="send a request to a running daemon")
+    p.add_argument("N", type=int, help="even number of teams")
+    p.add_argument("--approach", choices=APPROACHES, default="sat")
+    p.add_argument("--mode", choices=("dec", "opt"), default="dec")
+    p.add_argument("--options", type=json.loads, default={}, help='backend options as JSON, e.g. \'{"symmetry": "full"}\'')
+    p.add_argument("--time-limit", type=int, default=TIME_LIMIT_S, help=f"time limit in s (default: {TIME_LIMIT_S})")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p = sub.add_parser("stats", help="print the latency statistics of a running daemon")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        if args.mem_limit is not None and args.mem_limit <= 0:
+            parser.error("--mem-limit must be positive")
+        serve(args.port, args.workers, args.max_pending or 4 * args.workers, governor.Limits(args.mem_limit))
+    elif args.command == "solve":
+        body = {"n": args.N, "approach": args.approach, "mode": args.mode, "options": args.options,
+                "time_limit": args.time_limit}
+        print(json.dumps(request(f"http://127.0.0.1:{args.port}/solve", body), indent=2))
+    else:
+        print(json.dumps(request(f"http://127.0.0.1:{args.port}/stats"), indent=2))
+
+if __name__ == "__main__":
+    main()
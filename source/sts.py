@@ -0,0 +1,223 @@
+import os, sys, time, importlib
+from dataclasses import dataclass, field, asdict
+
+# ----------------------------------------------------------------------------
+# Library API over the backends
+# ----------------------------------------------------------------------------
+#   import sts
+#   r = sts.solve(8, "smt", "opt", time_limit=60, encoding="int")
+#   r.status, r.sol, r.obj, r.optimal, r.time
+# Importing this module loads no solver package: every backend module (and with
+# it z3, minizinc, highspy or amplpy) is imported on the first call that needs
+# it, and nothing is written to res/. build() returns the built model so that
+# callers can solve the same instance repeatedly without rebuilding it
+# (service.py keeps an LRU cache of them per worker).
+# Approaches, modes and options:
+#   sat      dec       symmetry, no_sb, z3_config, seed; decompose (weeks, then periods);
+#                      rolling (weeks in blocks) with block, window, lookahead
+#   smt      dec, opt  + encoding (bool|int|bv); opt tightens the bound on the
+#                      total imbalance in push/pop scopes
+#   cp       dec, opt  solver, heuristics, no_sb, symmetry, search, seed
+#   highspy  dec, opt  can_pair, symm_break, symmetry, valid_ineq, lazy, lex, seed
+#   mip      dec, opt  solver + the highspy options except seed; needs the AMPL license
+# The command line tools in the backend folders stay the way to run the sweeps
+# and store results; they import the same functions.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(HERE)
+from budget import Budget, TIME_LIMIT_S
+
+APPROACHES = {"sat": ("dec",), "smt": ("dec", "opt"), "cp": ("dec", "opt"), "highspy": ("dec", "opt"),
+              "mip": ("dec", "opt")}
+BACKENDS = {"sat": ("SAT", "SAT_STS"), "smt": ("SMT", "SMT_STS"), "cp": ("CP", "CP_STS"),
+            "highspy": ("MIP", "mip_highs"), "mip": ("MIP", "mip_model")}
+
+@dataclass
+class Result:
+    approach: str
+    mode: str
+    n: int
+    status: str                             # status reported by the backend
+    sol: list = field(default_factory=list)  # [period][week] = [home, away], [] if none
+    obj: int = None                         # total imbalance (opt mode)
+    optimal: bool = False                   # solved (dec) or proven optimal / infeasible
+    time: float = 0.0                       # solving time in s
+    build_time: float = 0.0                 # model construction time in s, 0 if prebuilt
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+@dataclass
+class Built:
+    approach: str
+    mode: str
+    n: int
+    options: dict
+    data: object = None                     # backend-specific, None if built at solve time
+
+# ----------------------------------------------------------------------------
+# Lazy backend imports
+# ----------------------------------------------------------------------------
+def backend(approach: str):
+    """Imports the module of a backend. SAT and SMT both have a `constraints`
+    module, so it is dropped from sys.modules around every import."""
+    folder, module = BACKENDS[approach]
+    if module in sys.modules:
+        return sys.modules[module]
+    path = os.path.join(HERE, folder)
+    sys.modules.pop("constraints", None)
+    sys.path.insert(0, path)
+    try:
+        return importlib.import_module(module)
+    finally:
+        sys.path.remove(path)
+        sys.modules.pop("constraints", None)
+
+def check(n: int, approach: str, mode: str):
+    if not isinstance(n, int) or n < 4 or n % 2:
+        raise ValueError("n must be an even integer >= 4")
+    if approach not in APPROACHES:
+        raise ValueError(f"approach must be one of {', '.join(APPROACHES)}")
+    if mode not in APPROACHES[approach]:
+        raise ValueError(f"mode must be one of {', '.join(APPROACHES[approach])} for {approach}")
+
+# ----------------------------------------------------------------------------
+# Building
+# ----------------------------------------------------------------------------
+def _z3_args(options):
+    from types import SimpleNamespace
+    return SimpleNamespace(z3_config=options.get("z3_config", "default"), threads=1,
+                           symmetry=options.get("symmetry"), no_sb=options.get("no_sb", False),
+                           encoding=options.get("encoding", "bool"), seed=options.get("seed"), cubes=False)
+
+def _highspy_comb(opt, options):
+    return {"optimise": opt, "can_pair": options.get("can_pair", False),
+            "symm_break": options.get("symm_break", False), "symmetry": options.get("symmetry"),
+            "valid_ineq": options.get("valid_ineq", False), "lazy": options.get("lazy", False),
+            "lex": options.get("lex", "dense")}
+
+def build(n: int, approach: str = "sat", mode: str = "dec", **options) -> Built:
+    """Builds the model of an instance: the Z3 assertions (sat, smt) or the HiGHS
+    matrix (highspy). The MiniZinc and AMPL models are generated when solving."""
+    check(n, approach, mode)
+    opt, data = mode == "opt", None
+    if approach == "sat" and (options.get("decompose") or options.get("rolling")):
+        pass
+    elif approach in ("sat", "smt"):
+        module, args = backend(approach), _z3_args(options)
+        s, V = module.build_solver(n, args, optimise=opt) if approach == "smt" else module.build_solver(n, args)
+        obj = None
+        if opt:
+            obj = (module.add_pair_home_away_imbalance_expr(s, V["home"], n) if args.encoding != "bool"
+                   else module.add_total_home_away_imbalance_expr(s, V, n))
+        data = (s.assertions(), V, obj)
+    elif approach == "highspy":
+        data = backend(approach).model_from(n, _highspy_comb(opt, options))
+    return Built(approach, mode, n, dict(options), data)
+
+# ----------------------------------------------------------------------------
+# Solving
+# ----------------------------------------------------------------------------
+def _solve_z3(model, budget):
+    module, args = backend(model.approach), _z3_args(model.options)
+    import z3_config, governor
+    n, opt = model.n, model.mode == "opt"
+    if model.options.get("decompose"):
+        status, sol, _ = module.decompose(n, budget, args.z3_config, log=lambda msg: None)
+        return status, sol, None, status in ("sat", "unsat")
+    if model.options.get("rolling"):
+        o = model.options
+        status, sol, _ = module.rolling_horizon(n, budget, o.get("block", 2), o.get("window", 2), o.get("lookahead"),
+                                                z3_conf=args.z3_config, seed=42 if args.seed is None else args.seed,
+                                                log=lambda msg: None)
+        return status, sol, None, status == "sat"
+    # a fresh solver over the built terms for every call: a solver that has
+    # already been checked stays in incremental mode, which is much slower on
+    # the optimisation models
+    assertions, V, obj = model.data
+    seed = args.seed if args.seed is not None or opt else 42
+    s = z3_config.make_solver(args.z3_config, 1, timeout_ms=budget.timeout_ms(), seed=seed)
+    s.add(assertions)
+    _, W, P = module.get_parameters(n)
+    extract = (module.extract_pair_solution if model.approach == "smt" and args.encoding != "bool"
+               else module.extract_solution)
+    res = str(s.check())
+    if res == "unknown" and governor.MEMOUT_PATTERN.search(s.reason_unknown()):
+        return "memout", [], None, False
+    if res != "sat":
+        return res, [], None, res == "unsat"
+    sol, best = extract(s.model(), V, W, P), None
+    if not opt:
+        return res, sol, None, True
+    best = s.model().evaluate(obj, model_completion=True).as_long()
+    # the imbalance of every team is odd, so the bound drops by 2 and n is optimal
+    while best > n and not budget.expired():
+        s.push()
+        s.add(obj <= best - 2)
+        s.set("timeout", budget.timeout_ms())
+        res = str(s.check())
+        if res == "sat":
+            sol, best = extract(s.model(), V, W, P), s.model().evaluate(obj, model_completion=True).as_long()
+        s.pop()
+        if res != "sat":
+            break
+    return "sat", sol, best, res == "unsat" or best == n
+
+def _solve_cp(model, budget):
+    cp, options, opt = backend("cp"), model.options, model.mode == "opt"
+    solver = options.get("solver") or ("ortools" if opt else "chuffed")
+    entry = cp.run_and_collect(model.n, opt, options.get("heuristics", False), solver,
+                               not options.get("no_sb", False), search=options.get("search"),
+                               symmetry=options.get("symmetry"), seed=options.get("seed"), budget=budget)
+    status = "solved" if entry["optimal"] else ("sat" if entry["sol"] else "unknown")
+    return status, entry["sol"], entry["obj"], entry["optimal"]
+
+def _solve_highspy(model, budget):
+    mh, opt = backend("highspy"), model.mode == "opt"
+    lp, index = model.data
+    h = mh.new_highs(budget.timeout_s(), verbose=False, seed=model.options.get("seed"))
+    h.passModel(lp)
+    status, _ = mh.run(h, index, model.options.get("lazy", False), budget)
+    ok = status == mh.highspy.HighsModelStatus.kOptimal
+    return (h.modelStatusToString(status),
+            mh.get_solution_matrix(h.getSolution().col_value, index) if ok else [],
+            round(h.getInfo().objective_function_value) if ok and opt else None,
+            ok or status == mh.highspy.HighsModelStatus.kInfeasible)
+
+def _solve_ampl(model, budget):
+    mm, options, opt = backend("mip"), model.options, model.mode == "opt"
+    solver = options.get("solver", "highs")
+    if solver not in mm.installed_solvers():
+        raise ValueError(f"AMPL solver {solver!r} is not installed "
+                         f"(choose from {', '.join(mm.installed_solvers())})")
+    ampl = mm.get_ampl()
+    ampl.reset()
+    mm.load_model(model.n, opt, options.get("symm_break", False), options.get("can_pair", False),
+                  symmetry=options.get("symmetry"), valid_ineq=options.get("valid_ineq", False),
+                  lazy=options.get("lazy", False) and solver in mm.LAZY_SOLVERS, lex=options.get("lex", "dense"))
+    ampl.option["solver"] = solver
+    ampl.option[mm.opt_names[solver]] = f"lim:time={budget.timeout_s():.1f} tech:threads=1"
+    ampl.solve(verbose=False, return_output=True)
+    result = ampl.solve_result
+    ok = result in ("solved", "solved?")
+    return (result, mm.get_solution_matrix() if ok else [],
+            round(ampl.get_objective("TotalImbalance").value()) if ok and opt else None,
+            result in ("solved", "infeasible"))
+
+SOLVERS = {"sat": _solve_z3, "smt": _solve_z3, "cp": _solve_cp, "highspy": _solve_highspy, "mip": _solve_ampl}
+
+def solve(n: int, approach: str = "sat", mode: str = "dec", time_limit: int = TIME_LIMIT_S,
+          model: Built = None, budget: Budget = None, **options) -> Result:
+    """Solves one instance in this process. `model` is a result of build() for
+    the same instance; if given, `options` are ignored. Building and solving
+    share `budget` (by default a new one of time_limit seconds)."""
+    budget = budget or Budget(time_limit)
+    build_time = 0.0
+    if model is None:
+        model = build(n, approach, mode, **options)
+        build_time = budget.elapsed()
+    elif (model.n, model.approach, model.mode) != (n, approach, mode):
+        raise ValueError(f"model built for n={model.n} {model.approach} {model.mode}")
+    t0 = time.time()
+    status, sol, obj, optimal = SOLVERS[approach](model, budget)
+    return Result(approach, mode, n, status, sol, obj, optimal, time.time() - t0, build_time)
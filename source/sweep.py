@@ -0,0 +1,89 @@
+import os, json, hashlib
+
+from solution_checker import check_solution
+
+# ----------------------------------------------------------------------------
+# Resumable sweeps over the res/ results
+# ----------------------------------------------------------------------------
+# The -a/--a modes of the backends ask a Sweep before solving a configuration:
+#   missing   no entry under its key in the result file          -> run
+#   memout    entry with status = memout (see governor.py)        -> run
+#   timeout   entry with optimal = false                          -> run
+#   invalid   optimal entry rejected by solution_checker          -> run
+#   stale     entry produced by a different model fingerprint     -> run
+#   done      anything else                                       -> skip
+# The fingerprint of a configuration is a hash of the model it solves (model
+# text, solver, options), so a change to one constraint only re-runs the
+# configurations whose model changed. The fingerprint of every entry written by
+# a sweep is checkpointed in res/sweeps/<backend>.json after each run; entries
+# written before the first sweep are adopted with the current fingerprint.
+
+RES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "res")
+STATE_DIR = os.path.join(RES_DIR, "sweeps")
+
+def fingerprint(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+def entry_done(entry: dict) -> bool:
+    if not entry.get("optimal"):
+        return False
+    if entry.get("sol") == []:
+        # proven infeasible
+        return True
+    return isinstance(check_solution(entry["sol"], entry.get("obj"), entry.get("time"), True), str)
+
+class Sweep:
+    def __init__(self, backend: str, force: bool = False):
+        self.path = os.path.join(STATE_DIR, f"{backend}.json")
+        self.force = force
+        self.state = {}
+        if os.path.isfile(self.path):
+            with open(self.path) as f:
+                self.state = json.load(f)
+
+    def _file_id(self, res_file) -> str:
+        return os.path.relpath(os.path.abspath(res_file), os.path.abspath(RES_DIR))
+
+    def status(self, res_file, key: str, fp: str) -> str:
+        try:
+            with open(res_file) as f:
+                entry = json.load(f).get(key)
+        except (OSError, ValueError):
+            entry = None
+        if entry is None:
+            return "missing"
+        if entry.get("status") == "memout":
+            return "memout"
+        if not entry.get("optimal"):
+            return "timeout"
+        if not entry_done(entry):
+            return "invalid"
+        seen = self.state.get(self._file_id(res_file), {}).get(key)
+        if seen is not None and seen != fp:
+            return "stale"
+        return "done"
+
+    def should_run(self, res_file, key: str, fp: str) -> bool:
+        if self.force:
+            return True
+        status = self.status(res_file, key, fp)
+        if status == "done":
+            if key not in self.state.get(self._file_id(res_file), {}):
+                self.record(res_file, key, fp)
+            print(f"[SKIP] {key} in {os.path.relpath(res_file)}: done")
+            return False
+        print(f"[RUN] {key} in {os.path.relpath(res_file)}: {status}")
+        return True
+
+    def record(self, res_file, key: str, fp: str):
+        """Checkpoint: `key` in `res_file` was produced by the model `fp`."""
+        self.state.setdefault(self._file_id(res_file), {})[key] = fp
+        os.makedirs(STATE_DIR, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
@@ -0,0 +1,150 @@
+# ----------------------------------------------------------------------------
+# Symmetry breaking shared by the SAT/SMT (Z3), CP (MiniZinc) and MIP (AMPL, HiGHS) models
+# ----------------------------------------------------------------------------
+# An STS schedule stays a schedule under
+#   - team relabelling    (n! ways)
+#   - week permutation    ((n-1)! ways)
+#   - period permutation  ((n/2)! ways, the same permutation in every week)
+# Each set below breaks one of them. Sets are combined with '+', e.g.
+# "teams+weeks"; "full" is all three. They are compatible with each other:
+#   teams    week 0 is the canonical pairing {i, n-1-i}                (relabel teams)
+#   weeks    team 0 meets n-1 in week 0 and team w in week w >= 1      (reorder weeks)
+#   periods  in week 0 the smallest team of each match grows with p    (reorder periods)
+# With teams+periods, pair {i, n-1-i} is therefore in period i of week 0.
+#
+# A set is turned into backend-neutral facts (0-based teams, weeks, periods):
+#   ("week",  i, j, w)     pair {i, j} plays in week w
+#   ("chain", w)           lex-leader chain on the periods of week w
+# and the emitters below translate the facts for each model.
+
+SETS = ("teams", "weeks", "periods")
+ALIASES = {"none": (), "full": SETS}
+
+def parse_set(name: str) -> tuple:
+    parts = []
+    for part in name.split("+"):
+        if part in ALIASES:
+            parts.extend(ALIASES[part])
+        elif part in SETS:
+            parts.append(part)
+        else:
+            raise ValueError(f"unknown symmetry set {part!r} (choose from {', '.join(SETS + tuple(ALIASES))})")
+    return tuple(s for s in SETS if s in parts)
+
+def all_sets() -> list:
+    """Every combination of the basic sets, from 'none' to 'full'."""
+    names = ["none"]
+    for mask in range(1, 1 << len(SETS)):
+        names.append("+".join(s for b, s in enumerate(SETS) if mask >> b & 1))
+    return names
+
+def facts(n: int, name: str) -> list:
+    chosen = parse_set(name)
+    out = []
+    if "teams" in chosen:
+        out += [("week", i, n - 1 - i, 0) for i in range(n // 2)]
+    if "weeks" in chosen:
+        if "teams" not in chosen:
+            out.append(("week", 0, n - 1, 0))
+        out += [("week", 0, w, w) for w in range(1, n - 1)]
+    if "periods" in chosen:
+        out.append(("chain", 0))
+    return out
+
+def _chain_cuts(n: int):
+    """The chain on week w as 'at most one' cuts: for every threshold k, the match
+    in period p may not have min >= k while the one in p+1 has min < k."""
+    for p in range(n // 2 - 1):
+        for k in range(1, n - 1):
+            yield p, k
+
+# ----------------------------------------------------------------------------
+# Z3: Boolean cube M[(i, j, w, p)], i < j
+# ----------------------------------------------------------------------------
+def add_z3_constraints(s, M, n, W, P, name: str, pb: bool = True):
+    # pb=False writes the chain as integer sums, which stay standard SMT-LIB
+    from z3 import Or, PbLe, Sum, If
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    for f in facts(n, name):
+        if f[0] == "week":
+            _, i, j, w = f
+            s.add(Or([M[(i, j, w, p)] for p in range(P)]))
+        else:
+            w = f[1]
+            for p, k in _chain_cuts(n):
+                lits = [M[(i, j, w, p)] for i, j in pairs if i >= k] + \
+                       [M[(i, j, w, p + 1)] for i, j in pairs if i < k]
+                s.add(PbLe([(v, 1) for v in lits], 1) if pb else Sum([If(v, 1, 0) for v in lits]) <= 1)
+
+# ----------------------------------------------------------------------------
+# Z3: pair viewpoint week[(i, j)], period[(i, j)], i < j (Int or BitVec)
+# ----------------------------------------------------------------------------
+def add_z3_pair_constraints(s, week, period, n, name: str):
+    from z3 import And, Implies, ULT, is_bv
+    lt = lambda a, b: ULT(a, b) if is_bv(a) else a < b
+    for f in facts(n, name):
+        if f[0] == "week":
+            _, i, j, w = f
+            s.add(week[(i, j)] == w)
+        else:
+            w = f[1]
+            for a in week:
+                for b in week:
+                    if a[0] < b[0]:
+                        s.add(Implies(And(week[a] == w, week[b] == w), lt(period[a], period[b])))
+
+# ----------------------------------------------------------------------------
+# MiniZinc: O[t, w] opponent and P[t, w] slot, 1-based
+# ----------------------------------------------------------------------------
+def minizinc_constraints(n: int, name: str) -> str:
+    lines = []
+    for f in facts(n, name):
+        if f[0] == "week":
+            _, i, j, w = f
+            lines.append(f"constraint O[{i+1},{w+1}] = {j+1};")
+        else:
+            w = f[1] + 1
+            # team t is the smallest of its match iff O[t,w] > t
+            lines.append(
+                f"constraint forall(s in 1..n div 2 - 1, k in 2..n-1)(\n"
+                f"  sum(t in k..n)(bool2int(P[t,{w}]=s /\\ O[t,{w}]>t))\n"
+                f"  + sum(t in 1..k-1)(bool2int(P[t,{w}]=s+1 /\\ O[t,{w}]>t)) <= 1\n);"
+            )
+    return "\n".join(lines) + "\n"
+
+# ----------------------------------------------------------------------------
+# AMPL: x[i, j, p, w] binary, i plays home against j, 1-based
+# ----------------------------------------------------------------------------
+def ampl_constraints(n: int, name: str) -> str:
+    stmts = []
+    for idx, f in enumerate(facts(n, name)):
+        if f[0] == "week":
+            _, i, j, w = f
+            stmts.append(f"subject to SymWeek_{idx}:\n"
+                         f"    sum {{p in PERIODS}} (x[{i+1},{j+1},p,{w+1}] + x[{j+1},{i+1},p,{w+1}]) = 1;")
+        else:
+            w = f[1] + 1
+            stmts.append(f"subject to SymPeriodChain_{idx} {{p in PERIODS, k in 2..N-1: p < card(PERIODS)}}:\n"
+                         f"    sum {{i in TEAMS, j in TEAMS: i != j and min(i,j) >= k}} x[i,j,p,{w}]\n"
+                         f"  + sum {{i in TEAMS, j in TEAMS: i != j and min(i,j) < k}} x[i,j,p+1,{w}] <= 1;")
+    return "\n".join(stmts)
+
+# ----------------------------------------------------------------------------
+# Sparse MIP rows: x[(i, j, p, w)] binary, i plays home against j, 0-based
+# ----------------------------------------------------------------------------
+def mip_rows(n: int, name: str) -> list:
+    """(keys, lo, hi) per row: lo <= sum of x over keys <= hi."""
+    rows = []
+    P = n // 2
+    for f in facts(n, name):
+        if f[0] == "week":
+            _, i, j, w = f
+            rows.append(([(i, j, p, w) for p in range(P)] + [(j, i, p, w) for p in range(P)], 1, 1))
+        else:
+            w = f[1]
+            ordered = [(i, j) for i in range(n) for j in range(n) if i != j]
+            for p, k in _chain_cuts(n):
+                keys = [(i, j, p, w) for i, j in ordered if min(i, j) >= k] + \
+                       [(i, j, p + 1, w) for i, j in ordered if min(i, j) < k]
+                rows.append((keys, 0, 1))
+    return rows
@@ -0,0 +1,63 @@
+# ----------------------------------------------------------------------------
+# Z3 solver construction shared by the SAT and SMT backends
+# ----------------------------------------------------------------------------
+# A configuration is a named way of building the solver the constraints are
+# added to. How the PB / LIA constraints are preprocessed (native PB solver,
+# card2bv + pb2bv bit-blasting, plain SMT core) often changes the solve time by
+# an order of magnitude, so the backends take the name from the command line.
+#   default  Solver(): Z3 picks the strategy from the asserted formulas
+#   qf_fd    SolverFor("QF_FD"): finite-domain SAT core with native PB support
+#   qf_lia   SolverFor("QF_LIA")
+#   pb2sat   bit-blast cardinality/PB constraints and run the SAT solver
+#   lia2sat  as pb2sat, first turning 0/1 integer sums into cardinalities
+#   smt      simplify + solve-eqs, then the SMT core
+# Tactic pipelines are not incremental: push/pop re-solves from scratch.
+from z3 import Solver, SolverFor, Then, set_param
+
+PIPELINES = {
+    "pb2sat":  ("simplify", "card2bv", "pb2bv", "bit-blast", "sat"),
+    "lia2sat": ("simplify", "propagate-values", "lia2card", "card2bv", "pb2bv", "bit-blast", "sat"),
+    "smt":     ("simplify", "propagate-values", "solve-eqs", "smt"),
+}
+LOGICS = {"qf_fd": "QF_FD", "qf_lia": "QF_LIA"}
+CONFIGS = ("default",) + tuple(LOGICS) + tuple(PIPELINES)
+
+def set_threads(threads: int):
+    """Z3's parallel mode. Threads are a global setting, shared by every solver."""
+    set_param("parallel.enable", threads > 1)
+    set_param("parallel.threads.max", max(1, threads))
+    set_param("sat.threads", max(1, threads))
+
+def make_solver(config: str = "default", threads: int = 1, timeout_ms: int = None, seed: int = None):
+    if config not in CONFIGS:
+        raise ValueError(f"unknown Z3 configuration {config!r} (choose from {', '.join(CONFIGS)})")
+    set_threads(threads)
+    if seed is not None:
+        # tactic solvers reject a solver-level seed, so set the module ones too
+        set_param("sat.random_seed", seed)
+        set_param("smt.random_seed", seed)
+
+    if config in LOGICS:
+        s = SolverFor(LOGICS[config])
+    elif config in PIPELINES:
+        s = Then(*PIPELINES[config]).solver()
+    else:
+        s = Solver()
+    if timeout_ms is not None:
+        s.set("timeout", timeout_ms)
+    if seed is not None and config not in PIPELINES:
+        s.set("random_seed", seed)
+    return s
+
+def config_suffix(config: str, threads: int = 1) -> str:
+    """Result-key suffix, empty for the historical default."""
+    sfx = "" if config == "default" else f"_z3-{config}"
+    return sfx + (f"_t{threads}" if threads > 1 else "")
+
+def add_arguments(parser):
+    parser.add_argument("--z3-config", choices=CONFIGS, default="default",
+                        help="solver construction: logic or tactic pipeline (default: default)")
+    parser.add_argument("--threads", type=int, default=1, metavar="K",
+                        help="enable Z3's parallel mode with K threads (default: 1)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="random seed of the SAT/SMT cores (default: the backend's, 42 for decision runs)")